@@ -1,10 +1,10 @@
-import subprocess
-import runpy
-import urllib.request
-import zipfile
-from io import BytesIO
+import os
+import sys
+import argparse
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "src"))
+
 
 # Prompt user for TMDB API key and save to secret_settings.py
 TMDB_KEY_PATH = Path("src/config/secret_settings.py")
@@ -18,38 +18,91 @@ if not TMDB_KEY_PATH.exists():
 else:
     print("TMDB API key file already exists. Skipping creation.")
 
+from config.settings import (PROJECT_ROOT, DB_PATH, SCHEMA_SQL_PATH, PROCESSED_DATA_PATH, BUILD_STATE_PATH,
+                             MOVIELENS_ARCHIVE_PATH, RATINGS_PARQUET_PATH, TAGS_PARQUET_PATH, METRICS_PATH)
+from pipeline.metrics import PROFILE_SQL_ENV
+from pipeline.task_graph import Task, TaskGraph
+
+parser = argparse.ArgumentParser(description="Build the movie dataset, skipping stages that are up to date.")
+parser.add_argument("--jobs", type=int, default=4, help="maximum number of stages running at once")
+parser.add_argument("--force", nargs="*", default=[], metavar="STAGE", help="stages to run even if up to date")
+parser.add_argument("--profile-sql", action="store_true", help="time every SQL statement and report the slowest per stage")
+parser.add_argument("--compact-storage", action="store_true",
+                    help="create a new database in the compact layout (convert an existing one with pipeline.compact_storage migrate)")
+args = parser.parse_args()
+
+SRC = PROJECT_ROOT / "src"
+
+
+def module(name):
+    """Command running a module from src, plus its source file as an input."""
+    return [sys.executable, "-m", name], SRC / (name.replace(".", "/") + ".py")
+
+
+env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(SRC), os.environ.get("PYTHONPATH")])))
+if args.profile_sql:
+    env[PROFILE_SQL_ENV] = "1"
+graph = TaskGraph(BUILD_STATE_PATH, env=env, metrics_dir=METRICS_PATH)
+DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+PROCESSED_DATA_PATH.mkdir(parents=True, exist_ok=True)
+
 # Create SQLite database schema
-print("Creating database schema...")
-subprocess.run(["sqlite3", "data/movies.db", ".read data/sql/create_tables.sql"])
-subprocess.run(["sqlite3", "data/movies.db", ".read data/sql/create_indexes.sql"])
-subprocess.run(["sqlite3", "data/movies.db", ".read data/sql/create_views.sql"])
+schema_files = [SCHEMA_SQL_PATH / name for name in
+                ("compact_schema.sql", "create_tables.sql", "create_indexes.sql", "create_views.sql", "create_triggers.sql")]
+# The data stages only depend on the table definitions: a view or trigger change must not re-import or re-crawl
+# (movie_features notices a changed view through the definition hash it keeps in materialized_view_state)
+table_files = [SCHEMA_SQL_PATH / "compact_schema.sql", SCHEMA_SQL_PATH / "create_tables.sql"]
+command, source = module("pipeline.compact_storage")
+graph.add(Task(
+    "schema",
+    commands=[command + ["--db", str(DB_PATH), "schema"] + (["--compact"] if args.compact_storage else [])],
+    inputs=schema_files + [source], stamp=True,
+))
 
 # Download and import MovieLens data
-print("Downloading MovieLens data...")
-raw_dir = Path("data/raw")
-raw_dir.mkdir(parents=True, exist_ok=True)
-
-movielens_url = "https://files.grouplens.org/datasets/movielens/ml-25m.zip"
-response = urllib.request.urlopen(movielens_url)
+command, source = module("data_collection.download_movielens")
+graph.add(Task("download_movielens", [command], inputs=[source], outputs=[MOVIELENS_ARCHIVE_PATH]))
 
-with zipfile.ZipFile(BytesIO(response.read())) as zip_file:
-    for name in ["links.csv", "movies.csv", "ratings.csv", "tags.csv"]:
-        zip_file.extract(f"ml-25m/{name}", path=raw_dir)
-        (raw_dir / "ml-25m" / name).rename(raw_dir / name)
-    (raw_dir / "ml-25m").rmdir()
+command, source = module("data_collection.import_movielens_data")
+graph.add(Task(
+    "import_movielens", [command],
+    inputs=[MOVIELENS_ARCHIVE_PATH, source] + table_files,
+    outputs=[RATINGS_PARQUET_PATH, TAGS_PARQUET_PATH],
+    deps=["schema", "download_movielens"], stamp=True,
+))
 
-print("Importing MovieLens data...")
-runpy.run_module("src.data_collection.import_movielens_data", run_name="__main__")
+# Import TMDb metadata after the MovieLens import, whose long write transactions would lock out the
+# crawl's writer; it still runs alongside the MovieLens Parquet stages, which only read the database
+command, source = module("data_collection.fetch_tmdb_movies")
+graph.add(Task(
+    "tmdb_crawl", [command],
+    inputs=[source, SRC / "data_collection" / "tmdb_writer.py"] + table_files,
+    deps=["schema", "import_movielens"], stamp=True,
+))
 
-# Import TMDb metadata
-print("Importing TMDb data...")
-runpy.run_module("src.data_collection.fetch_tmdb_movies", run_name="__main__")
+# Materialize movie_rating_features for the movies the crawl touched
+command, source = module("data_processing.movie_features")
+graph.add(Task(
+    "movie_features", [command],
+    inputs=[source, graph.stamp_path("tmdb_crawl"), graph.stamp_path("schema")],
+    deps=["tmdb_crawl"], stamp=True,
+))
 
 # Generate processed data files
-Path("data/processed").mkdir(parents=True, exist_ok=True)
-print("Generating processed data...")
-runpy.run_module("src.data_processing.daily_forward_4w_rating_volume_to_parquet", run_name="__main__")
-runpy.run_module("src.data_processing.daily_forward_multiweek_rating_volume_to_parquet", run_name="__main__")
-runpy.run_module("src.data_processing.one_hot_genres_to_parquet", run_name="__main__")
+for name, output, upstream, helper in [
+    ("daily_forward_4w_rating_volume_to_parquet", "daily_forward_4w_rating_volume.parquet", "import_movielens", "rating_volume"),
+    ("daily_forward_multiweek_rating_volume_to_parquet", "daily_forward_multiweek_rating_volume.parquet", "import_movielens", "rating_volume"),
+    ("one_hot_genres_to_parquet", "movie_genres_onehot.parquet", "tmdb_crawl", "multi_hot"),
+]:
+    command, source = module(f"data_processing.{name}")
+    graph.add(Task(
+        name, [command],
+        inputs=[source, SRC / "data_processing" / f"{helper}.py", graph.stamp_path(upstream)],
+        outputs=[PROCESSED_DATA_PATH / output],
+        deps=[upstream],
+    ))
 
+results = graph.run(jobs=args.jobs, force=args.force)
+if any(status in ("failed", "blocked") for status, *_ in results.values()):
+    sys.exit("Data setup failed.")
 print("Data setup complete.")
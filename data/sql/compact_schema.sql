@@ -0,0 +1,171 @@
+-- Opt-in compact storage layout (see src/pipeline/compact_storage.py), applied before create_tables.sql.
+--
+-- Tables looked up by a composite key are WITHOUT ROWID: the rows are stored in the
+-- primary key b-tree itself instead of in a rowid table plus a separate key index.
+-- movie_crew job/department and user_movie_tag text are dictionary-encoded; views
+-- under the original names decode them, and INSTEAD OF triggers encode writes, so
+-- the loaders, writers and generate_scores.sql run unchanged.
+
+CREATE TABLE IF NOT EXISTS movie_genre (
+    movie_id INTEGER,
+    genre_id INTEGER,
+    FOREIGN KEY (movie_id) REFERENCES movie(movie_id),
+    FOREIGN KEY (genre_id) REFERENCES genre(genre_id),
+    PRIMARY KEY (movie_id, genre_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS movie_keyword (
+    movie_id INTEGER,
+    keyword_id INTEGER,
+    FOREIGN KEY (movie_id) REFERENCES movie(movie_id),
+    FOREIGN KEY (keyword_id) REFERENCES keyword(keyword_id),
+    PRIMARY KEY (movie_id, keyword_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS movie_cast (
+    movie_id INTEGER,
+    person_id INTEGER,
+    character TEXT,
+    cast_order INTEGER,
+    PRIMARY KEY (movie_id, person_id),
+    FOREIGN KEY (movie_id) REFERENCES movie(movie_id),
+    FOREIGN KEY (person_id) REFERENCES person(person_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS movie_production_company (
+    movie_id INTEGER,
+    company_id INTEGER,
+    PRIMARY KEY (movie_id, company_id),
+    FOREIGN KEY (movie_id) REFERENCES movie(movie_id),
+    FOREIGN KEY (company_id) REFERENCES production_company(company_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS user_movie_rating (
+    user_id INTEGER NOT NULL,
+    movie_id INTEGER NOT NULL,
+    rating REAL NOT NULL,
+    timestamp INTEGER NOT NULL,
+    PRIMARY KEY (user_id, movie_id, timestamp),
+    FOREIGN KEY (movie_id) REFERENCES movie(movie_id)
+) WITHOUT ROWID;
+
+-- Dictionaries; a NULL name has its own entry, so every encoded row joins to one
+CREATE TABLE IF NOT EXISTS crew_job (
+    job_id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS crew_department (
+    department_id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS tag_text (
+    tag_text_id INTEGER PRIMARY KEY,
+    text TEXT UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS movie_crew_compact (
+    movie_id INTEGER NOT NULL,
+    person_id INTEGER NOT NULL,
+    job_id INTEGER NOT NULL,
+    department_id INTEGER NOT NULL,
+    PRIMARY KEY (movie_id, person_id, job_id),
+    FOREIGN KEY (movie_id) REFERENCES movie(movie_id),
+    FOREIGN KEY (person_id) REFERENCES person(person_id),
+    FOREIGN KEY (job_id) REFERENCES crew_job(job_id),
+    FOREIGN KEY (department_id) REFERENCES crew_department(department_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS user_movie_tag_compact (
+    tag_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    movie_id INTEGER NOT NULL,
+    tag_text_id INTEGER NOT NULL,
+    timestamp INTEGER,
+    FOREIGN KEY (movie_id) REFERENCES movie(movie_id),
+    FOREIGN KEY (tag_text_id) REFERENCES tag_text(tag_text_id)
+);
+
+CREATE VIEW IF NOT EXISTS movie_crew AS
+    SELECT c.movie_id, c.person_id, j.name AS job, d.name AS department
+    FROM movie_crew_compact AS c
+    JOIN crew_job AS j ON j.job_id = c.job_id
+    JOIN crew_department AS d ON d.department_id = c.department_id;
+
+CREATE VIEW IF NOT EXISTS user_movie_tag AS
+    SELECT t.tag_id, t.user_id, t.movie_id, x.text AS tag, t.timestamp
+    FROM user_movie_tag_compact AS t
+    JOIN tag_text AS x ON x.tag_text_id = t.tag_text_id;
+
+-- New dictionary entries are added with INSERT ... WHERE NOT EXISTS rather than INSERT OR IGNORE:
+-- the conflict clause of the triggering statement overrides those of the trigger body.
+-- The compact row inserts take it on purpose (tmdb_writer's INSERT OR IGNORE still ignores duplicates).
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_crew_insert INSTEAD OF INSERT ON movie_crew
+BEGIN
+    INSERT INTO crew_job (name) SELECT NEW.job WHERE NOT EXISTS (SELECT 1 FROM crew_job WHERE name IS NEW.job);
+    INSERT INTO crew_department (name) SELECT NEW.department WHERE NOT EXISTS (SELECT 1 FROM crew_department WHERE name IS NEW.department);
+    INSERT INTO movie_crew_compact (movie_id, person_id, job_id, department_id)
+    VALUES (NEW.movie_id, NEW.person_id,
+            (SELECT job_id FROM crew_job WHERE name IS NEW.job),
+            (SELECT department_id FROM crew_department WHERE name IS NEW.department));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_crew_update INSTEAD OF UPDATE ON movie_crew
+BEGIN
+    INSERT INTO crew_job (name) SELECT NEW.job WHERE NOT EXISTS (SELECT 1 FROM crew_job WHERE name IS NEW.job);
+    INSERT INTO crew_department (name) SELECT NEW.department WHERE NOT EXISTS (SELECT 1 FROM crew_department WHERE name IS NEW.department);
+    UPDATE movie_crew_compact
+    SET movie_id = NEW.movie_id, person_id = NEW.person_id,
+        job_id = (SELECT job_id FROM crew_job WHERE name IS NEW.job),
+        department_id = (SELECT department_id FROM crew_department WHERE name IS NEW.department)
+    WHERE movie_id = OLD.movie_id AND person_id = OLD.person_id
+      AND job_id = (SELECT job_id FROM crew_job WHERE name IS OLD.job);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_crew_delete INSTEAD OF DELETE ON movie_crew
+BEGIN
+    DELETE FROM movie_crew_compact
+    WHERE movie_id = OLD.movie_id AND person_id = OLD.person_id
+      AND job_id = (SELECT job_id FROM crew_job WHERE name IS OLD.job);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_user_movie_tag_insert INSTEAD OF INSERT ON user_movie_tag
+BEGIN
+    INSERT INTO tag_text (text) SELECT NEW.tag WHERE NOT EXISTS (SELECT 1 FROM tag_text WHERE text IS NEW.tag);
+    INSERT INTO user_movie_tag_compact (tag_id, user_id, movie_id, tag_text_id, timestamp)
+    VALUES (NEW.tag_id, NEW.user_id, NEW.movie_id, (SELECT tag_text_id FROM tag_text WHERE text IS NEW.tag), NEW.timestamp);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_user_movie_tag_update INSTEAD OF UPDATE ON user_movie_tag
+BEGIN
+    INSERT INTO tag_text (text) SELECT NEW.tag WHERE NOT EXISTS (SELECT 1 FROM tag_text WHERE text IS NEW.tag);
+    UPDATE user_movie_tag_compact
+    SET tag_id = NEW.tag_id, user_id = NEW.user_id, movie_id = NEW.movie_id,
+        tag_text_id = (SELECT tag_text_id FROM tag_text WHERE text IS NEW.tag), timestamp = NEW.timestamp
+    WHERE tag_id = OLD.tag_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_user_movie_tag_delete INSTEAD OF DELETE ON user_movie_tag
+BEGIN
+    DELETE FROM user_movie_tag_compact WHERE tag_id = OLD.tag_id;
+END;
+
+-- The create_indexes.sql and create_triggers.sql statements on movie_crew, which is a view here
+CREATE INDEX IF NOT EXISTS idx_movie_crew_person_job ON movie_crew_compact(person_id, job_id, department_id);
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_crew_insert_features AFTER INSERT ON movie_crew_compact
+BEGIN
+    INSERT OR IGNORE INTO movie_feature_dirty (movie_id) VALUES (NEW.movie_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_crew_update_features AFTER UPDATE ON movie_crew_compact
+BEGIN
+    INSERT OR IGNORE INTO movie_feature_dirty (movie_id) VALUES (NEW.movie_id), (OLD.movie_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_crew_delete_features AFTER DELETE ON movie_crew_compact
+BEGIN
+    INSERT OR IGNORE INTO movie_feature_dirty (movie_id) VALUES (OLD.movie_id);
+END;
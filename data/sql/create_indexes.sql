@@ -1,8 +1,19 @@
-CREATE INDEX IF NOT EXISTS idx_movie_id ON movie(movie_id);
-CREATE INDEX IF NOT EXISTS idx_person_id ON person(person_id);
-CREATE INDEX IF NOT EXISTS idx_movielens_id ON movie_link(movielens_id);
+-- Superseded: duplicates of primary keys, or not used by any query (see src/benchmarks/query_plans.py)
+DROP INDEX IF EXISTS idx_movie_id;
+DROP INDEX IF EXISTS idx_person_id;
+DROP INDEX IF EXISTS idx_movielens_id;
+DROP INDEX IF EXISTS idx_mg_movie_id;
+DROP INDEX IF EXISTS idx_mg_genre_id;
+DROP INDEX IF EXISTS idx_user_movie_rating_rating;
+DROP INDEX IF EXISTS idx_user_movie_rating_movielens_id;
+DROP INDEX IF EXISTS idx_movie_crew_movie_job;
+
 CREATE INDEX IF NOT EXISTS idx_movie_link_tmdb_id ON movie_link(tmdb_id);
-CREATE INDEX IF NOT EXISTS idx_user_movie_rating_movielens_id ON user_movie_rating(movie_id);
-CREATE INDEX IF NOT EXISTS idx_user_movie_rating_rating ON user_movie_rating(rating);
-CREATE INDEX IF NOT EXISTS idx_mg_movie_id ON movie_genre(movie_id);
-CREATE INDEX IF NOT EXISTS idx_mg_genre_id ON movie_genre(genre_id);
+CREATE INDEX IF NOT EXISTS idx_user_movie_rating_movie_id ON user_movie_rating(movie_id);
+CREATE INDEX IF NOT EXISTS idx_movie_cast_movie_order ON movie_cast(movie_id, cast_order);
+
+-- Career lookups by person or company carry movie_id (and the crew job/department) so the
+-- self-joins in generate_scores.sql are answered from the index alone
+CREATE INDEX IF NOT EXISTS idx_movie_cast_person ON movie_cast(person_id, movie_id);
+CREATE INDEX IF NOT EXISTS idx_movie_crew_person_job ON movie_crew(person_id, job, department, movie_id);
+CREATE INDEX IF NOT EXISTS idx_movie_production_company_company ON movie_production_company(company_id, movie_id);
@@ -93,6 +93,26 @@ CREATE TABLE IF NOT EXISTS user_movie_tag (
     FOREIGN KEY (movie_id) REFERENCES movie(movie_id)   
 );
 
+-- Ratings per movie per UTC day, rebuilt by the MovieLens import
+CREATE TABLE IF NOT EXISTS daily_rating_count (
+    day TEXT NOT NULL,
+    movie_id INTEGER NOT NULL,
+    rating_count INTEGER NOT NULL,
+    PRIMARY KEY (day, movie_id)
+) WITHOUT ROWID;
+
+-- Movies whose features changed since movie_rating_features_mat was last refreshed (filled by triggers)
+CREATE TABLE IF NOT EXISTS movie_feature_dirty (
+    movie_id INTEGER PRIMARY KEY
+);
+
+-- Definition hash and refresh time of each materialized view table
+CREATE TABLE IF NOT EXISTS materialized_view_state (
+    view_name TEXT PRIMARY KEY,
+    definition_hash TEXT NOT NULL,
+    refreshed_at TEXT NOT NULL
+);
+
 CREATE TABLE IF NOT EXISTS movie_link (
     movielens_id INTEGER,
     tmdb_id INTEGER,
@@ -100,3 +120,41 @@ CREATE TABLE IF NOT EXISTS movie_link (
     PRIMARY KEY (movielens_id),
     FOREIGN KEY (tmdb_id) REFERENCES movie(movie_id)
 );
+
+-- TMDb crawl journal: lets an interrupted ingestion resume where it stopped
+CREATE TABLE IF NOT EXISTS tmdb_discover_range (
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    min_votes INTEGER NOT NULL,
+    total_pages INTEGER,
+    completed_at TEXT,
+    PRIMARY KEY (start_date, end_date, min_votes)
+);
+
+CREATE TABLE IF NOT EXISTS tmdb_discover_page (
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    min_votes INTEGER NOT NULL,
+    page INTEGER NOT NULL,
+    PRIMARY KEY (start_date, end_date, min_votes, page)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS tmdb_movie_checkpoint (
+    movie_id INTEGER PRIMARY KEY,
+    fetched_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tmdb_sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+-- Per-month release density observed by the crawl, used to plan discover partitions
+CREATE TABLE IF NOT EXISTS tmdb_release_histogram (
+    month TEXT NOT NULL,
+    min_votes INTEGER NOT NULL,
+    total_results INTEGER NOT NULL,
+    day_counts TEXT NOT NULL,
+    observed_at TEXT NOT NULL,
+    PRIMARY KEY (month, min_votes)
+);
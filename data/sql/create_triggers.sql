@@ -0,0 +1,76 @@
+-- Mark movies whose movie_rating_features row is out of date; see data_processing/movie_features.py
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_insert_features AFTER INSERT ON movie
+BEGIN
+    INSERT OR IGNORE INTO movie_feature_dirty (movie_id) VALUES (NEW.movie_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_update_features AFTER UPDATE ON movie
+BEGIN
+    INSERT OR IGNORE INTO movie_feature_dirty (movie_id) VALUES (NEW.movie_id), (OLD.movie_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_delete_features AFTER DELETE ON movie
+BEGIN
+    INSERT OR IGNORE INTO movie_feature_dirty (movie_id) VALUES (OLD.movie_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_cast_insert_features AFTER INSERT ON movie_cast
+BEGIN
+    INSERT OR IGNORE INTO movie_feature_dirty (movie_id) VALUES (NEW.movie_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_cast_update_features AFTER UPDATE ON movie_cast
+BEGIN
+    INSERT OR IGNORE INTO movie_feature_dirty (movie_id) VALUES (NEW.movie_id), (OLD.movie_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_cast_delete_features AFTER DELETE ON movie_cast
+BEGIN
+    INSERT OR IGNORE INTO movie_feature_dirty (movie_id) VALUES (OLD.movie_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_crew_insert_features AFTER INSERT ON movie_crew
+BEGIN
+    INSERT OR IGNORE INTO movie_feature_dirty (movie_id) VALUES (NEW.movie_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_crew_update_features AFTER UPDATE ON movie_crew
+BEGIN
+    INSERT OR IGNORE INTO movie_feature_dirty (movie_id) VALUES (NEW.movie_id), (OLD.movie_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_crew_delete_features AFTER DELETE ON movie_crew
+BEGIN
+    INSERT OR IGNORE INTO movie_feature_dirty (movie_id) VALUES (OLD.movie_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_production_company_insert_features AFTER INSERT ON movie_production_company
+BEGIN
+    INSERT OR IGNORE INTO movie_feature_dirty (movie_id) VALUES (NEW.movie_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_production_company_update_features AFTER UPDATE ON movie_production_company
+BEGIN
+    INSERT OR IGNORE INTO movie_feature_dirty (movie_id) VALUES (NEW.movie_id), (OLD.movie_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_production_company_delete_features AFTER DELETE ON movie_production_company
+BEGIN
+    INSERT OR IGNORE INTO movie_feature_dirty (movie_id) VALUES (OLD.movie_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_genre_insert_features AFTER INSERT ON movie_genre
+BEGIN
+    INSERT OR IGNORE INTO movie_feature_dirty (movie_id) VALUES (NEW.movie_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_genre_update_features AFTER UPDATE ON movie_genre
+BEGIN
+    INSERT OR IGNORE INTO movie_feature_dirty (movie_id) VALUES (NEW.movie_id), (OLD.movie_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_movie_genre_delete_features AFTER DELETE ON movie_genre
+BEGIN
+    INSERT OR IGNORE INTO movie_feature_dirty (movie_id) VALUES (OLD.movie_id);
+END;
@@ -10,12 +10,12 @@ CREATE VIEW movie_rating_features AS
         m.runtime,
         m.vote_count,
 
-        -- top cast member by billing order
+        -- top cast member by billing order (unknown orders last, ties by person)
         (SELECT GROUP_CONCAT(person_id) 
          FROM (SELECT mc.person_id 
                FROM movie_cast AS mc 
                WHERE mc.movie_id = m.movie_id 
-               ORDER BY mc.cast_order ASC 
+               ORDER BY mc.cast_order IS NULL, mc.cast_order, mc.person_id 
                LIMIT 1)) AS top_cast_id,
 
         -- top 2 cast members by billing order
@@ -23,7 +23,7 @@ CREATE VIEW movie_rating_features AS
          FROM (SELECT mc.person_id 
                FROM movie_cast AS mc 
                WHERE mc.movie_id = m.movie_id 
-               ORDER BY mc.cast_order ASC 
+               ORDER BY mc.cast_order IS NULL, mc.cast_order, mc.person_id 
                LIMIT 2)) AS top_2_cast_ids,
         
         -- top 5 cast members by billing order
@@ -31,7 +31,7 @@ CREATE VIEW movie_rating_features AS
          FROM (SELECT mc.person_id 
                FROM movie_cast AS mc 
                WHERE mc.movie_id = m.movie_id 
-               ORDER BY mc.cast_order ASC 
+               ORDER BY mc.cast_order IS NULL, mc.cast_order, mc.person_id 
                LIMIT 5)) AS top_5_cast_ids,
 
         -- number of cast members
@@ -39,25 +39,33 @@ CREATE VIEW movie_rating_features AS
          FROM movie_cast AS mc 
          WHERE mc.movie_id = m.movie_id) AS num_cast_members,
         
-        -- directors
-        (SELECT GROUP_CONCAT(mc.person_id) 
-         FROM movie_crew AS mc 
-         WHERE mc.movie_id = m.movie_id AND mc.job IN ('Director', 'Co-Director')) AS director_ids,
+        -- directors (ordered, so the lists do not depend on the storage layout)
+        (SELECT GROUP_CONCAT(person_id) 
+         FROM (SELECT mc.person_id 
+               FROM movie_crew AS mc 
+               WHERE mc.movie_id = m.movie_id AND mc.job IN ('Director', 'Co-Director') 
+               ORDER BY mc.person_id)) AS director_ids,
 
-        -- directors
-        (SELECT GROUP_CONCAT(mc.person_id) 
-         FROM movie_crew AS mc 
-         WHERE mc.movie_id = m.movie_id AND mc.department = 'Writing') AS writer_ids,
+        -- writers
+        (SELECT GROUP_CONCAT(person_id) 
+         FROM (SELECT mc.person_id 
+               FROM movie_crew AS mc 
+               WHERE mc.movie_id = m.movie_id AND mc.department = 'Writing' 
+               ORDER BY mc.person_id)) AS writer_ids,
         
         -- production companies
-        (SELECT GROUP_CONCAT(mpc.company_id) 
-         FROM movie_production_company AS mpc 
-         WHERE mpc.movie_id = m.movie_id) AS company_ids,
+        (SELECT GROUP_CONCAT(company_id) 
+         FROM (SELECT mpc.company_id 
+               FROM movie_production_company AS mpc 
+               WHERE mpc.movie_id = m.movie_id 
+               ORDER BY mpc.company_id)) AS company_ids,
 
         -- genres
-        (SELECT GROUP_CONCAT(mg.genre_id) 
-         FROM movie_genre AS mg 
-         WHERE mg.movie_id = m.movie_id) AS genre_ids
+        (SELECT GROUP_CONCAT(genre_id) 
+         FROM (SELECT mg.genre_id 
+               FROM movie_genre AS mg 
+               WHERE mg.movie_id = m.movie_id 
+               ORDER BY mg.genre_id)) AS genre_ids
         
     FROM movie AS m;
 
@@ -69,8 +77,7 @@ CREATE VIEW movie_scores AS
         / (COUNT(umr.rating) + m.vote_count) AS score,
         COUNT(umr.rating) + m.vote_count AS score_count
     FROM movie m
-    JOIN movie_link ml ON m.movie_id = ml.tmdb_id
-    JOIN user_movie_rating umr ON ml.movielens_id = umr.movielens_id
+    JOIN user_movie_rating umr ON umr.movie_id = m.movie_id
     WHERE m.vote_count > 0
     GROUP BY m.movie_id
     HAVING score_count >= 30;
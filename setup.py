@@ -11,7 +11,9 @@ setup(
         'matplotlib',
         'scikit-learn',
         'numpy',
+        'scipy',
         'requests',
+        'aiohttp',
         'pyarrow',
     ],
     extras_require={
@@ -22,5 +24,5 @@ setup(
         'License :: OSI Approved :: MIT License',
         'Operating System :: OS Independent',
     ],
-    python_requires='>=3.6',
+    python_requires='>=3.9',
 )
@@ -0,0 +1,142 @@
+"""
+File size and query times of the standard and the compact storage layout (pipeline/compact_storage.py).
+
+A copy of the database is migrated to the compact layout, then both are
+measured: the size of each table with its indexes, and the best of a few
+runs of the main readers (generate_scores.sql and the career score engine,
+the feature and score views, the rating and tag scans, per-movie rating
+lookups) and of rewriting movies' crew through the movie_crew view.
+
+Timings are with a warm page cache. The smaller file is what makes cold
+reads faster, by fitting more of the database in the cache.
+
+    python -m benchmarks.compact_storage [--db PATH | --scale 0.1] [--repeat 3] [--json PATH]
+"""
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import tempfile
+from contextlib import closing
+from pathlib import Path
+from benchmarks.query_plans import patched
+from benchmarks.synthetic_data import generate_database
+from data_processing import career_scores, load_sqlite
+from data_processing.db_connection import read_connection, close_read_connections
+from data_processing.movie_features import refresh_movie_rating_features
+from pipeline.compact_storage import migrate, table_sizes
+
+LAMBDAS = (0.001, 0.001, 0.001, 0.1)
+LOOKUP_MOVIES = 200
+
+
+def _reset_engine(db_path):
+    career_scores._cached_engine.cache_clear()
+
+
+def _query(sql):
+    def run(db_path):
+        return read_connection(db_path).execute(sql).fetchall()
+    return run
+
+
+def _popular_movies(db_path):
+    return [row[0] for row in read_connection(db_path).execute(
+        "SELECT movie_id FROM movie ORDER BY vote_count DESC LIMIT ?", (LOOKUP_MOVIES,))]
+
+
+def _rating_lookups(db_path):
+    conn = read_connection(db_path)
+    for movie_id in _popular_movies(db_path):
+        conn.execute("SELECT user_id, rating FROM user_movie_rating WHERE movie_id = ?", (movie_id,)).fetchall()
+
+
+def _rewrite_crew(db_path):
+    # What tmdb_writer does for re-fetched movies, rolled back so every repeat starts from the same data
+    movie_ids = [(movie_id,) for movie_id in _popular_movies(db_path)]
+    with closing(sqlite3.connect(db_path)) as conn:
+        rows = conn.execute(f"SELECT movie_id, person_id, job, department FROM movie_crew "
+                            f"WHERE movie_id IN ({', '.join('?' * len(movie_ids))})", [m for m, in movie_ids]).fetchall()
+        conn.executemany("DELETE FROM movie_crew WHERE movie_id = ?", movie_ids)
+        conn.executemany("INSERT OR IGNORE INTO movie_crew (movie_id, person_id, job, department) VALUES (?, ?, ?, ?)", rows)
+        conn.rollback()
+
+
+# name -> (setup run untimed before every repeat, timed function); both take the database path
+QUERIES = {
+    "fetch_scores (generate_scores.sql)": (None, lambda db_path: load_sqlite.fetch_scores(*LAMBDAS, use_sql=True)),
+    "fetch_scores (engine, cold)": (_reset_engine, lambda db_path: load_sqlite.fetch_scores(*LAMBDAS)),
+    "movie_rating_features view": (None, _query("SELECT * FROM movie_rating_features")),
+    "movie_scores view": (None, _query("SELECT * FROM movie_scores")),
+    "fetch_user_movie_ratings": (None, lambda db_path: load_sqlite.fetch_user_movie_ratings(dtype_backend="numpy")),
+    "user_movie_tag scan": (None, _query("SELECT tag_id, user_id, movie_id, tag, timestamp FROM user_movie_tag")),
+    f"ratings of {LOOKUP_MOVIES} movies": (None, _rating_lookups),
+    f"rewrite crew of {LOOKUP_MOVIES} movies": (None, _rewrite_crew),
+}
+
+
+def time_queries(db_path, repeat):
+    """Best time of each query against `db_path`, in seconds."""
+    best = {}
+    with patched(load_sqlite, DB_PATH=db_path):
+        for name, (setup, function) in QUERIES.items():
+            seconds = []
+            for _ in range(repeat):
+                if setup:
+                    setup(db_path)
+                start = time.perf_counter()
+                function(db_path)
+                seconds.append(time.perf_counter() - start)
+            best[name] = min(seconds)
+    career_scores._cached_engine.cache_clear()
+    close_read_connections()
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the size and query times of the standard and compact layouts.")
+    parser.add_argument("--db", type=Path, help="standard-layout database to copy (default: a generated one of --scale)")
+    parser.add_argument("--scale", type=float, default=0.1, help="size of the generated database relative to ml-25m")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        standard, compact = Path(tmp) / "standard.db", Path(tmp) / "compact.db"
+        if args.db is None:
+            generate_database(standard, scale=args.scale)
+        else:
+            shutil.copyfile(args.db, standard)
+        refresh_movie_rating_features(standard)
+        start = time.perf_counter()
+        migrate(standard, compact)
+        migration_seconds = time.perf_counter() - start
+
+        files = {"standard": standard.stat().st_size, "compact": compact.stat().st_size}
+        sizes = {"standard": table_sizes(standard), "compact": table_sizes(compact)}
+        seconds = {}
+        for layout, db_path in (("standard", standard), ("compact", compact)):
+            print(f"Timing the {layout} layout...")
+            seconds[layout] = time_queries(db_path, args.repeat)
+
+    print(f"\nMigration took {migration_seconds:.1f}s")
+    print(f"\n{'table':<34} {'standard MB':>12} {'compact MB':>11} {'change':>8}")
+    for table in sorted(sizes["standard"], key=lambda table: -sizes["standard"][table]):
+        before, after = sizes["standard"][table], sizes["compact"].get(table, 0)
+        if before >= 1024 ** 2:
+            print(f"{table:<34} {before / 1024 ** 2:>12.1f} {after / 1024 ** 2:>11.1f} {(after / before - 1) * 100:>+7.0f}%")
+    print(f"{'file':<34} {files['standard'] / 1024 ** 2:>12.1f} {files['compact'] / 1024 ** 2:>11.1f} "
+          f"{(files['compact'] / files['standard'] - 1) * 100:>+7.0f}%")
+
+    print(f"\n{'query (best of ' + str(args.repeat) + ')':<34} {'standard s':>12} {'compact s':>11} {'change':>8}")
+    for name in QUERIES:
+        before, after = seconds["standard"][name], seconds["compact"][name]
+        print(f"{name:<34} {before:>12.3f} {after:>11.3f} {(after / before - 1) * 100:>+7.0f}%")
+    if args.json:
+        args.json.write_text(json.dumps({"migration_seconds": migration_seconds, "file_bytes": files,
+                                         "table_bytes": sizes, "seconds": seconds}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+EXPLAIN QUERY PLAN checks for the queries the loaders and processing scripts run.
+
+Each check calls the real code against a generated database (or `--db`),
+captures every statement it sends to SQLite, and explains it. A check fails
+when a plan
+- scans a large table that the check does not expect to read in full,
+- builds an automatic (temporary) index, which means an index is missing, or
+- does not use an index the check expects.
+
+Indexes in create_indexes.sql that no plan uses, or that repeat a prefix of
+their table's primary key, are reported as unused.
+
+    python -m benchmarks.query_plans [--db PATH] [--json PATH]
+"""
+import re
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import tempfile
+from contextlib import closing, contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from config.settings import SCHEMA_SQL_PATH
+from benchmarks.synthetic_data import generate_database
+from data_collection.import_movielens_data import refresh_daily_rating_count
+from data_processing import feature_cache, load_sqlite, movie_features, multi_hot, rating_volume
+from data_processing.db_connection import close_read_connections
+from data_processing.ratings_to_parquet import export_movielens_parquet
+
+# Tables whose full scan is costly at real scale (everything but the small label and state tables)
+LARGE_TABLES = {
+    "movie", "person", "movie_cast", "movie_crew", "movie_genre", "movie_keyword", "movie_production_company",
+    "movie_link", "user_movie_rating", "user_movie_tag", "daily_rating_count", "movie_rating_features_mat",
+}
+DML = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|LEFT\b|GROUP\b|ORDER\b|USING\b)(\w+))?", re.IGNORECASE)
+PLAN_OBJECT = re.compile(r"^(?:SCAN|SEARCH)\s+(\w+)")
+UNTRACED_CONNECT = sqlite3.connect
+
+
+@dataclass
+class PlanCheck:
+    """
+    One check: `run(db_path)` executes the queries, `expect` lists index names
+    that must appear in the plans and `full_scans` the tables (or aliases)
+    that may be read in full or through an automatic index.
+    """
+    name: str
+    run: object
+    expect: tuple = ()
+    full_scans: tuple = ()
+    failures: list = field(default_factory=list)
+
+
+@contextmanager
+def capture_statements():
+    """Records the SQL (with bound parameters expanded) of every connection opened inside the block."""
+    statements = []
+    connect = sqlite3.connect
+
+    def traced_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    sqlite3.connect = traced_connect
+    try:
+        yield statements
+    finally:
+        sqlite3.connect = connect
+
+
+@contextmanager
+def patched(module, **attributes):
+    """Temporarily replaces module-level settings such as DB_PATH."""
+    saved = {name: getattr(module, name) for name in attributes}
+    for name, value in attributes.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+
+def explain(conn, statement):
+    """Plan lines of a statement, with aliases resolved to table names."""
+    aliases = {}
+    for table, alias in TABLE_REFERENCE.findall(statement):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    lines = []
+    for _, _, _, detail in conn.execute("EXPLAIN QUERY PLAN " + statement):
+        match = PLAN_OBJECT.match(detail)
+        name = match.group(1) if match else None
+        lines.append((detail, name, aliases.get(name, name)))
+    return lines
+
+
+def plan_failures(check, plans):
+    """Failure messages of one check given (statement, plan lines) pairs."""
+    failures = []
+    details = [detail for _, lines in plans for detail, _, _ in lines]
+    for statement, lines in plans:
+        for detail, name, table in lines:
+            allowed = name in check.full_scans or table in check.full_scans
+            is_full_scan = detail.startswith("SCAN ") and table in LARGE_TABLES
+            if (is_full_scan or "AUTOMATIC" in detail) and not allowed:
+                failures.append(f"{detail}  <-  {' '.join(statement.split())[:120]}")
+    for index in check.expect:
+        if not any(re.search(rf"\b{index}\b", detail) for detail in details):
+            failures.append(f"index {index} not used")
+    return failures
+
+
+def _query(sql):
+    def run(db_path):
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(sql).fetchall()
+    return run
+
+
+def _loader(function, *args, **kwargs):
+    def run(db_path):
+        with patched(load_sqlite, DB_PATH=db_path):
+            function(*args, **kwargs)
+    return run
+
+
+def _sample_movie_ids(db_path, n=3):
+    """A few existing movie IDs, read on an untraced connection so the lookup is not checked itself."""
+    with closing(UNTRACED_CONNECT(db_path)) as conn:
+        return [movie_id for movie_id, in conn.execute("SELECT movie_id FROM movie LIMIT ?", (n,))]
+
+
+def _refresh_touched_movies(db_path):
+    movie_ids = _sample_movie_ids(db_path)
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("UPDATE movie SET popularity = popularity + 1 WHERE movie_id = ?", [(m,) for m in movie_ids])
+        conn.commit()
+    movie_features.refresh_movie_rating_features(db_path)
+
+
+def _daily_counts(db_path):
+    movie_ids = _sample_movie_ids(db_path)
+    for by in (None, "movie_id", "genre"):
+        rating_volume.fetch_daily_counts("2005-01-01", "2005-12-31", by=by, db_path=db_path)
+    rating_volume.fetch_daily_counts("2005-01-01", "2005-12-31", by="movie_id", movie_ids=movie_ids, db_path=db_path)
+
+
+def _refresh_daily_rating_count(db_path):
+    with sqlite3.connect(db_path) as conn:
+        refresh_daily_rating_count(conn)
+
+
+def _movie_titles(db_path):
+    _loader(load_sqlite.fetch_movie_titles, _sample_movie_ids(db_path, 100))(db_path)
+
+
+def _export_parquet(db_path):
+    with tempfile.TemporaryDirectory() as tmp:
+        export_movielens_parquet(db_path, Path(tmp) / "ratings", Path(tmp) / "tags")
+
+
+ENGINE_TABLES = ("movie", "movie_crew", "movie_cast", "movie_production_company")
+
+CHECKS = [
+    PlanCheck(
+        "fetch_scores (generate_scores.sql)", _loader(load_sqlite.fetch_scores, 0.001, 0.001, 0.001, 0.1, use_sql=True),
+        expect=("idx_movie_crew_person_job", "idx_movie_cast_person", "idx_movie_production_company_company",
+                "idx_movie_cast_movie_order"),
+        # Each CTE drives from one pass over its credits; the automatic indexes are on the small CTE results
+        full_scans=("movie", "mc2", "prev_mpc", "m", "ds", "ws", "cs", "pcs"),
+    ),
+    PlanCheck("fetch_scores (engine)", _loader(load_sqlite.fetch_scores, 0.001, 0.001, 0.001, 0.1), full_scans=ENGINE_TABLES),
+    PlanCheck(
+        "fetch_movie_rating_features", _loader(load_sqlite.fetch_movie_rating_features, 30),
+        expect=("idx_movie_rating_features_mat_vote_count",),
+    ),
+    PlanCheck(
+        "movie_rating_features refresh", _refresh_touched_movies,
+        expect=("idx_movie_cast_movie_order",), full_scans=("movie_feature_dirty",),
+    ),
+    PlanCheck(
+        "fetch_predict_success_data", _loader(load_sqlite.fetch_predict_success_data, 0.001, 0.001, 0.001, 0.1, cache=False),
+        full_scans=ENGINE_TABLES + ("movie_genre", "movie_rating_features_mat"),
+    ),
+    PlanCheck("fetch_one_hot_genres", _loader(load_sqlite.fetch_one_hot_genres, 30), full_scans=("movie", "movie_genre")),
+    PlanCheck("fetch_multi_hot (keyword)", _loader(load_sqlite.fetch_multi_hot, "keyword"), full_scans=("movie", "movie_keyword")),
+    PlanCheck("fetch_movies", _loader(load_sqlite.fetch_movies), full_scans=("movie",)),
+    PlanCheck(
+        "fetch_user_movie_ratings", _loader(load_sqlite.fetch_user_movie_ratings, tmdb_only=True),
+        full_scans=("user_movie_rating",),
+    ),
+    PlanCheck("fetch_tmdb_to_movielens_id_map", _loader(load_sqlite.fetch_tmdb_to_movielens_id_map), full_scans=("movie_link",)),
+    PlanCheck("fetch_movie_titles", _movie_titles),
+    PlanCheck(
+        "movie_scores view", _query("SELECT * FROM movie_scores"),
+        expect=("idx_user_movie_rating_movie_id",), full_scans=("m",),
+    ),
+    PlanCheck("rating_volume daily counts", _daily_counts, expect=("PRIMARY KEY",)),
+    PlanCheck("daily_rating_count refresh", _refresh_daily_rating_count, full_scans=("user_movie_rating",)),
+    PlanCheck("export_movielens_parquet", _export_parquet, full_scans=("user_movie_rating", "user_movie_tag")),
+]
+
+
+def declared_indexes():
+    """Names of the indexes created by create_indexes.sql."""
+    text = (SCHEMA_SQL_PATH / "create_indexes.sql").read_text()
+    return re.findall(r"CREATE\s+INDEX\s+IF\s+NOT\s+EXISTS\s+(\w+)", text, re.IGNORECASE)
+
+
+def redundant_indexes(conn):
+    """Declared indexes whose columns are a prefix of their table's primary key, which already provides them."""
+    redundant = []
+    for index in declared_indexes():
+        row = conn.execute("SELECT tbl_name FROM sqlite_master WHERE type = 'index' AND name = ?", (index,)).fetchone()
+        if row is None:
+            continue
+        columns = [name for _, _, name in conn.execute(f"PRAGMA index_info({index})")]
+        primary_key = [name for _, name, _, _, _, pk in sorted(conn.execute(f"PRAGMA table_info({row[0]})"), key=lambda c: c[5]) if pk]
+        if columns == primary_key[:len(columns)]:
+            redundant.append(index)
+    return redundant
+
+
+def run_checks(db_path, checks=CHECKS):
+    """
+    Runs every check against `db_path`.
+
+    Returns:
+        tuple: (list of result dicts, list of unused or redundant index names)
+    """
+    results, used = [], set()
+    with tempfile.TemporaryDirectory() as cache_dir, patched(multi_hot, MULTI_HOT_CACHE_PATH=Path(cache_dir) / "multi_hot"), \
+            patched(feature_cache, FEATURE_CACHE_PATH=Path(cache_dir) / "features"):
+        for check in checks:
+            error = None
+            # Reopen the shared read connections inside the capture, so their statements are traced
+            close_read_connections()
+            with capture_statements() as statements:
+                start = time.perf_counter()
+                try:
+                    check.run(db_path)
+                except Exception as e:
+                    error = f"error: {type(e).__name__}: {e}"
+                seconds = time.perf_counter() - start
+            plans = []
+            with sqlite3.connect(db_path) as conn:
+                for statement in statements:
+                    if statement.lstrip().upper().startswith(DML):
+                        try:
+                            plans.append((statement, explain(conn, statement)))
+                        except sqlite3.Error:
+                            pass  # the statement failed when run as well
+            check.failures = ([error] if error else []) + plan_failures(check, plans)
+            used.update(index for _, lines in plans for detail, _, _ in lines
+                        for index in re.findall(r"INDEX (\w+)", detail))
+            results.append({"check": check.name, "statements": len(plans), "seconds": round(seconds, 4),
+                            "failures": check.failures})
+        close_read_connections()
+    with sqlite3.connect(db_path) as conn:
+        present = {name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        redundant = redundant_indexes(conn)
+    return results, [index for index in declared_indexes() if index in present and (index not in used or index in redundant)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the query plans of the loaders and processing scripts.")
+    parser.add_argument("--db", type=Path, help="database to check (default: a freshly generated one)")
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db
+        if db_path is None:
+            db_path = Path(tmp) / "movies.db"
+            generate_database(db_path)
+        # The loaders read the view while the materialized copy is out of date; check the usual path
+        movie_features.refresh_movie_rating_features(db_path)
+        results, unused = run_checks(db_path)
+
+    width = max(len(result["check"]) for result in results)
+    for result in results:
+        status = "ok" if not result["failures"] else "FAIL"
+        print(f"{result['check']:<{width}}  {result['statements']:>4} statements  {result['seconds']:>8.3f}s  {status}")
+        for failure in result["failures"]:
+            print(f"    {failure}")
+    if unused:
+        print(f"Unused indexes: {', '.join(unused)}")
+    if args.json:
+        args.json.write_text(json.dumps({"results": results, "unused_indexes": unused}, indent=2))
+    if any(result["failures"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Time and peak memory of loading all ratings with each fetch_user_movie_ratings variant.
+
+Every variant runs in a fresh process, so its peak RSS is its own:
+- pandas: the default pd.read_sql_query path,
+- numpy / pyarrow: compact dtypes (dtype_backend),
+- chunked: per-movie rating counts and means aggregated over compact chunks,
+  never holding more than one chunk.
+
+Peak RSS includes the pages of the database file memory-mapped by the read
+connection (see db_connection.py), which the OS can reclaim at any time.
+
+    python -m benchmarks.ratings_load [--db PATH | --scale 0.1] [--chunksize 1000000] [--json PATH]
+"""
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing
+from pathlib import Path
+import pandas as pd
+from benchmarks.synthetic_data import generate_database
+from data_collection.import_movielens_data import peak_rss_mb
+
+VARIANTS = ("pandas", "numpy", "pyarrow", "chunked")
+
+
+def _load(variant, db_path, chunksize):
+    # Runs in the child process
+    from data_processing import load_sqlite
+    load_sqlite.DB_PATH = db_path
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if variant == "chunked":
+        sums, counts = pd.Series(dtype="float64"), pd.Series(dtype="int64")
+        rows = 0
+        for chunk in load_sqlite.fetch_user_movie_ratings(dtype_backend="numpy", chunksize=chunksize):
+            grouped = chunk.groupby("movie_id")["rating"]
+            sums = sums.add(grouped.sum().astype("float64"), fill_value=0)
+            counts = counts.add(grouped.size(), fill_value=0)
+            rows += len(chunk)
+        result_bytes = int(sums.memory_usage() + counts.memory_usage())
+    else:
+        df = load_sqlite.fetch_user_movie_ratings(dtype_backend=None if variant == "pandas" else variant)
+        rows, result_bytes = len(df), int(df.memory_usage(deep=True).sum())
+    return {"variant": variant, "rows": rows, "seconds": round(time.perf_counter() - start, 3),
+            "peak_rss_mb": round(peak_rss_mb()), "added_rss_mb": round(peak_rss_mb() - baseline),
+            "result_mb": round(result_bytes / 1024 ** 2, 1)}
+
+
+def run_variant(variant, db_path, chunksize):
+    """Loads the ratings one way in a new (spawned, not forked) process and returns its measurements."""
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(_load, (variant, db_path, chunksize))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark loading all ratings with each fetcher variant.")
+    parser.add_argument("--db", type=Path, help="database to read (default: a generated one of --scale)")
+    parser.add_argument("--scale", type=float, default=0.1, help="size of the generated database relative to ml-25m")
+    parser.add_argument("--chunksize", type=int, default=1_000_000)
+    parser.add_argument("--variants", default=",".join(VARIANTS), help=f"comma-separated subset of: {', '.join(VARIANTS)}")
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db
+        if db_path is None:
+            db_path = Path(tmp) / "movies.db"
+            generate_database(db_path, scale=args.scale)
+        results = [run_variant(variant, db_path, args.chunksize) for variant in args.variants.split(",")]
+
+    print(f"\n{'variant':<10} {'rows':>12} {'seconds':>9} {'peak RSS':>10} {'added RSS':>10} {'result':>9}")
+    for r in results:
+        print(f"{r['variant']:<10} {r['rows']:>12,} {r['seconds']:>9.2f} {r['peak_rss_mb']:>7} MB {r['added_rss_mb']:>7} MB {r['result_mb']:>6} MB")
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+End-to-end benchmarks on a synthetic dataset (see synthetic_data.py).
+
+Times the MovieLens import, the Parquet export and the main loaders, and
+appends one JSON line per stage to data/benchmarks/results.jsonl together
+with the git commit, scale and machine, so runs can be compared over time.
+Each stage is printed with its change against the previous run of the same
+stage at the same scale and seed.
+
+    python -m benchmarks.run_benchmarks [--scale 0.01] [--seed 0] [--repeat 3] [--stages import,fetch_scores]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from config.settings import PROJECT_ROOT, BENCHMARK_RESULTS_PATH
+from benchmarks.query_plans import patched
+from benchmarks.synthetic_data import generate_dataset
+from data_collection.import_movielens_data import import_movielens_data, peak_rss_mb
+from data_processing import career_scores, feature_cache, load_sqlite, multi_hot
+from data_processing.db_connection import close_read_connections
+from data_processing.movie_features import refresh_movie_rating_features
+from data_processing.ratings_to_parquet import export_movielens_parquet
+
+LAMBDAS = (0.001, 0.001, 0.001, 0.1)
+
+
+def _reset_engine(db_path):
+    # Cold start: the career score engine reloads its credits on every repeat
+    career_scores._cached_engine.cache_clear()
+
+
+def _clear_multi_hot_cache(db_path):
+    shutil.rmtree(multi_hot.MULTI_HOT_CACHE_PATH, ignore_errors=True)
+
+
+def _warm_feature_cache(db_path):
+    load_sqlite.fetch_predict_success_data(*LAMBDAS)
+
+
+def _export_parquet(db_path):
+    output = Path(db_path).parent / "parquet"
+    shutil.rmtree(output, ignore_errors=True)
+    export_movielens_parquet(db_path, output / "ratings", output / "tags")
+
+
+# name -> (setup run untimed before every repeat, timed function); both take the database path
+STAGES = {
+    "import": (None, None),  # handled by run_import, which needs the CSVs and a fresh copy of the database
+    "parquet_export": (None, _export_parquet),
+    "fetch_scores": (_reset_engine, lambda db_path: load_sqlite.fetch_scores(*LAMBDAS)),
+    "fetch_predict_success_data": (_reset_engine, lambda db_path: load_sqlite.fetch_predict_success_data(*LAMBDAS, cache=False)),
+    "fetch_predict_success_data_cached": (_warm_feature_cache, lambda db_path: load_sqlite.fetch_predict_success_data(*LAMBDAS)),
+    "fetch_one_hot_genres": (_clear_multi_hot_cache, lambda db_path: load_sqlite.fetch_one_hot_genres(30)),
+}
+
+
+def git_revision():
+    """(commit hash, whether the tree has uncommitted changes), or (None, None) outside a git checkout."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        return commit, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def time_repeats(function, db_path, repeat, setup=None):
+    """Seconds taken by `repeat` calls of function(db_path), running setup(db_path) untimed before each."""
+    seconds = []
+    for _ in range(repeat):
+        if setup:
+            setup(db_path)
+        start = time.perf_counter()
+        function(db_path)
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def run_import(base_db, csv_dir, work_db, repeat):
+    """Times import_movielens_data into fresh copies of the TMDb-only database; the last copy is kept in work_db."""
+    seconds = []
+    for _ in range(repeat):
+        close_read_connections()
+        for path in (work_db, Path(f"{work_db}-wal"), Path(f"{work_db}-shm")):
+            path.unlink(missing_ok=True)
+        shutil.copyfile(base_db, work_db)
+        start = time.perf_counter()
+        import_movielens_data(csv_dir, work_db, export_parquet=False)
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def load_results(results_path=BENCHMARK_RESULTS_PATH):
+    """Every recorded benchmark result, oldest first."""
+    if not Path(results_path).exists():
+        return []
+    with open(results_path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def previous_result(results, record):
+    """The latest earlier result of the same stage, scale and seed, or None."""
+    matches = [r for r in results if (r["stage"], r["scale"], r["seed"]) == (record["stage"], record["scale"], record["seed"])]
+    return matches[-1] if matches else None
+
+
+def run_benchmarks(scale=0.01, seed=0, repeat=3, stages=None, results_path=BENCHMARK_RESULTS_PATH):
+    """
+    Generates (or reuses) the dataset for `scale` and `seed`, times the stages and records the results.
+
+    Args:
+        scale (float): Dataset size relative to ml-25m.
+        seed (int): Dataset seed.
+        repeat (int): Timed runs per stage; best and median are recorded with every run.
+        stages (list, optional): Stage names from STAGES. Default: all of them.
+        results_path (Path, optional): JSON lines file to append to, or None to record nothing.
+
+    Returns:
+        list: The result records of this run.
+    """
+    stages = list(STAGES) if stages is None else stages
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}. Choose from {', '.join(STAGES)}")
+
+    base_db, csv_dir = generate_dataset(scale=scale, seed=seed)
+    history = load_results(results_path) if results_path else []
+    commit, dirty = git_revision()
+    common = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"), "commit": commit, "dirty": dirty,
+        "scale": scale, "seed": seed, "python": platform.python_version(), "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+    records = []
+    with tempfile.TemporaryDirectory() as tmp:
+        work_db = Path(tmp) / "movies.db"
+        with patched(load_sqlite, DB_PATH=work_db), patched(multi_hot, MULTI_HOT_CACHE_PATH=Path(tmp) / "multi_hot"), \
+                patched(feature_cache, FEATURE_CACHE_PATH=Path(tmp) / "features"):
+            for stage in stages:
+                print(f"Benchmarking {stage}...")
+                if stage == "import":
+                    seconds = run_import(base_db, csv_dir, work_db, repeat)
+                else:
+                    if not work_db.exists():
+                        run_import(base_db, csv_dir, work_db, 1)
+                        refresh_movie_rating_features(work_db)
+                    setup, function = STAGES[stage]
+                    seconds = time_repeats(function, work_db, repeat, setup)
+                records.append({**common, "stage": stage, "seconds": [round(s, 4) for s in seconds],
+                                "best": round(min(seconds), 4), "median": round(statistics.median(seconds), 4),
+                                "peak_rss_mb": round(peak_rss_mb())})
+        career_scores._cached_engine.cache_clear()
+        close_read_connections()
+
+    if results_path:
+        Path(results_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(results_path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+    print(f"\nScale {scale:g} (seed {seed}), best of {repeat}:")
+    for record in records:
+        previous = previous_result(history, record)
+        change = f"{(record['best'] / previous['best'] - 1) * 100:+.1f}% vs {(previous['commit'] or '?')[:8]}" \
+            if previous and previous["best"] > 0 else "first run"
+        print(f"  {record['stage']:<34} {record['best']:>9.3f}s  median {record['median']:>9.3f}s  ({change})")
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on a synthetic dataset.")
+    parser.add_argument("--scale", type=float, default=0.01, help="dataset size relative to ml-25m (0.01 to 10)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stages", help=f"comma-separated subset of: {', '.join(STAGES)}")
+    parser.add_argument("--results", type=Path, default=BENCHMARK_RESULTS_PATH, help="JSON lines file to append results to")
+    parser.add_argument("--no-record", action="store_true", help="print the timings without recording them")
+    args = parser.parse_args()
+    try:
+        run_benchmarks(args.scale, args.seed, args.repeat, args.stages.split(",") if args.stages else None,
+                       None if args.no_record else args.results)
+    except ValueError as e:
+        sys.exit(str(e))
@@ -0,0 +1,127 @@
+"""
+Parity and latency of the scoring service (pipeline/scoring_service.py).
+
+Trains a model on a synthetic database, then scores stored movies twice: by
+ID, from movie_rating_features_mat and the credit tables, and as TMDb movie
+objects rebuilt from the same rows, with every list shuffled the way TMDb
+responses order them. Both must give the model identical features; any
+difference is reported and fails the run. The batch latency of both paths is
+printed.
+
+    python -m benchmarks.scoring_service [--db PATH | --scale 0.02 --seed 1] [--movies 200] [--repeat 3]
+"""
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+import numpy as np
+from benchmarks.query_plans import patched
+from benchmarks.synthetic_data import generate_database
+from data_processing import load_sqlite, feature_cache, multi_hot
+from data_processing.db_connection import read_connection, close_read_connections
+from data_processing.movie_features import refresh_movie_rating_features
+from data_processing.success_model import train_success_model
+from pipeline.scoring_service import Scorer
+
+
+def tmdb_movie(conn, movie_id, rng):
+    """The TMDb /movie/{id} object (with credits) of a stored movie, its lists in random order."""
+    (title, release_date, budget, revenue, runtime, vote_average, vote_count, popularity), = conn.execute(
+        "SELECT title, release_date, budget, revenue, runtime, vote_average, vote_count, popularity "
+        "FROM movie WHERE movie_id = ?", (movie_id,))
+
+    def shuffled(query):
+        rows = conn.execute(query, (movie_id,)).fetchall()
+        return [rows[i] for i in rng.permutation(len(rows))]
+
+    cast = shuffled("SELECT c.person_id, p.name, c.character, c.cast_order FROM movie_cast AS c "
+                    "JOIN person AS p ON p.person_id = c.person_id WHERE c.movie_id = ?")
+    crew = shuffled("SELECT c.person_id, p.name, c.job, c.department FROM movie_crew AS c "
+                    "JOIN person AS p ON p.person_id = c.person_id WHERE c.movie_id = ?")
+    genres = shuffled("SELECT g.genre_id, g.name FROM movie_genre AS mg JOIN genre AS g ON g.genre_id = mg.genre_id "
+                      "WHERE mg.movie_id = ?")
+    companies = shuffled("SELECT c.company_id, c.name FROM movie_production_company AS mpc "
+                         "JOIN production_company AS c ON c.company_id = mpc.company_id WHERE mpc.movie_id = ?")
+    return {
+        "id": movie_id, "title": title, "release_date": release_date, "budget": budget, "revenue": revenue,
+        "runtime": runtime, "vote_average": vote_average, "vote_count": vote_count, "popularity": popularity,
+        "genres": [{"id": genre_id, "name": name} for genre_id, name in genres],
+        "production_companies": [{"id": company_id, "name": name} for company_id, name in companies],
+        "credits": {
+            "cast": [{"id": person_id, "name": name, "cast_id": i, "character": character, "order": order}
+                     for i, (person_id, name, character, order) in enumerate(cast)],
+            "crew": [{"id": person_id, "name": name, "job": job, "department": department}
+                     for person_id, name, job, department in crew],
+        },
+    }
+
+
+def compare(by_id, by_json):
+    """Descriptions of the differences between the results of the two paths, one per movie."""
+    differences = []
+    for stored, posted in zip(by_id, by_json):
+        changed = [name for name in stored["features"] if stored["features"][name] != posted["features"][name]]
+        if changed or stored["success_probability"] != posted["success_probability"]:
+            differences.append(f"movie {stored['movie_id']}: " + (", ".join(
+                f"{name} {stored['features'][name]!r} != {posted['features'][name]!r}" for name in changed)
+                or "success_probability differs"))
+    return differences
+
+
+def best_seconds(function, repeat):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the scoring service featurizes stored and posted movies alike.")
+    parser.add_argument("--db", type=Path, help="database to copy (default: a generated one of --scale and --seed)")
+    parser.add_argument("--scale", type=float, default=0.02, help="size of the generated database relative to ml-25m")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--movies", type=int, default=200, help="stored movies scored both ways")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path, model_path = Path(tmp) / "movies.db", Path(tmp) / "model.pkl"
+        if args.db is None:
+            generate_database(db_path, scale=args.scale, seed=args.seed)
+        else:
+            shutil.copyfile(args.db, db_path)
+        refresh_movie_rating_features(db_path)
+        with patched(load_sqlite, DB_PATH=db_path), patched(multi_hot, MULTI_HOT_CACHE_PATH=Path(tmp) / "multi_hot"), \
+                patched(feature_cache, FEATURE_CACHE_PATH=Path(tmp) / "features"):
+            train_success_model().save(model_path)
+
+        rng = np.random.default_rng(args.seed)
+        conn = read_connection(db_path)
+        movie_ids = [movie_id for movie_id, in conn.execute(
+            "SELECT movie_id FROM movie_rating_features_mat ORDER BY movie_id")]
+        movie_ids = [int(movie_id) for movie_id in rng.choice(movie_ids, min(args.movies, len(movie_ids)), replace=False)]
+        movies = [tmdb_movie(conn, movie_id, rng) for movie_id in movie_ids]
+
+        scorer = Scorer(model_path, db_path, reload_interval=None)
+        by_id, by_json = scorer.score(movie_ids), scorer.score(movies)
+        id_seconds = best_seconds(lambda: scorer.score(movie_ids), args.repeat)
+        json_seconds = best_seconds(lambda: scorer.score(movies), args.repeat)
+        scorer.close()
+        close_read_connections()
+
+    differences = compare(by_id, by_json)
+    print(f"Scored {len(movie_ids)} movies in {id_seconds * 1000:.1f} ms by ID and {json_seconds * 1000:.1f} ms "
+          f"as TMDb objects (best of {args.repeat})")
+    for difference in differences[:20]:
+        print(f"    {difference}")
+    if differences:
+        sys.exit(f"{len(differences)} of {len(movie_ids)} movies were featurized differently by ID and as TMDb objects")
+    print("Identical features and probabilities for every movie")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Synthetic MovieLens + TMDb data for offline benchmarks.
+
+`generate_dataset` writes a movies.db with the TMDb tables of
+create_tables.sql filled, plus MovieLens-style links/movies/ratings/tags CSVs
+that `import_movielens_data` can load, at a chosen fraction of ml-25m:
+
+- Ratings per movie follow a power law (a few blockbusters, a long tail)
+  and ratings per user a Pareto tail on top of MovieLens' minimum of 20.
+- Cast, crew and production companies have power-law career lengths. Each
+  career covers a contiguous stretch of release dates whose length grows
+  with the number of credits, so past-movie joins look like the real ones.
+- Top-billed cast are the people with the longest careers.
+
+    python -m benchmarks.synthetic_data [--scale 0.01] [--seed 0] [--output DIR]
+"""
+import json
+import sqlite3
+import argparse
+import tempfile
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from config.settings import SCHEMA_SQL_PATH, BENCHMARK_DATA_PATH
+from data_collection.import_movielens_data import import_movielens_data
+
+GENERATOR_VERSION = 1
+SCHEMA_FILES = ["create_tables.sql", "create_indexes.sql", "create_views.sql", "create_triggers.sql"]
+
+# Size of ml-25m; `scale` multiplies all of them
+ML25M = {"users": 162_541, "movies": 62_423, "ratings": 25_000_095, "tags": 1_093_360}
+MOVIELENS_START = np.datetime64("1995-01-09")
+MOVIELENS_END = np.datetime64("2019-11-21")
+
+TMDB_MOVIES_PER_MOVIELENS_MOVIE = 1.5   # the crawl also holds movies nobody rated on MovieLens
+MISSING_TMDB_LINK = 0.002               # share of links.csv rows without a tmdbId
+CAST_PER_MOVIE = 18
+DIRECTORS_PER_MOVIE = 1.1
+WRITERS_PER_MOVIE = 1.8
+OTHER_CREW_PER_MOVIE = 12
+COMPANIES_PER_MOVIE = 2.5
+KEYWORDS_PER_MOVIE = 6
+MAX_CAREER = 400                        # credits
+
+GENRES = ["Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary", "Drama", "Family", "Fantasy",
+          "History", "Horror", "Music", "Mystery", "Romance", "Science Fiction", "TV Movie", "Thriller", "War", "Western"]
+GENRE_WEIGHTS = np.array([9, 5, 3, 12, 6, 4, 18, 4, 4, 2, 6, 2, 3, 7, 4, 2, 9, 1, 1], dtype=float)
+WRITING_JOBS = ["Screenplay", "Writer", "Novel", "Story"]
+OTHER_CREW_JOBS = [("Producer", "Production"), ("Executive Producer", "Production"), ("Editor", "Editing"),
+                   ("Original Music Composer", "Sound"), ("Director of Photography", "Camera"),
+                   ("Casting", "Production"), ("Production Design", "Art"), ("Costume Design", "Costume & Make-Up")]
+
+
+def create_schema(conn):
+    """Runs the schema scripts of data/sql, as the build does."""
+    for name in SCHEMA_FILES:
+        conn.executescript((SCHEMA_SQL_PATH / name).read_text())
+
+
+def _sizes(scale):
+    return {name: max(int(round(count * scale)), 10) for name, count in ML25M.items()}
+
+
+def _unique_ids(rng, n, high):
+    """`n` distinct sorted IDs below `high`, like TMDb's sparse IDs."""
+    return np.sort(rng.choice(np.arange(1, high), n, replace=False))
+
+
+def _power_law_weights(rng, n, exponent):
+    """Selection probabilities proportional to rank ** -exponent, in random order."""
+    weights = np.arange(1, n + 1, dtype=float) ** -exponent
+    return rng.permutation(weights / weights.sum())
+
+
+def _draw(rng, cumulative_weights, size):
+    """Indices drawn with the probabilities whose cumulative sum is given (faster than rng.choice with p)."""
+    return np.minimum(np.searchsorted(cumulative_weights, rng.random(size) * cumulative_weights[-1]), len(cumulative_weights) - 1)
+
+
+def _careers(rng, n_movies, credits, exponent, credits_per_year, movies_per_year):
+    """
+    Spreads about `credits` credits over people with power-law career lengths.
+
+    Movies are identified by their position in release order. Each person
+    gets a Zipf-distributed number of credits spread over a stretch of
+    consecutive releases covering roughly length / credits_per_year years.
+
+    Returns:
+        tuple: (movie position, person number, career length of that person),
+        with repeated (movie, person) pairs removed.
+    """
+    lengths = np.minimum(rng.zipf(exponent, max(credits, 1)), MAX_CAREER)
+    people = int(np.searchsorted(np.cumsum(lengths), credits)) + 1
+    lengths = lengths[:people]
+
+    span = np.minimum(lengths / credits_per_year * movies_per_year * rng.uniform(0.5, 1.5, people), n_movies)
+    start = rng.random(people) * (n_movies - span)
+    person = np.repeat(np.arange(people), lengths)
+    position = (np.repeat(start, lengths) + rng.random(len(person)) * np.repeat(span, lengths)).astype(np.int64)
+    position = np.minimum(position, n_movies - 1)
+
+    key = np.unique(position * people + person)
+    position, person = key // people, key % people
+    return position, person, lengths[person]
+
+
+def _rank_within(movie, priority):
+    """0-based rank of each row within its movie, highest priority first."""
+    order = np.lexsort((-priority, movie))
+    ranks = np.empty(len(movie), dtype=np.int64)
+    sorted_movie = movie[order]
+    starts = np.r_[0, np.flatnonzero(sorted_movie[1:] != sorted_movie[:-1]) + 1]
+    ranks[order] = np.arange(len(movie)) - np.repeat(starts, np.diff(np.r_[starts, len(movie)]))
+    return ranks
+
+
+def _insert(conn, table, columns):
+    """Inserts column arrays in chunks, so 10x datasets never build one huge list of tuples."""
+    placeholders = ", ".join("?" * len(columns))
+    n = len(columns[0])
+    for low in range(0, n, 500_000):
+        rows = zip(*[column[low:low + 500_000].tolist() if isinstance(column, np.ndarray) else column[low:low + 500_000]
+                     for column in columns])
+        conn.executemany(f"INSERT OR IGNORE INTO {table} VALUES ({placeholders})", rows)
+
+
+def generate_tmdb_database(db_path, n_movies, rng):
+    """
+    Creates the schema and fills the TMDb tables (movie, credits, genres, keywords, companies).
+
+    Returns:
+        np.ndarray: TMDb movie IDs, most popular first.
+    """
+    movie_ids = _unique_ids(rng, n_movies, max(n_movies * 12, 1_000_000))
+    # Release dates thicken towards the present, as on TMDb
+    days = (MOVIELENS_END - np.minimum(rng.exponential(15 * 365, n_movies), 110 * 365).astype(int)).astype("datetime64[D]")
+    release_order = np.argsort(days, kind="stable")
+    years = (days.max() - days.min()).astype(int) / 365 + 1
+    movies_per_year = n_movies / years
+
+    popularity = _power_law_weights(rng, n_movies, 1.0)
+    quality = rng.normal(0, 0.8, n_movies)
+    vote_count = np.maximum((popularity / popularity.max() * 30_000 * rng.lognormal(0, 0.5, n_movies)).astype(int), 0)
+    vote_average = np.round(np.clip(6.2 + quality + rng.normal(0, 0.3, n_movies), 1, 10), 1)
+    vote_average[vote_count == 0] = 0
+
+    with sqlite3.connect(db_path) as conn:
+        create_schema(conn)
+        _insert(conn, "movie", [
+            movie_ids, [f"Movie {movie_id}" for movie_id in movie_ids.tolist()], days.astype(str).tolist(),
+            rng.integers(0, 200_000_000, n_movies), rng.integers(0, 600_000_000, n_movies),
+            rng.integers(70, 180, n_movies), vote_average, vote_count, np.round(popularity * n_movies * 10, 3),
+        ])
+        _insert(conn, "genre", [np.arange(1, len(GENRES) + 1), GENRES])
+
+        n_genres = rng.integers(1, 4, n_movies)
+        genre_movie = np.repeat(np.arange(n_movies), n_genres)
+        genre = _draw(rng, np.cumsum(GENRE_WEIGHTS), len(genre_movie)) + 1
+        _insert(conn, "movie_genre", [movie_ids[genre_movie], genre])
+
+        n_keywords = max(int(20_000 * np.sqrt(n_movies / ML25M["movies"])), 100)
+        keyword_ids = _unique_ids(rng, n_keywords, n_keywords * 20)
+        _insert(conn, "keyword", [keyword_ids, [f"keyword {k}" for k in keyword_ids.tolist()]])
+        keyword_movie = np.repeat(np.arange(n_movies), rng.poisson(KEYWORDS_PER_MOVIE, n_movies))
+        keyword = _draw(rng, np.cumsum(_power_law_weights(rng, n_keywords, 1.1)), len(keyword_movie))
+        _insert(conn, "movie_keyword", [movie_ids[keyword_movie], keyword_ids[keyword]])
+
+        # Credits: positions in release order -> movie IDs, person numbers -> sparse person IDs
+        roles = {}
+        for role, per_movie, exponent, per_year in [
+            ("cast", CAST_PER_MOVIE, 2.0, 3), ("director", DIRECTORS_PER_MOVIE, 2.2, 0.7),
+            ("writer", WRITERS_PER_MOVIE, 2.1, 1), ("crew", OTHER_CREW_PER_MOVIE, 1.9, 4),
+            ("company", COMPANIES_PER_MOVIE, 1.7, 10),
+        ]:
+            roles[role] = _careers(rng, n_movies, int(n_movies * per_movie), exponent, per_year, movies_per_year)
+
+        person_offset, person_ids = 0, {}
+        total_people = sum(len(np.unique(roles[role][1])) for role in ("cast", "director", "writer", "crew"))
+        all_person_ids = _unique_ids(rng, total_people, max(total_people * 8, 1_000_000))
+        for role in ("cast", "director", "writer", "crew"):
+            people = np.unique(roles[role][1])
+            person_ids[role] = np.zeros(people.max() + 1, dtype=np.int64)
+            person_ids[role][people] = all_person_ids[person_offset:person_offset + len(people)]
+            person_offset += len(people)
+        _insert(conn, "person", [all_person_ids, [f"Person {p}" for p in all_person_ids.tolist()]])
+
+        position, person, career = roles["cast"]
+        order = _rank_within(position, career + rng.random(len(career)))
+        _insert(conn, "movie_cast", [movie_ids[release_order[position]], person_ids["cast"][person],
+                                     ["Character"] * len(person), order])
+
+        crew_columns = [[], [], [], []]
+        for role, jobs in [("director", [("Director", "Directing")]),
+                           ("writer", [(job, "Writing") for job in WRITING_JOBS]), ("crew", OTHER_CREW_JOBS)]:
+            position, person, _ = roles[role]
+            job = rng.integers(0, len(jobs), len(person))
+            crew_columns[0].append(movie_ids[release_order[position]])
+            crew_columns[1].append(person_ids[role][person])
+            crew_columns[2] += [jobs[j][0] for j in job.tolist()]
+            crew_columns[3] += [jobs[j][1] for j in job.tolist()]
+        _insert(conn, "movie_crew", [np.concatenate(crew_columns[0]), np.concatenate(crew_columns[1]),
+                                     crew_columns[2], crew_columns[3]])
+
+        position, company, _ = roles["company"]
+        company_ids = _unique_ids(rng, company.max() + 1, max((company.max() + 1) * 20, 100_000))
+        _insert(conn, "production_company", [company_ids, [f"Company {c}" for c in company_ids.tolist()]])
+        _insert(conn, "movie_production_company", [movie_ids[release_order[position]], company_ids[company]])
+        conn.commit()
+
+    # Most popular first, so the MovieLens side rates the popular movies most
+    return movie_ids[np.argsort(-popularity, kind="stable")]
+
+
+def write_movielens_csvs(output_dir, tmdb_ids, sizes, rng, chunk_users=20_000):
+    """
+    Writes links.csv, movies.csv, ratings.csv and tags.csv in the ml-25m format.
+
+    MovieLens movie i (1-based, most popular first) links to tmdb_ids[i - 1].
+    Ratings are written in user chunks, so memory does not grow with the scale.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    n_movies, n_users = sizes["movies"], sizes["users"]
+    movielens_ids = np.arange(1, n_movies + 1)
+    links = pd.DataFrame({"movieId": movielens_ids, "imdbId": 100_000 + movielens_ids,
+                          "tmdbId": pd.array(tmdb_ids[:n_movies], dtype="Int64")})
+    links.loc[rng.random(n_movies) < MISSING_TMDB_LINK, "tmdbId"] = pd.NA
+    links.to_csv(output_dir / "links.csv", index=False)
+    pd.DataFrame({"movieId": movielens_ids, "title": [f"Movie {i}" for i in movielens_ids.tolist()],
+                  "genres": rng.choice(GENRES, n_movies)}).to_csv(output_dir / "movies.csv", index=False)
+
+    # Movie i is rated with probability ~ i ** -0.9; users rate 20 + Pareto-distributed movies
+    movie_weights = np.cumsum(np.arange(1, n_movies + 1, dtype=float) ** -0.9)
+    movie_quality = rng.normal(3.5, 0.5, n_movies)
+    activity = 20 + rng.pareto(1.2, n_users) * 20
+    per_user = np.maximum(np.round(activity * sizes["ratings"] / activity.sum()), 1).astype(np.int64)
+    span = (MOVIELENS_END - MOVIELENS_START).astype("timedelta64[s]").astype(np.int64)
+    start_seconds = MOVIELENS_START.astype("datetime64[s]").astype(np.int64)
+    user_start = start_seconds + (np.sqrt(rng.random(n_users)) * span).astype(np.int64)
+    user_active = np.minimum(rng.exponential(365 * 86400, n_users).astype(np.int64), start_seconds + span - user_start)
+    user_bias = rng.normal(0, 0.4, n_users)
+
+    ratings_path = output_dir / "ratings.csv"
+    for low in range(0, n_users, chunk_users):
+        users = np.arange(low, min(low + chunk_users, n_users))
+        user = np.repeat(users, per_user[users])
+        movie = _draw(rng, movie_weights, len(user))
+        # One rating per (user, movie), as in MovieLens
+        _, first = np.unique(user * n_movies + movie, return_index=True)
+        user, movie = user[first], movie[first]
+        score = movie_quality[movie] + user_bias[user] + rng.normal(0, 0.8, len(user))
+        chunk = pd.DataFrame({
+            "userId": user + 1, "movieId": movie + 1, "rating": np.clip(np.round(score * 2) / 2, 0.5, 5.0),
+            "timestamp": user_start[user] + (rng.random(len(user)) * user_active[user]).astype(np.int64),
+        })
+        chunk.to_csv(ratings_path, index=False, mode="w" if low == 0 else "a", header=low == 0)
+
+    # A few users write most tags, mostly on popular movies, from a Zipf vocabulary
+    n_tags = sizes["tags"]
+    tag_user = _draw(rng, np.cumsum(_power_law_weights(rng, n_users, 1.2)), n_tags)
+    vocabulary = max(int(70_000 * np.sqrt(n_tags / ML25M["tags"])), 50)
+    tag = _draw(rng, np.cumsum(np.arange(1, vocabulary + 1, dtype=float) ** -1.05), n_tags)
+    tags = pd.DataFrame({
+        "userId": tag_user + 1, "movieId": _draw(rng, movie_weights, n_tags) + 1, "tag": [f"tag {t}" for t in tag.tolist()],
+        "timestamp": user_start[tag_user] + (rng.random(n_tags) * user_active[tag_user]).astype(np.int64),
+    })
+    tags.sort_values(["userId", "movieId"]).to_csv(output_dir / "tags.csv", index=False)
+
+
+def dataset_path(scale, seed=0):
+    """Default directory of the generated dataset for a scale and seed."""
+    return BENCHMARK_DATA_PATH / f"scale-{scale:g}-seed-{seed}"
+
+
+def generate_dataset(output_dir=None, scale=0.01, seed=0, force=False):
+    """
+    Generates (or reuses) a synthetic dataset: `movies.db` with the TMDb tables and `movielens/*.csv`.
+
+    The MovieLens CSVs are not imported; run `import_movielens_data(output_dir / "movielens",
+    output_dir / "movies.db")` for that. A dataset already generated with the same scale, seed
+    and generator version is reused unless `force` is set.
+
+    Args:
+        output_dir (Path, optional): Where to write. Default: BENCHMARK_DATA_PATH/scale-<scale>-seed-<seed>.
+        scale (float): Size relative to ml-25m, e.g. 0.01 to 10.
+        seed (int): Random seed; the same seed gives the same data.
+        force (bool): Regenerate even if a matching dataset exists.
+
+    Returns:
+        tuple: (database path, MovieLens CSV directory)
+    """
+    output_dir = Path(output_dir) if output_dir is not None else dataset_path(scale, seed)
+    db_path, csv_dir, manifest_path = output_dir / "movies.db", output_dir / "movielens", output_dir / "dataset.json"
+    manifest = {"scale": scale, "seed": seed, "generator_version": GENERATOR_VERSION}
+    if not force and manifest_path.exists() and json.loads(manifest_path.read_text()) == manifest:
+        return db_path, csv_dir
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path.unlink(missing_ok=True)
+    for path in (db_path, output_dir / "movies.db-wal", output_dir / "movies.db-shm"):
+        path.unlink(missing_ok=True)
+
+    rng = np.random.default_rng(seed)
+    sizes = _sizes(scale)
+    tmdb_ids = generate_tmdb_database(db_path, int(sizes["movies"] * TMDB_MOVIES_PER_MOVIELENS_MOVIE), rng)
+    write_movielens_csvs(csv_dir, tmdb_ids, sizes, rng)
+    manifest_path.write_text(json.dumps(manifest))
+    return db_path, csv_dir
+
+
+def generate_database(db_path, scale=0.01, seed=0):
+    """Writes a complete database at `db_path`: synthetic TMDb tables plus the imported MovieLens CSVs."""
+    with tempfile.TemporaryDirectory() as tmp:
+        rng = np.random.default_rng(seed)
+        sizes = _sizes(scale)
+        tmdb_ids = generate_tmdb_database(db_path, int(sizes["movies"] * TMDB_MOVIES_PER_MOVIELENS_MOVIE), rng)
+        write_movielens_csvs(Path(tmp), tmdb_ids, sizes, rng)
+        import_movielens_data(Path(tmp), db_path, export_parquet=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic MovieLens + TMDb dataset.")
+    parser.add_argument("--scale", type=float, default=0.01, help="size relative to ml-25m (0.01 to 10)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="output directory (default: under data/benchmarks/synthetic)")
+    parser.add_argument("--force", action="store_true", help="regenerate even if the dataset exists")
+    args = parser.parse_args()
+    db_path, csv_dir = generate_dataset(args.output, args.scale, args.seed, args.force)
+    print(f"Synthetic dataset: {db_path} and {csv_dir}")
@@ -7,8 +7,52 @@ DB_PATH = PROJECT_ROOT / "data" / "movies.db"
 RAW_DATA_PATH = PROJECT_ROOT / "data" / "raw"
 PROCESSED_DATA_PATH = PROJECT_ROOT / "data" / "processed"
 DATA_PROCESSING_SQL_PATH = PROJECT_ROOT / "src" / "data_processing" / "sql"
+SCHEMA_SQL_PATH = PROJECT_ROOT / "data" / "sql"
 LOG_PATH = PROJECT_ROOT / "logs" / "tmdb_fetch.log"
+BUILD_STATE_PATH = PROJECT_ROOT / "data" / ".build"
+TMDB_RAW_STORE_PATH = RAW_DATA_PATH / "tmdb_raw.db"
+MOVIELENS_ARCHIVE_PATH = RAW_DATA_PATH / "ml-25m.zip"
+RATINGS_PARQUET_PATH = PROCESSED_DATA_PATH / "user_movie_rating"
+TAGS_PARQUET_PATH = PROCESSED_DATA_PATH / "user_movie_tag"
+RATING_MATRIX_PATH = PROCESSED_DATA_PATH / "rating_matrix"
+MULTI_HOT_CACHE_PATH = PROCESSED_DATA_PATH / "multi_hot"
+FEATURE_CACHE_PATH = PROCESSED_DATA_PATH / "predict_success_features"
+SUCCESS_MODEL_PATH = PROCESSED_DATA_PATH / "success_model.pkl"
+BENCHMARK_DATA_PATH = PROJECT_ROOT / "data" / "benchmarks" / "synthetic"
+BENCHMARK_RESULTS_PATH = PROJECT_ROOT / "data" / "benchmarks" / "results.jsonl"
+METRICS_PATH = PROJECT_ROOT / "data" / "metrics"
+
+# SQLite read connections (see data_processing/db_connection.py)
+SQLITE_MMAP_SIZE = 1 << 30          # bytes of the database file memory-mapped by each reader
+SQLITE_CACHE_SIZE = -65536          # page cache per reader; negative values are KiB (64 MB)
+MOVIE_INFO_CACHE_SIZE = 100_000     # movies whose title and year are kept in memory by load_sqlite
+
+# On-disk cache of fetch_predict_success_data frames (see data_processing/feature_cache.py)
+FEATURE_CACHE_MAX_BYTES = 1 << 30   # least recently used frames are evicted beyond this total size
+FEATURE_CACHE_MAX_ENTRIES = 64
+
+# Success scoring service (see pipeline/scoring_service.py)
+SCORING_SERVICE_HOST = "127.0.0.1"
+SCORING_SERVICE_PORT = 8765
+SCORING_MAX_BATCH = 1000            # movies per request
+SCORING_RELOAD_INTERVAL = 60        # seconds between checks for database changes
+
+# MovieLens download settings
+MOVIELENS_URL = "https://files.grouplens.org/datasets/movielens/ml-25m.zip"
+MOVIELENS_CHECKSUM_URL = MOVIELENS_URL + ".md5"
 
 # TMDB API settings
 TMDB_BASE_URL = "https://api.themoviedb.org/3"
 TMDB_REQUEST_PAGE_LIMIT = 500
+TMDB_RESULTS_PER_PAGE = 20
+TMDB_PARTITION_FILL = 0.8           # target share of the page limit when planning date ranges
+TMDB_REQUESTS_PER_SECOND = 40       # sustained request rate shared by the whole crawl
+TMDB_MAX_CONCURRENCY = 20           # upper bound on simultaneous open requests
+TMDB_REQUEST_TIMEOUT = 30           # seconds
+TMDB_MAX_RETRIES = 5
+TMDB_MONTHS_IN_FLIGHT = 6           # months crawled concurrently by save_movies_parallel
+TMDB_PAGES_IN_FLIGHT = 4            # discover pages per month whose movies are being fetched at once
+TMDB_CHANGES_MAX_DAYS = 14          # widest window accepted by /movie/changes
+TMDB_WRITE_BATCH_SIZE = 500         # movies per writer transaction
+TMDB_WRITE_MAX_DELAY = 5            # seconds before a partial batch is committed anyway
+TMDB_WRITE_QUEUE_SIZE = 2000        # fetched movies waiting for the writer before producers block
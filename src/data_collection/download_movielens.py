@@ -0,0 +1,111 @@
+import re
+import sys
+import hashlib
+import requests
+from pathlib import Path
+from config.settings import MOVIELENS_URL, MOVIELENS_CHECKSUM_URL, MOVIELENS_ARCHIVE_PATH
+
+CHUNK_SIZE = 1 << 20  # 1 MB
+
+
+def fetch_expected_md5(checksum_url, timeout=30):
+    """
+    Reads the MD5 digest published next to the archive.
+
+    GroupLens publishes files like "ml-25m.zip.md5" that contain the digest
+    together with the file name; the first 32-digit hex token is taken.
+    """
+    response = requests.get(checksum_url, timeout=timeout)
+    response.raise_for_status()
+    match = re.search(r"\b[0-9a-fA-F]{32}\b", response.text)
+    if not match:
+        raise ValueError(f"No MD5 digest found at {checksum_url}")
+    return match.group(0).lower()
+
+
+def file_md5(path, chunk_size=CHUNK_SIZE):
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def download_movielens(url=MOVIELENS_URL, dest=MOVIELENS_ARCHIVE_PATH, checksum_url=MOVIELENS_CHECKSUM_URL,
+                       expected_md5=None, chunk_size=CHUNK_SIZE, timeout=60):
+    """
+    Streams the MovieLens archive to disk, resuming a partial download and verifying its MD5.
+
+    The archive is written to "<dest>.part" one chunk at a time, so memory use
+    does not depend on the archive size. If a partial file exists, the download
+    continues from its end with an HTTP Range request; servers that ignore the
+    range (200 instead of 206) restart it from scratch. The file is moved to
+    `dest` only once its digest matches, and an existing `dest` with the right
+    digest is not downloaded again.
+
+    Args:
+        url (str): Archive URL; any HTTP server works, including a local one.
+        dest (Path or str): Where the verified archive is stored.
+        checksum_url (str, optional): URL of the published MD5 file. Ignored when
+            `expected_md5` is given; with neither, the archive is not verified.
+        expected_md5 (str, optional): Known MD5 digest of the archive.
+        chunk_size (int): Bytes read from the response per write.
+        timeout (int): Connect/read timeout in seconds.
+
+    Returns:
+        Path: The verified archive.
+
+    Raises:
+        ValueError: If the downloaded archive does not match the expected digest.
+    """
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if expected_md5 is None and checksum_url:
+        expected_md5 = fetch_expected_md5(checksum_url, timeout)
+
+    if dest.exists():
+        if expected_md5 is None or file_md5(dest) == expected_md5:
+            print(f"{dest.name} already downloaded and verified.")
+            return dest
+        print(f"{dest.name} does not match its checksum; downloading again.")
+        dest.unlink()
+
+    part = dest.with_name(dest.name + ".part")
+    offset = part.stat().st_size if part.exists() else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+    with requests.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 416:
+            # The partial file already holds the whole archive
+            pass
+        else:
+            response.raise_for_status()
+            if offset and response.status_code != 206:
+                print("Server ignored the Range request; restarting download.")
+                offset = 0
+            total = offset + int(response.headers.get("Content-Length", 0))
+            written = offset
+            with open(part, "ab" if offset else "wb") as f:
+                for chunk in response.iter_content(chunk_size):
+                    f.write(chunk)
+                    written += len(chunk)
+                    if total:
+                        print(f"Downloaded {written / 1e6:.0f}/{total / 1e6:.0f} MB", end="\r")
+            print()
+
+    if expected_md5 is not None:
+        actual = file_md5(part)
+        if actual != expected_md5:
+            part.unlink()
+            raise ValueError(f"Checksum mismatch for {url}: expected {expected_md5}, got {actual}")
+    part.replace(dest)
+    print(f"Saved {dest}")
+    return dest
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Custom source, e.g. a local file server: checksum is read from "<url>.md5"
+        download_movielens(sys.argv[1], checksum_url=sys.argv[1] + ".md5")
+    else:
+        download_movielens()
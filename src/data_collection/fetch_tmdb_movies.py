@@ -1,10 +1,28 @@
-import sqlite3
-import requests
+import asyncio
+import aiohttp
 import calendar
+import json
 import logging
-from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from config.settings import DB_PATH, TMDB_API_KEY, TMDB_BASE_URL, TMDB_REQUEST_PAGE_LIMIT, LOG_PATH
+import re
+import time
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from config.settings import (
+    DB_PATH, TMDB_API_KEY, TMDB_BASE_URL, TMDB_REQUEST_PAGE_LIMIT, LOG_PATH,
+    TMDB_REQUESTS_PER_SECOND, TMDB_MAX_CONCURRENCY, TMDB_REQUEST_TIMEOUT,
+    TMDB_MAX_RETRIES, TMDB_MONTHS_IN_FLIGHT, TMDB_PAGES_IN_FLIGHT, TMDB_CHANGES_MAX_DAYS,
+    TMDB_RESULTS_PER_PAGE, TMDB_PARTITION_FILL, TMDB_WRITE_BATCH_SIZE, METRICS_PATH
+)
+from data_collection.tmdb_writer import MovieWriter
+from pipeline.metrics import REGISTRY, Progress, export_at_exit, sqlite_connect
+
+REQUEST_SECONDS = REGISTRY.histogram("tmdb_request_seconds", "Latency of each TMDb request attempt that got a response")
+RESPONSES = REGISTRY.counter("tmdb_responses_total", "TMDb responses by status; \"error\" for connection errors and timeouts")
+RETRIES = REGISTRY.counter("tmdb_retries_total", "TMDb requests retried after a 429, a 5xx or a connection error")
+RESPONSE_BYTES = REGISTRY.counter("tmdb_response_bytes_total", "Bytes of successful TMDb response bodies")
+RATE_LIMIT_PAUSE = REGISTRY.counter("tmdb_rate_limit_pause_seconds_total", "Retry-After time the whole crawl was paused for")
+FAILED_REQUESTS = REGISTRY.counter("tmdb_failed_requests_total", "TMDb requests given up on; their data is missing until the next run")
+LOST_PAGES = REGISTRY.counter("tmdb_lost_discover_pages_total", "Discover pages that could not be fetched in this run")
 
 def configure_logging():
     LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
@@ -14,11 +32,229 @@ def configure_logging():
         format='%(asctime)s [%(levelname)s] %(message)s'
     )
 
-def fetch_movies(start_date, end_date, page, min_votes):
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by every request of a crawl.
+
+    Tokens refill continuously at `rate` per second up to `capacity`. A 429
+    response pauses the whole bucket until its Retry-After deadline, so every
+    caller backs off together instead of hammering the API one by one.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        """Blocks all callers for `seconds` and drops any accumulated burst."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+        self._updated = self._paused_until
+
+    async def acquire(self):
+        """Waits until a token is available and consumes it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AdaptiveConcurrency:
+    """
+    Additive-increase / multiplicative-decrease cap on requests in flight.
+
+    The limit grows by one after a full window of successful requests and is
+    halved (at most once per second) whenever the API answers with a 429.
+    """
+
+    def __init__(self, maximum, initial=None, minimum=1):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = initial or maximum
+        self._in_flight = 0
+        self._successes = 0
+        self._last_backoff = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+
+    async def release(self, throttled=False):
+        async with self._condition:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                self._successes = 0
+                if now - self._last_backoff >= 1:
+                    self.limit = max(self.minimum, self.limit // 2)
+                    self._last_backoff = now
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self._successes = 0
+            self._condition.notify_all()
+
+
+def _retry_after_seconds(headers, default):
+    """Parses a Retry-After header given either in seconds or as an HTTP date."""
+    value = headers.get("Retry-After")
+    if value is None:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max((retry_at - datetime.now(retry_at.tzinfo)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+def _endpoint(path):
+    """Metric label of an API path: "/movie/603" -> "/movie/{id}"."""
+    return re.sub(r"/\d+(?=/|$)", "/{id}", path)
+
+
+def report_failures():
+    """Points at the log when requests were given up on, since their data is missing."""
+    if FAILED_REQUESTS.total():
+        print(f"{FAILED_REQUESTS.total():,} requests failed ({LOST_PAGES.total():,} discover pages lost); "
+              f"see {LOG_PATH}. Rerun to fetch what is missing.")
+
+
+def request_summary():
+    """Request counts of this process for the progress line."""
+    responses = {}
+    for sample in RESPONSES.samples():
+        status = sample["labels"]["status"]
+        responses[status] = responses.get(status, 0) + sample["value"]
+    return (f"{sum(responses.values()):,} requests, {responses.get('429', 0):,} x 429, "
+            f"{RETRIES.total():,} retries, {FAILED_REQUESTS.total():,} failed, {RESPONSE_BYTES.total() / 1024 ** 2:,.0f} MB")
+
+
+class TMDbClient:
+    """
+    Asynchronous TMDb API client backed by one pooled HTTP session.
+
+    All requests, discover pages and detail lookups alike, go through a single
+    token bucket and a single adaptive concurrency limit, so the crawl as a
+    whole stays at the API's sustained rate regardless of how many coroutines
+    are issuing requests.
+
+    Usage:
+        async with TMDbClient() as client:
+            data = await client.get("/movie/603")
+    """
+
+    def __init__(self, api_key=TMDB_API_KEY, base_url=TMDB_BASE_URL,
+                 requests_per_second=TMDB_REQUESTS_PER_SECOND,
+                 max_concurrency=TMDB_MAX_CONCURRENCY,
+                 timeout=TMDB_REQUEST_TIMEOUT, max_retries=TMDB_MAX_RETRIES):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.limiter = TokenBucket(requests_per_second)
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self._session = None
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+
+    async def get(self, path, **params):
+        """
+        Performs a rate-limited GET request, retrying throttled and transient failures.
+
+        Args:
+            path (str): API path relative to the base URL, e.g. "/discover/movie".
+            **params: Query string parameters (the API key is added automatically).
+
+        Returns:
+            dict: Parsed JSON response, or None if the request ultimately fails.
+        """
+        url = f"{self.base_url}{path}"
+        # Logged on failure; the request parameters with the API key would leak it into the log file
+        query = dict(params)
+        params = {"api_key": self.api_key, **params}
+        endpoint = _endpoint(path)
+
+        for attempt in range(self.max_retries + 1):
+            backoff = min(2 ** attempt, 60)
+            throttled = False
+            await self.concurrency.acquire()
+            try:
+                await self.limiter.acquire()
+                start = time.perf_counter()
+                async with self._session.get(url, params=params) as response:
+                    RESPONSES.inc(endpoint=endpoint, status=response.status)
+                    if response.status == 200:
+                        body = await response.read()
+                        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+                        RESPONSE_BYTES.inc(len(body), endpoint=endpoint)
+                        return json.loads(body)
+                    REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+                    if response.status == 429:
+                        throttled = True
+                        delay = _retry_after_seconds(response.headers, backoff)
+                        self.limiter.pause(delay)
+                        RATE_LIMIT_PAUSE.inc(delay)
+                        logging.warning(f"Rate limited on {path}; retrying in {delay:.1f}s")
+                    elif response.status >= 500:
+                        delay = backoff
+                        logging.warning(f"Server error {response.status} on {path}; retrying in {delay}s")
+                    else:
+                        FAILED_REQUESTS.inc(endpoint=endpoint, reason=response.status)
+                        logging.error(f"Request failed: {response.status} for {path} {query}")
+                        return None
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                # ValueError: a body that is not JSON
+                RESPONSES.inc(endpoint=endpoint, status="error")
+                delay = backoff
+                logging.warning(f"Request error on {path}: {e!r}; retrying in {delay}s")
+            finally:
+                await self.concurrency.release(throttled)
+
+            if attempt < self.max_retries:
+                RETRIES.inc(endpoint=endpoint)
+            await asyncio.sleep(delay)
+
+        FAILED_REQUESTS.inc(endpoint=endpoint, reason="retries exhausted")
+        logging.error(f"Giving up on {path} {query} after {self.max_retries + 1} attempts")
+        return None
+
+
+async def fetch_movies(client, start_date, end_date, page, min_votes):
     """
     Fetches a list of movies released between start_date and end_date from TMDb.
 
     Args:
+        client (TMDbClient): The client used to issue the request.
         start_date (str): The start date in "YYYY-MM-DD" format.
         end_date (str): The end date in "YYYY-MM-DD" format.
         page (int): The page number to fetch.
@@ -28,344 +264,707 @@ def fetch_movies(start_date, end_date, page, min_votes):
         dict: JSON response containing movie data, or None if the request fails.
     """
     params = {
-        "api_key": TMDB_API_KEY,
         "vote_count.gte": min_votes,
         "primary_release_date.gte": start_date,
         "primary_release_date.lte": end_date,
         "page": page,
         "sort_by": "revenue.desc"
     }
-    response = requests.get(f"{TMDB_BASE_URL}/discover/movie", params=params)
-    return response.json() if response.status_code == 200 else None
+    return await client.get("/discover/movie", **params)
 
 
-def fetch_movie_details(movie_id):
+async def fetch_movie_details(client, movie_id):
     """
-    Fetches detailed movie information.
+    Fetches detailed movie information, including credits and keywords.
 
     Args:
+        client (TMDbClient): The client used to issue the request.
         movie_id (int): The TMDb movie ID.
 
     Returns:
         dict: JSON response with movie details, or None if the request fails.
     """
-    params = {"api_key": TMDB_API_KEY}
-    url = f"{TMDB_BASE_URL}/movie/{movie_id}"
+    return await client.get(f"/movie/{movie_id}", append_to_response="credits,keywords")
 
-    try:
-        response = session.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Request failed: {e}")
-        return None
+
+def _parse_date(date):
+    return datetime.strptime(date, "%Y-%m-%d")
+
+
+def _format_date(date):
+    return date.strftime("%Y-%m-%d")
+
+
+def split_evenly(start_date, end_date, parts):
+    """
+    Splits an inclusive date range into up to `parts` non-overlapping ranges of whole days.
+
+    Returns:
+        list: (start_date, end_date) tuples covering the input range exactly once.
+    """
+    start, end = _parse_date(start_date), _parse_date(end_date)
+    num_days = (end - start).days + 1
+    parts = max(1, min(parts, num_days))
+    bounds = [round(i * num_days / parts) for i in range(parts + 1)]
+    return [
+        (_format_date(start + timedelta(days=lo)), _format_date(start + timedelta(days=hi - 1)))
+        for lo, hi in zip(bounds, bounds[1:])
+    ]
 
 
-def split_date_range(start_date, end_date, min_votes):
+def plan_date_ranges(start_date, end_date, day_counts, capacity):
     """
-    Dynamically splits a date range into smaller chunks if needed to stay within TMDb's 500-page limit.
+    Partitions a date range by observed release density instead of calendar time.
+
+    Consecutive days are grouped greedily so that each range holds at most
+    `capacity` releases according to the histogram. A single day above capacity
+    still gets a range of its own.
 
     Args:
         start_date (str): The starting date in "YYYY-MM-DD" format.
         end_date (str): The ending date in "YYYY-MM-DD" format.
-        min_votes (int): Only movies with at least min_votes votes will be checked.
+        day_counts (list): Observed number of releases for each day of the range.
+        capacity (int): Maximum number of releases per range.
 
     Returns:
-        list: A list of (start_date, end_date) tuples representing smaller time chunks.
+        list: Non-overlapping (start_date, end_date) tuples covering the range.
     """
-    date_ranges = [(start_date, end_date)]
-    while date_ranges:
-        start, end = date_ranges.pop(0)
-        data = fetch_movies(start, end, 1, min_votes)  # Fetch page 1 to check total pages
-        total_pages = data.get("total_pages", 1) if data else 1
+    start = _parse_date(start_date)
+    num_days = (_parse_date(end_date) - start).days + 1
+    ranges = []
+    range_start, total = 0, 0
+    for day in range(num_days):
+        count = day_counts[day] if day < len(day_counts) else 0
+        if total and total + count > capacity:
+            ranges.append((range_start, day - 1))
+            range_start, total = day, 0
+        total += count
+    ranges.append((range_start, num_days - 1))
+    return [(_format_date(start + timedelta(days=lo)), _format_date(start + timedelta(days=hi))) for lo, hi in ranges]
+
+
+async def split_date_range(client, start_date, end_date, min_votes, journal=None):
+    """
+    Splits a date range into non-overlapping chunks that stay within TMDb's 500-page limit.
+
+    If the crawl journal holds a release histogram for the month, the chunks are
+    planned from it without any probe request. Otherwise page 1 of the range is
+    fetched; if it reports too many pages, the range is cut into as many
+    day-aligned pieces as its `total_results` requires and each piece is probed
+    in turn. The page-1 response of every chunk that is kept is yielded with it,
+    so the caller never requests that page twice.
 
-        if total_pages > TMDB_REQUEST_PAGE_LIMIT:
-            midpoint = datetime.strptime(start, "%Y-%m-%d") + (datetime.strptime(end, "%Y-%m-%d") - datetime.strptime(start, "%Y-%m-%d")) / 2
-            mid_date = midpoint.strftime("%Y-%m-%d")
+    Args:
+        client (TMDbClient): The client used to probe the date ranges.
+        start_date (str): The starting date in "YYYY-MM-DD" format.
+        end_date (str): The ending date in "YYYY-MM-DD" format.
+        min_votes (int): Only movies with at least min_votes votes will be checked.
+        journal (CrawlJournal, optional): Source of release histograms and of chunks
+            whose page count is already known from a previous run.
 
-            # Split into two halves
-            date_ranges.append((start, mid_date))
-            date_ranges.append((mid_date, end))
+    Yields:
+        tuple: (start_date, end_date, first_page), where first_page is the page-1 JSON
+        response, or None if the chunk was not probed.
+    """
+    capacity = int(TMDB_REQUEST_PAGE_LIMIT * TMDB_RESULTS_PER_PAGE * TMDB_PARTITION_FILL)
+
+    day_counts = journal.release_histogram(start_date, end_date, min_votes) if journal else None
+    if day_counts is not None:
+        pending = [(start, end, None) for start, end in plan_date_ranges(start_date, end_date, day_counts, capacity)]
+    else:
+        pending = [(start_date, end_date, None)]
+
+    while pending:
+        start, end, first_page = pending.pop(0)
+        if journal:
+            if journal.is_range_complete(start, end, min_votes):
+                continue
+            if journal.range_state(start, end, min_votes)[0] is not None:
+                yield (start, end, None)
+                continue
+
+        first_page = first_page or await fetch_movies(client, start, end, 1, min_votes)
+        total_pages = first_page.get("total_pages", 1) if first_page else 1
+
+        if total_pages > TMDB_REQUEST_PAGE_LIMIT and start != end:
+            parts = max(2, -(-first_page.get("total_results", 0) // capacity))
+            pending[:0] = [(lo, hi, None) for lo, hi in split_evenly(start, end, parts)]
         else:
-            yield (start, end)  # Only return valid, small-enough ranges
+            yield (start, end, first_page)
 
 
-def process_movies_parallel(start_date, end_date, min_votes):
+class CrawlJournal:
     """
-    Fetches movie data within a given date range and retrieves detailed movie information in parallel.
+    Read side of the crawl checkpoint journal stored in the database.
+
+    The journal records which discover (date range, page) chunks and which movie
+    IDs have been fetched and committed. Entries are written by the MovieWriter
+    together with, or after, the data they describe, so the journal never claims
+    more than the database actually holds.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self._conn = sqlite_connect(db_path, timeout=60)
+
+    def close(self):
+        self._conn.close()
+
+    def is_range_complete(self, start_date, end_date, min_votes):
+        row = self._conn.execute("""
+            SELECT completed_at FROM tmdb_discover_range
+            WHERE start_date = ? AND end_date = ? AND min_votes = ?
+            """, (start_date, end_date, min_votes)).fetchone()
+        return bool(row and row[0])
+
+    def range_state(self, start_date, end_date, min_votes):
+        """Returns (total_pages or None, set of committed pages) for a date range."""
+        row = self._conn.execute("""
+            SELECT total_pages FROM tmdb_discover_range
+            WHERE start_date = ? AND end_date = ? AND min_votes = ?
+            """, (start_date, end_date, min_votes)).fetchone()
+        pages = self._conn.execute("""
+            SELECT page FROM tmdb_discover_page
+            WHERE start_date = ? AND end_date = ? AND min_votes = ?
+            """, (start_date, end_date, min_votes)).fetchall()
+        return (row[0] if row else None), {page for (page,) in pages}
+
+    def release_histogram(self, start_date, end_date, min_votes):
+        """
+        Returns per-day release counts for a calendar month, or None if the month was never observed.
+
+        Only exact calendar months have a histogram.
+        """
+        start = _parse_date(start_date)
+        if start.day != 1 or end_date != f"{start_date[:8]}{calendar.monthrange(start.year, start.month)[1]:02d}":
+            return None
+        row = self._conn.execute("""
+            SELECT day_counts FROM tmdb_release_histogram
+            WHERE month = ? AND min_votes = ?
+            """, (start_date[:7], min_votes)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def fetched_movie_ids(self, movie_ids):
+        """Returns the subset of movie_ids whose details are already committed."""
+        movie_ids = list(movie_ids)
+        fetched = set()
+        for i in range(0, len(movie_ids), 900):
+            chunk = movie_ids[i:i + 900]
+            rows = self._conn.execute(
+                f"SELECT movie_id FROM tmdb_movie_checkpoint WHERE movie_id IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            fetched.update(movie_id for (movie_id,) in rows)
+        return fetched
+
+
+def _is_settled(end_date):
+    """A range can only be marked complete once no new releases can land in it."""
+    return end_date < datetime.now().strftime("%Y-%m-%d")
+
+
+async def process_movies_parallel(client, start_date, end_date, min_votes, journal, writer):
+    """
+    Fetches movie data within a given date range and streams detailed movie information to the writer.
+
+    Once page 1 of a range reports `total_pages`, the remaining pages are requested
+    TMDB_PAGES_IN_FLIGHT at a time, and the detail requests for a page's movies
+    start as soon as that page arrives; the next page is only requested once
+    they are done, so pending requests stay bounded however large the range.
+    Each detail response goes straight to the writer queue; nothing is
+    accumulated for the whole range. The client's shared rate limiter decides
+    how fast requests actually go out.
+
+    Ranges, pages and movies already recorded in the crawl journal are skipped,
+    so a restarted crawl only requests the gaps left by the previous run. A page
+    is only journaled once the details of every movie on it were handed to the
+    writer, and the writer commits it after those movies.
 
     Args:
+        client (TMDbClient): The client used to issue requests.
         start_date (str): The start date in "YYYY-MM-DD" format.
         end_date (str): The end date in "YYYY-MM-DD" format.
         min_votes (int): Only movies with at least min_votes votes will be processed.
+        journal (CrawlJournal): The checkpoint journal to resume from.
+        writer (MovieWriter): The writer thread receiving movies and journal entries.
 
     Returns:
-        list: A list of tuples (movie_summary, movie_details).
+        bool: False if the journal already had the whole range, so nothing was requested.
     """
-    movies_to_fetch = []
-
-    for sub_start, sub_end in split_date_range(start_date, end_date, min_votes):
-        page = 1
-        total_pages = None
-
-        while total_pages is None or page <= total_pages:
-            data = fetch_movies(sub_start, sub_end, page, min_votes)
-            if not data:
-                break
+    if journal.is_range_complete(start_date, end_date, min_votes):
+        return False
+
+    start = _parse_date(start_date)
+    day_counts = [0] * ((_parse_date(end_date) - start).days + 1)
+    detail_tasks = {}  # movie ID -> task resolving to True once its details are queued
+    observed_all_pages = True
+    all_complete = True
+
+    async def fetch_and_queue(movie):
+        details = await fetch_movie_details(client, movie["id"])
+        if details:
+            await writer.put_movie(movie, details)
+        return details is not None
+
+    async def process_page(sub_start, sub_end, page, data):
+        """Returns (page fetched, all of its movies queued)."""
+        data = data or await fetch_movies(client, sub_start, sub_end, page, min_votes)
+        if not data:
+            LOST_PAGES.inc()
+            logging.error(f"Lost discover page {page} of {sub_start} to {sub_end}; it is requested again on the next run")
+            return False, False
+        await writer.put_raw_discover(sub_start, sub_end, page, data, min_votes)
+
+        movies = data.get("results", [])
+        for movie in movies:
+            try:
+                day = (_parse_date(movie.get("release_date") or "") - start).days
+            except ValueError:
+                continue
+            if 0 <= day < len(day_counts):
+                day_counts[day] += 1
+
+        already_fetched = journal.fetched_movie_ids(movie["id"] for movie in movies)
+        tasks = []
+        for movie in movies:
+            if movie["id"] in already_fetched:
+                continue
+            if movie["id"] not in detail_tasks:
+                detail_tasks[movie["id"]] = asyncio.ensure_future(fetch_and_queue(movie))
+            tasks.append(detail_tasks[movie["id"]])
+
+        queued = all(await asyncio.gather(*tasks))
+        if queued:
+            await writer.put_checkpoint({"pages": [(sub_start, sub_end, page)]}, min_votes)
+        return True, queued
+
+    async for sub_start, sub_end, first_page in split_date_range(client, start_date, end_date, min_votes, journal):
+        total_pages, done_pages = journal.range_state(sub_start, sub_end, min_votes)
+        if first_page:
+            total_pages = min(first_page.get("total_pages", 1), TMDB_REQUEST_PAGE_LIMIT)
+            await writer.put_checkpoint({"ranges": [(sub_start, sub_end, total_pages, False)]}, min_votes)
+        elif total_pages is None:
+            LOST_PAGES.inc()
+            logging.error(f"Lost discover page 1 of {sub_start} to {sub_end}; it is requested again on the next run")
+            observed_all_pages = all_complete = False
+            continue
+
+        pages = [page for page in range(1, total_pages + 1) if page not in done_pages]
+        logging.info(f"Fetching {len(pages)} of {total_pages} pages from {sub_start} to {sub_end}")
+
+        results = []
+        remaining = iter(pages)
+
+        async def process_pages():
+            # The workers share one iterator, so each page is taken by exactly one of them
+            for page in remaining:
+                results.append(await process_page(sub_start, sub_end, page, first_page if page == 1 else None))
+
+        await asyncio.gather(*(process_pages() for _ in range(min(TMDB_PAGES_IN_FLIGHT, len(pages)))))
+        complete = all(queued for _, queued in results) and _is_settled(sub_end)
+        if complete:
+            await writer.put_checkpoint({"ranges": [(sub_start, sub_end, total_pages, True)]}, min_votes)
+        all_complete = all_complete and complete
+        observed_all_pages = observed_all_pages and not done_pages and all(fetched for fetched, _ in results)
+
+    checkpoint = {}
+    if all_complete and _is_settled(end_date):
+        checkpoint["ranges"] = [(start_date, end_date, None, True)]
+
+    # Every discover page of the range was seen in this run, so its release
+    # density is known exactly; keep it to plan future partitions without probing
+    if observed_all_pages and start.day == 1 and len(day_counts) == calendar.monthrange(start.year, start.month)[1]:
+        checkpoint["histograms"] = [(start_date[:7], day_counts)]
+
+    if checkpoint:
+        await writer.put_checkpoint(checkpoint, min_votes)
+    return True
+
+
+async def crawl_years(client, start_year, end_year, min_votes, reverse=False, db_path=DB_PATH):
+    """
+    Crawls every month in [start_year, end_year] and streams the results into the database.
 
-            if page == 1:
-                total_pages = data.get("total_pages", 1)
-                print(f"Fetching {total_pages} pages from {sub_start} to {sub_end}...")
+    Up to TMDB_MONTHS_IN_FLIGHT months are crawled at once so the request
+    pipeline stays full across month and year boundaries; how fast requests
+    actually go out is governed solely by the client's rate limiter. All
+    months feed a single MovieWriter thread. Months already marked complete in
+    the crawl journal are skipped without a request. A progress line reports
+    months done, movies written, request counts and an ETA.
 
-            movies_to_fetch.extend(data.get("results", []))
-            page += 1
+    Args:
+        client (TMDbClient): The client used to issue requests.
+        start_year (int): The starting year for fetching data.
+        end_year (int): The ending year for fetching data.
+        min_votes (int): Minimum number of votes to include a movie.
+        reverse (bool): If True, fetch data in reverse chronological order.
+        db_path (Path or str): The database to write to.
+    """
+    journal = CrawlJournal(db_path)
+    writer = MovieWriter(db_path)
+    writer.start()
+    months_in_flight = asyncio.Semaphore(TMDB_MONTHS_IN_FLIGHT)
 
-    # Fetch movie details in parallel
-    movie_details_list = []
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_movie = {executor.submit(fetch_movie_details, movie["id"]): movie for movie in movies_to_fetch}
-        for future in as_completed(future_to_movie):
-            movie = future_to_movie[future]
-            movie_details = future.result()
-            if movie_details:
-                movie_details_list.append((movie, movie_details))
+    year_range = range(start_year, end_year + 1)
+    if reverse:
+        year_range = reversed(year_range)
+    months = [(year, month) for year in year_range for month in (range(12, 0, -1) if reverse else range(1, 13))]
+
+    progress = Progress("TMDb crawl", total=len(months), unit="months",
+                        describe=lambda: f"{writer.movies_written:,} movies written | {request_summary()}")
+
+    async def crawl_month(year, month):
+        async with months_in_flight:
+            if month == (12 if reverse else 1):
+                logging.info(f"Processing year: {year}")
+            crawled = await process_movies_parallel(
+                client,
+                f"{year}-{month:02d}-01",
+                f"{year}-{month:02d}-{calendar.monthrange(year, month)[1]}",
+                min_votes,
+                journal,
+                writer
+            )
+            if crawled:
+                progress.advance()
+            else:
+                progress.skip()
 
-    return movie_details_list
+    try:
+        with progress:
+            await asyncio.gather(*(crawl_month(year, month) for year, month in months))
+    finally:
+        journal.close()
+        await asyncio.to_thread(writer.close)
+    report_failures()
 
 
 def save_movies_parallel(start_year, end_year, min_votes, reverse=False):
     """
-    Orchestrates fetching and storing movie data in parallel.
-    
+    Orchestrates fetching and storing movie data concurrently.
+
     Args:
         start_year (int): The starting year for fetching data.
         end_year (int): The ending year for fetching data.
         min_votes (int): Minimum number of votes to include a movie.
         reverse (bool): If True, fetch data in reverse chronological order.
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    async def run():
+        async with TMDbClient() as client:
+            await crawl_years(client, start_year, end_year, min_votes, reverse)
 
-    year_range = range(start_year, end_year + 1)
-    if reverse:
-        year_range = reversed(year_range)
-
-    for year in year_range:
-        print(f"Processing year: {year}")
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_month = {
-                executor.submit(
-                    process_movies_parallel,
-                    f"{year}-{month:02d}-01",
-                    f"{year}-{month:02d}-{calendar.monthrange(year, month)[1]}",
-                    min_votes
-                )
-                for month in range(1, 13)
-            }
-
-            for future in as_completed(future_to_month):
-                movie_details_list = future.result()
-
-                # Prepare batch insert data
-                movie_rows = []
-                genre_rows = set()
-                movie_genre_rows = []
-                keyword_rows = set()
-                movie_keyword_rows = []
-                person_rows = set()
-                movie_cast_rows = []
-                movie_crew_rows = []
-                company_rows = set()
-                movie_production_rows = []
-
-                for movie, details in movie_details_list:
-                    movie_rows.append((
-                        movie["id"], movie["title"], movie.get("release_date"),
-                        details.get("budget"), details.get("revenue"),
-                        details.get("runtime"), movie.get("vote_average"),
-                        movie.get("vote_count"), movie.get("popularity")
-                    ))
-
-                    for genre in details.get("genres", []):
-                        genre_rows.add((genre["id"], genre["name"]))
-                        movie_genre_rows.append((movie["id"], genre["id"]))
-
-                    for keyword in details.get("keywords", {}).get("keywords", []):
-                        keyword_rows.add((keyword["id"], keyword["name"]))
-                        movie_keyword_rows.append((movie["id"], keyword["id"]))
-
-                    for person in details.get("credits", {}).get("cast", []) + details.get("credits", {}).get("crew", []):
-                        person_rows.add((person["id"], person["name"]))
-                        if "cast_id" in person:
-                            movie_cast_rows.append((movie["id"], person["id"], person.get("character"), person.get("order")))
-                        else:
-                            movie_crew_rows.append((movie["id"], person["id"], person.get("job"), person.get("department")))
-
-                    for company in details.get("production_companies", []):
-                        company_rows.add((company["id"], company["name"]))
-                        movie_production_rows.append((movie["id"], company["id"]))
-
-                # Perform batch inserts
-                cursor.executemany("INSERT OR IGNORE INTO movie (movie_id, title, release_date, budget, revenue, runtime, vote_average, vote_count, popularity) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", movie_rows)
-                cursor.executemany("INSERT OR IGNORE INTO genre (genre_id, name) VALUES (?, ?)", list(genre_rows))
-                cursor.executemany("INSERT OR IGNORE INTO movie_genre (movie_id, genre_id) VALUES (?, ?)", movie_genre_rows)
-                cursor.executemany("INSERT OR IGNORE INTO keyword (keyword_id, name) VALUES (?, ?)", list(keyword_rows))
-                cursor.executemany("INSERT OR IGNORE INTO movie_keyword (movie_id, keyword_id) VALUES (?, ?)", movie_keyword_rows)
-                cursor.executemany("INSERT OR IGNORE INTO person (person_id, name) VALUES (?, ?)", list(person_rows))
-                cursor.executemany("INSERT OR IGNORE INTO movie_cast (movie_id, person_id, character, cast_order) VALUES (?, ?, ?, ?)", movie_cast_rows)
-                cursor.executemany("INSERT OR IGNORE INTO movie_crew (movie_id, person_id, job, department) VALUES (?, ?, ?, ?)", movie_crew_rows)
-                cursor.executemany("INSERT OR IGNORE INTO production_company (company_id, name) VALUES (?, ?)", list(company_rows))
-                cursor.executemany("INSERT OR IGNORE INTO movie_production_company (movie_id, company_id) VALUES (?, ?)", movie_production_rows)
-
-                conn.commit() 
-
-    conn.close()
+    asyncio.run(run())
     print("Movie data insertion complete.")
 
 
 
-def save_movie(tmdb_id):
-    """Fetches movie details from TMDb and saves all relevant data to the database."""
-    
-    # Fetch data from TMDb API
-    url = f"{TMDB_BASE_URL}/movie/{tmdb_id}?api_key={TMDB_API_KEY}&append_to_response=credits"
-    response = requests.get(url)
-    
-    if response.status_code != 200:
-        logging.error(f"Error fetching data for TMDB ID {tmdb_id}, response: {response}")
-        return
-    
-    data = response.json()
-
-    # Extract movie details
-    movie_id = data["id"]
-    title = data.get("title")
-    release_date = data.get("release_date")
-    budget = data.get("budget", 0)
-    revenue = data.get("revenue", 0)
-    runtime = data.get("runtime")
-    vote_average = data.get("vote_average", 0.0)
-    vote_count = data.get("vote_count", 0)
-    popularity = data.get("popularity", 0.0)
-
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-
-        # Insert into movie table
-        cursor.execute("""
-            INSERT INTO movie (movie_id, title, release_date, budget, revenue, runtime, vote_average, vote_count, popularity)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(movie_id) DO NOTHING;
-        """, (movie_id, title, release_date, budget, revenue, runtime, vote_average, vote_count, popularity))
-
-        # Insert genres into genre and movie_genre tables
-        for genre in data.get("genres", []):
-            genre_id = genre["id"]
-            genre_name = genre["name"]
-
-            cursor.execute("""
-                INSERT INTO genre (genre_id, name)
-                VALUES (?, ?)
-                ON CONFLICT(genre_id) DO NOTHING;
-            """, (genre_id, genre_name))
-
-            cursor.execute("""
-                INSERT INTO movie_genre (movie_id, genre_id)
-                VALUES (?, ?)
-                ON CONFLICT(movie_id, genre_id) DO NOTHING;
-            """, (movie_id, genre_id))
-
-        # Insert production companies
-        for company in data.get("production_companies", []):
-            company_id = company["id"]
-            company_name = company["name"]
-
-            cursor.execute("""
-                INSERT INTO production_company (company_id, name)
-                VALUES (?, ?)
-                ON CONFLICT(company_id) DO NOTHING;
-            """, (company_id, company_name))
-
-            cursor.execute("""
-                INSERT INTO movie_production_company (movie_id, company_id)
-                VALUES (?, ?)
-                ON CONFLICT(movie_id, company_id) DO NOTHING;
-            """, (movie_id, company_id))
-
-        # Insert cast members
-        credits = data.get("credits", {})
-        for cast in credits.get("cast", []):
-            person_id = cast["id"]
-            name = cast["name"]
-            character = cast.get("character", "")
-            cast_order = cast["order"]
-
-            cursor.execute("""
-                INSERT INTO person (person_id, name)
-                VALUES (?, ?)
-                ON CONFLICT(person_id) DO NOTHING;
-            """, (person_id, name))
-
-            cursor.execute("""
-                INSERT INTO movie_cast (movie_id, person_id, character, cast_order)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(movie_id, person_id) DO NOTHING;
-            """, (movie_id, person_id, character, cast_order))
-
-        # Insert crew members
-        for crew in credits.get("crew", []):
-            person_id = crew["id"]
-            name = crew["name"]
-            job = crew["job"]
-            department = crew["department"]
-
-            cursor.execute("""
-                INSERT INTO person (person_id, name)
-                VALUES (?, ?)
-                ON CONFLICT(person_id) DO NOTHING;
-            """, (person_id, name))
-
-            cursor.execute("""
-                INSERT INTO movie_crew (movie_id, person_id, job, department)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(movie_id, person_id, job) DO NOTHING;
-            """, (movie_id, person_id, job, department))
-
-
-
-def fetch_missing_link_tmdb_ids():
+def fetch_missing_link_tmdb_ids(db_path=DB_PATH):
     """
     Return a list of TMDb IDs that appear in the 'movie_link' table 
     but are missing from the 'movie' table.
 
     This is used to identify movies that are referenced via links 
     (e.g., from the MovieLens dataset) but have not yet been added 
-    to the main 'movie' table in the database.
+    to the main 'movie' table in the database. The anti-join probes the
+    primary key of 'movie' once per link instead of materializing the
+    whole movie ID list for a NOT IN comparison.
     """
-    with sqlite3.connect(DB_PATH) as conn:
+    with sqlite_connect(db_path) as conn:
         cursor = conn.cursor()
 
         result = cursor.execute("""
-            SELECT tmdb_id 
-            FROM movie_link
-            WHERE tmdb_id NOT IN (
-                SELECT movie_id FROM movie
+            SELECT DISTINCT CAST(ml.tmdb_id AS INTEGER)
+            FROM movie_link AS ml
+            WHERE ml.tmdb_id IS NOT NULL
+              AND NOT EXISTS (
+                SELECT 1 FROM movie AS m WHERE m.movie_id = ml.tmdb_id
                 )
             ;""")
 
         return [row[0] for row in result.fetchall()]
 
 
-def ingest_all_tmdb_movies():
+async def backfill_movies(client, movie_ids, db_path=DB_PATH, batch_size=TMDB_WRITE_BATCH_SIZE):
+    """
+    Fetches the given movies concurrently and writes them through a MovieWriter.
+
+    Details are requested with credits and keywords appended and go through the
+    client's shared rate limiter; the writer inserts them with batched
+    executemany calls, one transaction per batch.
+
+    Args:
+        client (TMDbClient): The client used to issue requests.
+        movie_ids (list): TMDb IDs to fetch.
+        db_path (Path or str): The database to write to.
+        batch_size (int): Number of detail requests scheduled at a time.
+
+    Returns:
+        int: The number of movies written.
+    """
+    writer = MovieWriter(db_path)
+    writer.start()
+    progress = Progress("TMDb backfill", total=len(movie_ids), unit="movies", describe=request_summary)
+    try:
+        async def fetch_and_queue(movie_id):
+            details = await fetch_movie_details(client, movie_id)
+            if details:
+                await writer.put_movie(details, details)
+            else:
+                logging.error(f"Error fetching data for TMDB ID {movie_id}")
+            progress.advance()
+
+        with progress:
+            for i in range(0, len(movie_ids), batch_size):
+                await asyncio.gather(*(fetch_and_queue(movie_id) for movie_id in movie_ids[i:i + batch_size]))
+    finally:
+        await asyncio.to_thread(writer.close)
+    report_failures()
+    return writer.movies_written
+
+
+def backfill_missing(db_path=DB_PATH, **client_options):
+    """
+    Loads every movie referenced by 'movie_link' that is missing from 'movie'.
+
+    Args:
+        db_path (Path or str): The database to backfill.
+        **client_options: Passed to TMDbClient.
+
+    Returns:
+        int: The number of movies written.
+    """
+    movie_ids = fetch_missing_link_tmdb_ids(db_path)
+    print(f"Backfilling {len(movie_ids)} linked movies missing from the movie table...")
+
+    async def run():
+        async with TMDbClient(**client_options) as client:
+            return await backfill_movies(client, movie_ids, db_path)
+
+    written = asyncio.run(run())
+    print(f"Backfill complete: {written} movies written.")
+    return written
+
+
+def save_movie(tmdb_id, db_path=DB_PATH):
+    """Fetches movie details from TMDb and saves all relevant data to the database."""
+    async def run():
+        async with TMDbClient() as client:
+            return await backfill_movies(client, [tmdb_id], db_path)
+
+    return asyncio.run(run()) > 0
+
+
+async def fetch_changed_movie_ids(client, start_date, end_date):
+    """
+    Fetches the IDs of movies TMDb reports as changed between two dates.
+
+    The changes endpoint only accepts windows of up to 14 days, so longer
+    periods are queried window by window.
+
+    Args:
+        client (TMDbClient): The client used to issue requests.
+        start_date (str): The start date in "YYYY-MM-DD" format.
+        end_date (str): The end date in "YYYY-MM-DD" format.
+
+    Returns:
+        tuple: (set of TMDb IDs of changed movies, whether every page was fetched).
+    """
+    changed = set()
+    complete = True
+    window_start = datetime.strptime(start_date, "%Y-%m-%d")
+    last = datetime.strptime(end_date, "%Y-%m-%d")
+
+    while window_start <= last:
+        window_end = min(window_start + timedelta(days=TMDB_CHANGES_MAX_DAYS - 1), last)
+        params = {"start_date": window_start.strftime("%Y-%m-%d"), "end_date": window_end.strftime("%Y-%m-%d")}
+
+        first_page = await client.get("/movie/changes", page=1, **params)
+        if first_page:
+            total_pages = first_page.get("total_pages", 1)
+            other_pages = await asyncio.gather(*(
+                client.get("/movie/changes", page=page, **params) for page in range(2, total_pages + 1)
+            ))
+            for data in [first_page, *other_pages]:
+                if data:
+                    changed.update(movie["id"] for movie in data.get("results", []))
+                else:
+                    complete = False
+        else:
+            complete = False
+
+        window_start = window_end + timedelta(days=1)
+
+    return changed, complete
+
+
+async def discover_movie_ids(client, start_date, end_date, min_votes):
+    """
+    Fetches the IDs of all movies released between start_date and end_date.
+
+    Returns:
+        tuple: (set of TMDb IDs of the movies found, whether every page was fetched).
+    """
+    movie_ids = set()
+    complete = True
+    async for sub_start, sub_end, first_page in split_date_range(client, start_date, end_date, min_votes):
+        if not first_page:
+            complete = False
+            continue
+        total_pages = min(first_page.get("total_pages", 1), TMDB_REQUEST_PAGE_LIMIT)
+        other_pages = await asyncio.gather(*(
+            fetch_movies(client, sub_start, sub_end, page, min_votes) for page in range(2, total_pages + 1)
+        ))
+        for data in [first_page, *other_pages]:
+            if data:
+                movie_ids.update(movie["id"] for movie in data.get("results", []))
+            else:
+                complete = False
+    return movie_ids, complete
+
+
+def get_sync_watermark(conn):
+    """
+    Returns the date of the last successful sync in "YYYY-MM-DD" format.
+
+    Before the first sync, the date of the most recent crawl checkpoint is used
+    instead. Returns None if the database has never been crawled.
+    """
+    row = conn.execute("SELECT value FROM tmdb_sync_state WHERE key = 'last_sync'").fetchone()
+    if row:
+        return row[0]
+    row = conn.execute("SELECT MAX(fetched_at) FROM tmdb_movie_checkpoint").fetchone()
+    return row[0][:10] if row and row[0] else None
+
+
+async def sync_movies(client, db_path=DB_PATH, min_votes=0, batch_size=TMDB_WRITE_BATCH_SIZE):
+    """
+    Refreshes movies changed on TMDb since the last sync, plus new releases.
+
+    Movie IDs reported by the changes feed are restricted to movies already in
+    the database; titles released since the watermark are discovered directly.
+    Every selected movie is re-fetched and upserted with its cast, crew, genres,
+    keywords and companies replaced through a MovieWriter. The watermark only
+    advances once the writer has committed everything and every changes and
+    discover page was fetched, so a failed sync is simply retried from the same
+    point. Movies whose details could not be fetched are kept in
+    tmdb_sync_state and re-fetched by the next sync.
+
+    Args:
+        client (TMDbClient): The client used to issue requests.
+        db_path (Path or str): The database to sync.
+        min_votes (int): Minimum number of votes for newly released titles.
+        batch_size (int): Number of detail requests scheduled at a time.
+
+    Returns:
+        int: The number of movies refreshed.
+    """
+    started = datetime.now().strftime("%Y-%m-%d")
+    conn = sqlite_connect(db_path, timeout=60)
+    try:
+        since = get_sync_watermark(conn)
+        if since is None:
+            print("No previous crawl or sync found; run ingest_all_tmdb_movies first.")
+            return 0
+
+        row = conn.execute("SELECT value FROM tmdb_sync_state WHERE key = 'retry_movie_ids'").fetchone()
+        retry = set(json.loads(row[0])) if row else set()
+
+        print(f"Syncing TMDb changes from {since} to {started}...")
+        changed, changes_complete = await fetch_changed_movie_ids(client, since, started)
+        known = set()
+        changed = list(changed)
+        for i in range(0, len(changed), 900):
+            chunk = changed[i:i + 900]
+            rows = conn.execute(f"SELECT movie_id FROM movie WHERE movie_id IN ({','.join('?' * len(chunk))})", chunk)
+            known.update(movie_id for (movie_id,) in rows)
+        released, discover_complete = await discover_movie_ids(client, since, started, min_votes)
+        movie_ids = sorted(known | released | retry)
+        print(f"{len(known)} changed, {len(released)} newly released and {len(retry)} previously failed movies to refresh")
+
+        writer = MovieWriter(db_path)
+        writer.start()
+        progress = Progress("TMDb sync", total=len(movie_ids), unit="movies", describe=request_summary)
+        failed = []
+        try:
+            async def fetch_and_queue(movie_id):
+                details = await fetch_movie_details(client, movie_id)
+                if details:
+                    await writer.put_movie(details, details, replace=True)
+                else:
+                    failed.append(movie_id)
+                progress.advance()
+
+            with progress:
+                for i in range(0, len(movie_ids), batch_size):
+                    await asyncio.gather(*(fetch_and_queue(movie_id) for movie_id in movie_ids[i:i + batch_size]))
+        finally:
+            await asyncio.to_thread(writer.close)
+        refreshed = writer.movies_written
+        report_failures()
+
+        state = {"retry_movie_ids": json.dumps(sorted(failed))}
+        if changes_complete and discover_complete:
+            state["last_sync"] = started
+        else:
+            print(f"Some changes or discover pages could not be fetched; the next sync starts again from {since}")
+        conn.executemany("""
+            INSERT INTO tmdb_sync_state (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            """, state.items())
+        conn.commit()
+    finally:
+        conn.close()
+
+    print(f"Sync complete: {refreshed} movies refreshed" + (f", {len(failed)} to retry." if failed else "."))
+    return refreshed
+
+
+def sync_tmdb_movies(db_path=DB_PATH, **client_options):
+    """
+    Incrementally refreshes the database from TMDb's change feed.
+
+    This is the nightly alternative to `ingest_all_tmdb_movies`: only movies that
+    changed since the last sync and newly released titles are re-fetched.
+
+    Args:
+        db_path (Path or str): The database to sync.
+        **client_options: Passed to TMDbClient (e.g. base_url to point the sync at
+            a local stand-in server).
+
+    Returns:
+        int: The number of movies refreshed.
+    """
+    async def run():
+        async with TMDbClient(**client_options) as client:
+            return await sync_movies(client, db_path)
+
+    return asyncio.run(run())
+
+
+def reset_crawl_journal():
+    """Clears the crawl checkpoint journal so the next crawl starts from scratch."""
+    with sqlite_connect(DB_PATH) as conn:
+        conn.execute("DELETE FROM tmdb_discover_range")
+        conn.execute("DELETE FROM tmdb_discover_page")
+        conn.execute("DELETE FROM tmdb_movie_checkpoint")
+
+
+def ingest_all_tmdb_movies(resume=True):
     """
     Initializes the database with movie data from TMDb,
     starting from the current year and working backwards
     to the year of the first known movie (e.g., 1874).
+
+    Args:
+        resume (bool): If True (default), continue from the crawl journal left by a
+            previous, interrupted run. If False, clear the journal and start over.
     """
     CURRENT_YEAR = datetime.now().year
     EARLIEST_YEAR = 1874
     MIN_VOTES = 0
 
+    if not resume:
+        reset_crawl_journal()
+
     print(f"Starting data fetch from {CURRENT_YEAR} back to {EARLIEST_YEAR}...")
     save_movies_parallel(
         start_year=EARLIEST_YEAR,
@@ -375,6 +974,15 @@ def ingest_all_tmdb_movies():
     )
 
 if __name__ == "__main__":
+    import sys
+
     configure_logging()
-    session = requests.Session()
-    ingest_all_tmdb_movies()
+    if "sync" in sys.argv[1:]:
+        export_at_exit(METRICS_PATH / "tmdb_sync")
+        sync_tmdb_movies()
+    elif "backfill" in sys.argv[1:]:
+        export_at_exit(METRICS_PATH / "tmdb_backfill")
+        backfill_missing()
+    else:
+        export_at_exit(METRICS_PATH / "tmdb_crawl")
+        ingest_all_tmdb_movies()
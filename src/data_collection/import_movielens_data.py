@@ -1,42 +1,226 @@
-import sqlite3
-import csv
+import re
+import sys
+import time
+import resource
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+import numpy as np
 import pandas as pd
-from config.settings import DB_PATH, RAW_DATA_PATH
+from config.settings import DB_PATH, MOVIELENS_ARCHIVE_PATH, SCHEMA_SQL_PATH, METRICS_PATH
+from data_processing.ratings_to_parquet import export_movielens_parquet
+from pipeline.metrics import ROWS_WRITTEN, export_at_exit, sqlite_connect
 
+CHUNK_SIZE = 500_000
 
-# Load CSVs
-ratings = pd.read_csv(RAW_DATA_PATH / "ratings.csv")
-tags = pd.read_csv(RAW_DATA_PATH / "tags.csv")
-links = pd.read_csv(RAW_DATA_PATH / "links.csv")
+RATING_DTYPES = {"userId": "int32", "movieId": "int32", "rating": "float32", "timestamp": "int64"}
+TAG_DTYPES = {"userId": "int32", "movieId": "int32", "tag": "object", "timestamp": "int64"}
+LINK_DTYPES = {"movieId": "int32", "imdbId": "int64", "tmdbId": "Int64"}
 
-# Merge with links to get tmdb_id
-ratings = ratings.merge(links[['movieId', 'tmdbId']], on='movieId', how='inner')
-ratings = ratings.dropna(subset=['tmdbId'])
-ratings['tmdbId'] = ratings['tmdbId'].astype(int)
-ratings = ratings.rename(columns={'tmdbId': 'movie_id', 'userId': 'user_id'})
-ratings = ratings.drop(columns='movieId')
-ratings = ratings.drop_duplicates(subset=["user_id", "movie_id", "timestamp"])
+BULK_LOAD_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-131072",  # 128 MB
+    "PRAGMA temp_store=MEMORY",
+]
 
-tags = tags.merge(links[['movieId', 'tmdbId']], on='movieId', how='inner')
-tags = tags.dropna(subset=['tmdbId'])
-tags['tmdbId'] = tags['tmdbId'].astype(int)
-tags = tags.rename(columns={'tmdbId': 'movie_id', 'userId': 'user_id'})
-tags = tags.drop(columns='movieId')
 
-# Create unique tag IDs
-tags['tag_id'] = range(1, len(tags) + 1)
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
 
 
-# Insert data
-with sqlite3.connect(DB_PATH) as conn:
-	ratings[['user_id', 'movie_id', 'rating', 'timestamp']].to_sql(
-	    "user_movie_rating", conn, if_exists="append", index=False
-	)
+def table_index_statements(table):
+    """Returns (index name, CREATE INDEX statement) pairs for `table` from create_indexes.sql."""
+    statements = (SCHEMA_SQL_PATH / "create_indexes.sql").read_text().split(";")
+    pattern = re.compile(rf"CREATE\s+INDEX\s+IF\s+NOT\s+EXISTS\s+(\w+)\s+ON\s+{table}\s*\(", re.IGNORECASE)
+    return [(match.group(1), statement.strip()) for statement in statements if (match := pattern.search(statement))]
 
-	tags[['tag_id', 'user_id', 'movie_id', 'tag', 'timestamp']].to_sql(
-	    "user_movie_tag", conn, if_exists="append", index=False
-	)
 
-	links.rename(columns={"movieId": "movielens_id", "tmdbId": "tmdb_id", "imdbId": "imdb_id"}).to_sql(
-	    "movie_link", conn, if_exists="replace", index=False
-	)
+@contextmanager
+def open_source_csv(source, name):
+    """
+    Opens one MovieLens CSV as a binary stream.
+
+    `source` is either the downloaded zip archive, whose member ending in
+    "/<name>" is streamed without being extracted, or a directory of CSVs.
+    """
+    source = Path(source)
+    if source.is_dir():
+        with open(source / name, "rb") as f:
+            yield f
+        return
+    with zipfile.ZipFile(source) as archive:
+        member = next(member for member in archive.namelist() if member == name or member.endswith("/" + name))
+        with archive.open(member) as f:
+            yield f
+
+
+def report(label, rows, start, table=None):
+    if table is not None:
+        ROWS_WRITTEN.inc(rows, table=table)
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {rows:,} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s), peak RSS {peak_rss_mb():.0f} MB")
+
+
+def import_links(conn, links_csv):
+    """
+    Replaces movie_link with links.csv and returns a movieId -> tmdbId lookup array.
+
+    The lookup is a dense array indexed by MovieLens ID (-1 where no TMDb ID is
+    known), which maps a whole chunk of ratings with one vectorized take.
+    """
+    links = pd.read_csv(links_csv, dtype=LINK_DTYPES)
+
+    conn.execute("DELETE FROM movie_link")
+    conn.executemany(
+        "INSERT INTO movie_link (movielens_id, tmdb_id, imdb_id) VALUES (?, ?, ?)",
+        zip(links["movieId"].tolist(),
+            [None if pd.isna(tmdb_id) else int(tmdb_id) for tmdb_id in links["tmdbId"]],
+            links["imdbId"].tolist())
+    )
+
+    lookup = np.full(int(links["movieId"].max()) + 1, -1, dtype=np.int64)
+    known = links.dropna(subset=["tmdbId"])
+    lookup[known["movieId"].to_numpy()] = known["tmdbId"].to_numpy(dtype=np.int64)
+    ROWS_WRITTEN.inc(len(links), table="movie_link")
+    return lookup
+
+
+def map_to_tmdb(chunk, lookup):
+    """Replaces the movieId column of a chunk with TMDb IDs, dropping movies without one."""
+    movie_ids = chunk["movieId"].to_numpy()
+    in_range = movie_ids < len(lookup)
+    tmdb_ids = np.full(len(movie_ids), -1, dtype=np.int64)
+    tmdb_ids[in_range] = lookup[movie_ids[in_range]]
+    keep = tmdb_ids >= 0
+    chunk = chunk.loc[keep]
+    return chunk.assign(movie_id=tmdb_ids[keep]).drop(columns="movieId")
+
+
+def import_ratings(conn, ratings_csv, lookup, chunk_size=CHUNK_SIZE):
+    """
+    Streams ratings.csv into user_movie_rating in chunks with compact dtypes.
+
+    Duplicate (user_id, movie_id, timestamp) rows, which appear when several
+    MovieLens IDs map to the same TMDb ID, are dropped by the primary key.
+
+    Returns:
+        int: Number of rows read.
+    """
+    start = time.perf_counter()
+    rows = 0
+    for chunk in pd.read_csv(ratings_csv, dtype=RATING_DTYPES, chunksize=chunk_size):
+        chunk = map_to_tmdb(chunk, lookup)
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO user_movie_rating (user_id, movie_id, rating, timestamp) VALUES (?, ?, ?, ?)",
+                zip(chunk["userId"].tolist(), chunk["movie_id"].tolist(), chunk["rating"].tolist(), chunk["timestamp"].tolist())
+            )
+        rows += len(chunk)
+        print(f"  {rows:,} ratings...", end="\r")
+    report("Ratings", rows, start, table="user_movie_rating")
+    return rows
+
+
+def import_tags(conn, tags_csv, lookup, chunk_size=CHUNK_SIZE):
+    """
+    Streams tags.csv into user_movie_tag, numbering tags sequentially from 1.
+
+    Returns:
+        int: Number of rows read.
+    """
+    start = time.perf_counter()
+    rows = 0
+    for chunk in pd.read_csv(tags_csv, dtype=TAG_DTYPES, chunksize=chunk_size):
+        chunk = map_to_tmdb(chunk, lookup)
+        tag_ids = range(rows + 1, rows + len(chunk) + 1)
+        with conn:
+            conn.executemany(
+                "INSERT INTO user_movie_tag (tag_id, user_id, movie_id, tag, timestamp) VALUES (?, ?, ?, ?, ?)",
+                zip(tag_ids, chunk["userId"].tolist(), chunk["movie_id"].tolist(), chunk["tag"].tolist(), chunk["timestamp"].tolist())
+            )
+        rows += len(chunk)
+    report("Tags", rows, start, table="user_movie_tag")
+    return rows
+
+
+def refresh_daily_rating_count(conn):
+    """Rebuilds the daily_rating_count aggregate (ratings per movie per UTC day) from user_movie_rating."""
+    start = time.perf_counter()
+    with conn:
+        conn.execute("DELETE FROM daily_rating_count")
+        rows = conn.execute("""
+            INSERT INTO daily_rating_count (day, movie_id, rating_count)
+            SELECT date(timestamp, 'unixepoch') AS day, movie_id, COUNT(*)
+            FROM user_movie_rating
+            GROUP BY day, movie_id
+            """).rowcount
+    report("Daily rating counts", rows, start, table="daily_rating_count")
+
+
+def import_movielens_data(source=MOVIELENS_ARCHIVE_PATH, db_path=DB_PATH, chunk_size=CHUNK_SIZE, export_parquet=True):
+    """
+    Imports the MovieLens links, ratings and tags CSVs into the database.
+
+    The CSVs are streamed straight out of the downloaded archive (see
+    download_movielens.py); nothing is extracted to disk.
+
+    Ratings and tags are read in chunks with explicit compact dtypes and mapped
+    to TMDb IDs through a lookup array, so memory stays bounded by the chunk
+    size rather than the file size. Existing ratings and tags are replaced. The
+    user_movie_rating indexes from create_indexes.sql are dropped for the load
+    and rebuilt once at the end, which is much cheaper than maintaining them
+    row by row. The daily_rating_count aggregate and the partitioned Parquet
+    copies of ratings and tags are then regenerated so they never drift from
+    the database.
+
+    Args:
+        source (Path or str): The MovieLens zip archive, or a directory containing
+            links.csv, ratings.csv and tags.csv.
+        db_path (Path or str): The database to import into.
+        chunk_size (int): Number of CSV rows per chunk and per transaction.
+        export_parquet (bool): Refresh the Parquet ratings/tags store afterwards.
+    """
+    start = time.perf_counter()
+    conn = sqlite_connect(db_path, timeout=60)
+    for pragma in BULK_LOAD_PRAGMAS:
+        conn.execute(pragma)
+
+    try:
+        with conn:
+            with open_source_csv(source, "links.csv") as f:
+                lookup = import_links(conn, f)
+
+        rating_indexes = table_index_statements("user_movie_rating")
+        with conn:
+            for name, _ in rating_indexes:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+            conn.execute("DELETE FROM user_movie_rating")
+            conn.execute("DELETE FROM user_movie_tag")
+
+        with open_source_csv(source, "ratings.csv") as f:
+            import_ratings(conn, f, lookup, chunk_size)
+        with open_source_csv(source, "tags.csv") as f:
+            import_tags(conn, f, lookup, chunk_size)
+
+        index_start = time.perf_counter()
+        with conn:
+            for _, statement in rating_indexes:
+                conn.execute(statement)
+        print(f"Rebuilt {len(rating_indexes)} user_movie_rating indexes in {time.perf_counter() - index_start:.1f}s")
+
+        refresh_daily_rating_count(conn)
+    finally:
+        conn.close()
+
+    if export_parquet:
+        export_movielens_parquet(db_path)
+
+    print(f"MovieLens import finished in {time.perf_counter() - start:.1f}s, peak RSS {peak_rss_mb():.0f} MB")
+
+
+if __name__ == "__main__":
+    export_at_exit(METRICS_PATH / "import_movielens")
+    import_movielens_data(*sys.argv[1:2])
@@ -0,0 +1,87 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from config.settings import DB_PATH, METRICS_PATH, TMDB_RAW_STORE_PATH
+from data_collection.tmdb_raw_store import RawStore
+from data_collection.tmdb_writer import movie_detail_rows, insert_rows
+from pipeline.metrics import ROWS_WRITTEN, export_at_exit, sqlite_connect
+
+
+def parse_raw_chunk(raw_store_path, low, high):
+    """
+    Decompresses and parses the latest detail response of every movie in [low, high].
+
+    Runs in a worker process; returns the rows produced by `movie_detail_rows`.
+    """
+    store = RawStore(raw_store_path, read_only=True)
+    try:
+        return movie_detail_rows([(details, details) for details in store.latest_movie_details(low, high)])
+    finally:
+        store.close()
+
+
+def rebuild_from_raw_store(db_path=DB_PATH, raw_store_path=TMDB_RAW_STORE_PATH, workers=None, chunk_size=2000):
+    """
+    Rebuilds the TMDb relational rows of every movie in the raw landing store.
+
+    Decompression, JSON parsing and row building run in a process pool, one
+    chunk of movie IDs per task; the parent process is the only writer and
+    replaces each chunk's movies in its own transaction as results arrive. No
+    request is sent to TMDb, so a schema change costs local CPU time only.
+
+    The latest stored detail response of each movie is used for all movie
+    fields, so values reflect the most recent fetch of every movie. Movies the
+    store has no response for (e.g. fetched before it existed) keep their rows.
+
+    Args:
+        db_path (Path or str): The database whose TMDb tables are rebuilt.
+        raw_store_path (Path or str): The raw landing store to load from.
+        workers (int, optional): Number of worker processes (default: CPU count).
+        chunk_size (int): Number of movies parsed per task.
+
+    Returns:
+        int: The number of movies loaded.
+    """
+    start = time.perf_counter()
+    store = RawStore(raw_store_path, read_only=True)
+    try:
+        bounds = store.movie_id_bounds(chunk_size)
+    finally:
+        store.close()
+
+    conn = sqlite_connect(db_path, timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    loaded = 0
+    try:
+        def write_chunk(future):
+            nonlocal loaded
+            rows = future.result()
+            with conn:
+                insert_rows(conn.cursor(), rows, replace=True)
+            for table, table_rows in rows.items():
+                ROWS_WRITTEN.inc(len(table_rows), table=table)
+            loaded += len(rows["movie"])
+            print(f"Loaded {loaded} movies...", end="\r")
+
+        workers = workers or os.cpu_count()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Keep a bounded window of chunks in flight so parsed rows never pile up
+            pending = deque()
+            for low, high in bounds:
+                pending.append(executor.submit(parse_raw_chunk, raw_store_path, low, high))
+                if len(pending) >= 2 * workers:
+                    write_chunk(pending.popleft())
+            while pending:
+                write_chunk(pending.popleft())
+    finally:
+        conn.close()
+
+    print(f"Rebuilt TMDb tables from {loaded} raw responses in {time.perf_counter() - start:.1f}s")
+    return loaded
+
+
+if __name__ == "__main__":
+    export_at_exit(METRICS_PATH / "load_tmdb_raw")
+    rebuild_from_raw_store()
@@ -0,0 +1,101 @@
+import sqlite3
+import json
+import zlib
+from datetime import datetime
+from pathlib import Path
+from config.settings import TMDB_RAW_STORE_PATH
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS raw_movie_details (
+    movie_id INTEGER NOT NULL,
+    fetched_at TEXT NOT NULL,
+    body BLOB NOT NULL,
+    PRIMARY KEY (movie_id, fetched_at)
+);
+
+CREATE TABLE IF NOT EXISTS raw_discover_page (
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    min_votes INTEGER NOT NULL,
+    page INTEGER NOT NULL,
+    fetched_at TEXT NOT NULL,
+    body BLOB NOT NULL,
+    PRIMARY KEY (start_date, end_date, min_votes, page, fetched_at)
+);
+"""
+
+
+def compress_json(data):
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def decompress_json(body):
+    return json.loads(zlib.decompress(body))
+
+
+class RawStore:
+    """
+    Landing zone for raw TMDb responses, stored as zlib-compressed JSON.
+
+    Every detail response is kept under (movie_id, fetched_at) and every
+    discover page under (date range, min_votes, page, fetched_at), so the
+    relational tables can be rebuilt locally (see load_tmdb_raw.py) after a
+    schema change instead of crawling TMDb again. The store is a separate
+    SQLite file and only ever appended to.
+
+    Args:
+        path (Path or str): Location of the store.
+        read_only (bool): Open an existing store without write access.
+    """
+
+    def __init__(self, path=TMDB_RAW_STORE_PATH, read_only=False):
+        if read_only:
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        else:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(path, timeout=60)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def add_movie_details(self, details_list, fetched_at=None):
+        """Stores detail responses; does not commit."""
+        fetched_at = fetched_at or datetime.now().isoformat(timespec="seconds")
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO raw_movie_details (movie_id, fetched_at, body) VALUES (?, ?, ?)",
+            ((details["id"], fetched_at, compress_json(details)) for details in details_list)
+        )
+
+    def add_discover_pages(self, pages, min_votes, fetched_at=None):
+        """Stores discover responses given as (start_date, end_date, page, data) tuples; does not commit."""
+        fetched_at = fetched_at or datetime.now().isoformat(timespec="seconds")
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO raw_discover_page (start_date, end_date, min_votes, page, fetched_at, body) VALUES (?, ?, ?, ?, ?, ?)",
+            [(start, end, min_votes, page, fetched_at, compress_json(data)) for start, end, page, data in pages]
+        )
+
+    def commit(self):
+        self.conn.commit()
+
+    def movie_id_bounds(self, chunk_size):
+        """
+        Splits the stored movie IDs into contiguous (low, high) ranges of about chunk_size movies each.
+        """
+        movie_ids = [row[0] for row in self.conn.execute("SELECT DISTINCT movie_id FROM raw_movie_details ORDER BY movie_id")]
+        return [(movie_ids[i], movie_ids[min(i + chunk_size, len(movie_ids)) - 1]) for i in range(0, len(movie_ids), chunk_size)]
+
+    def latest_movie_details(self, low, high):
+        """Yields the most recently fetched detail response of each movie with low <= movie_id <= high."""
+        rows = self.conn.execute("""
+            SELECT body
+            FROM raw_movie_details AS r
+            WHERE r.movie_id BETWEEN ? AND ?
+              AND r.fetched_at = (
+                SELECT MAX(fetched_at) FROM raw_movie_details WHERE movie_id = r.movie_id
+              )
+            """, (low, high))
+        for (body,) in rows:
+            yield decompress_json(body)
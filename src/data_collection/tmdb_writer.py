@@ -0,0 +1,333 @@
+import asyncio
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from config.settings import DB_PATH, TMDB_RAW_STORE_PATH, TMDB_WRITE_BATCH_SIZE, TMDB_WRITE_MAX_DELAY, TMDB_WRITE_QUEUE_SIZE
+from data_collection.tmdb_raw_store import RawStore
+from pipeline.metrics import REGISTRY, ROWS_WRITTEN, sqlite_connect
+
+COMMIT_SECONDS = REGISTRY.histogram("tmdb_writer_commit_seconds", "Time of each MovieWriter batch: inserts, journal and commit")
+QUEUE_SIZE = REGISTRY.gauge("tmdb_writer_queue_size", "Items waiting for the MovieWriter at its last commit")
+
+MOVIE_CHILD_TABLES = ["movie_genre", "movie_keyword", "movie_cast", "movie_crew", "movie_production_company"]
+
+PARENT_TABLES = {
+    "genre": "INSERT OR IGNORE INTO genre (genre_id, name) VALUES (?, ?)",
+    "keyword": "INSERT OR IGNORE INTO keyword (keyword_id, name) VALUES (?, ?)",
+    "person": "INSERT OR IGNORE INTO person (person_id, name) VALUES (?, ?)",
+    "production_company": "INSERT OR IGNORE INTO production_company (company_id, name) VALUES (?, ?)",
+}
+
+
+def movie_detail_rows(movie_details_list):
+    """
+    Converts (movie_summary, movie_details) pairs into rows for every TMDb table.
+
+    Args:
+        movie_details_list (list): A list of tuples (movie_summary, movie_details).
+
+    Returns:
+        dict: Table name -> list of row tuples. Parent tables (genre, keyword,
+        person, production_company) map to de-duplicated rows.
+    """
+    movie_rows = []
+    genre_rows = set()
+    movie_genre_rows = []
+    keyword_rows = set()
+    movie_keyword_rows = []
+    person_rows = set()
+    movie_cast_rows = []
+    movie_crew_rows = []
+    company_rows = set()
+    movie_production_rows = []
+
+    for movie, details in movie_details_list:
+        movie_rows.append((
+            movie["id"], movie["title"], movie.get("release_date"),
+            details.get("budget"), details.get("revenue"),
+            details.get("runtime"), movie.get("vote_average"),
+            movie.get("vote_count"), movie.get("popularity")
+        ))
+
+        for genre in details.get("genres", []):
+            genre_rows.add((genre["id"], genre["name"]))
+            movie_genre_rows.append((movie["id"], genre["id"]))
+
+        for keyword in details.get("keywords", {}).get("keywords", []):
+            keyword_rows.add((keyword["id"], keyword["name"]))
+            movie_keyword_rows.append((movie["id"], keyword["id"]))
+
+        for person in details.get("credits", {}).get("cast", []) + details.get("credits", {}).get("crew", []):
+            person_rows.add((person["id"], person["name"]))
+            if "cast_id" in person:
+                movie_cast_rows.append((movie["id"], person["id"], person.get("character"), person.get("order")))
+            else:
+                movie_crew_rows.append((movie["id"], person["id"], person.get("job"), person.get("department")))
+
+        for company in details.get("production_companies", []):
+            company_rows.add((company["id"], company["name"]))
+            movie_production_rows.append((movie["id"], company["id"]))
+
+    return {
+        "movie": movie_rows,
+        "genre": list(genre_rows),
+        "movie_genre": movie_genre_rows,
+        "keyword": list(keyword_rows),
+        "movie_keyword": movie_keyword_rows,
+        "person": list(person_rows),
+        "movie_cast": movie_cast_rows,
+        "movie_crew": movie_crew_rows,
+        "production_company": list(company_rows),
+        "movie_production_company": movie_production_rows,
+    }
+
+
+def insert_rows(cursor, rows, replace=False):
+    """
+    Batch inserts rows produced by `movie_detail_rows`.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the target database.
+        rows (dict): Table name -> list of row tuples.
+        replace (bool): If True, existing movie rows are updated and their cast, crew,
+            genre, keyword and company rows are replaced. Otherwise existing rows are
+            left untouched.
+    """
+    if replace:
+        movie_ids = [(row[0],) for row in rows["movie"]]
+        for table in MOVIE_CHILD_TABLES:
+            cursor.executemany(f"DELETE FROM {table} WHERE movie_id = ?", movie_ids)
+        # An update then an insert rather than an upsert: the upsert's conflict policy would override the
+        # INSERT OR IGNORE of the movie_feature_dirty triggers and fail on movies already marked dirty
+        cursor.executemany("""
+            UPDATE movie SET title = ?, release_date = ?, budget = ?, revenue = ?, runtime = ?,
+                vote_average = ?, vote_count = ?, popularity = ?
+            WHERE movie_id = ?
+            """, [row[1:] + row[:1] for row in rows["movie"]])
+    cursor.executemany("INSERT OR IGNORE INTO movie (movie_id, title, release_date, budget, revenue, runtime, vote_average, vote_count, popularity) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows["movie"])
+
+    for table, statement in PARENT_TABLES.items():
+        cursor.executemany(statement, rows[table])
+    cursor.executemany("INSERT OR IGNORE INTO movie_genre (movie_id, genre_id) VALUES (?, ?)", rows["movie_genre"])
+    cursor.executemany("INSERT OR IGNORE INTO movie_keyword (movie_id, keyword_id) VALUES (?, ?)", rows["movie_keyword"])
+    cursor.executemany("INSERT OR IGNORE INTO movie_cast (movie_id, person_id, character, cast_order) VALUES (?, ?, ?, ?)", rows["movie_cast"])
+    cursor.executemany("INSERT OR IGNORE INTO movie_crew (movie_id, person_id, job, department) VALUES (?, ?, ?, ?)", rows["movie_crew"])
+    cursor.executemany("INSERT OR IGNORE INTO movie_production_company (movie_id, company_id) VALUES (?, ?)", rows["movie_production_company"])
+
+
+def insert_movie_details(cursor, movie_details_list, replace=False):
+    """
+    Converts (movie_summary, movie_details) pairs into rows and batch inserts them.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the target database.
+        movie_details_list (list): A list of tuples (movie_summary, movie_details).
+        replace (bool): See `insert_rows`.
+    """
+    insert_rows(cursor, movie_detail_rows(movie_details_list), replace)
+
+
+def record_checkpoint(cursor, checkpoint, min_votes):
+    """
+    Writes crawl journal entries.
+
+    Must be called in the same transaction as, or after, the insert of the movies
+    the entries describe.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the target database.
+        checkpoint (dict): Journal entries, each key optional: "ranges" as
+            (start, end, total_pages, complete) tuples, "pages" as (start, end, page)
+            tuples, "movies" as movie IDs and "histograms" as (month, day_counts) tuples.
+        min_votes (int): The min_votes value the ranges were crawled with.
+    """
+    now = datetime.now().isoformat(timespec="seconds")
+    cursor.executemany("""
+        INSERT INTO tmdb_discover_range (start_date, end_date, min_votes, total_pages, completed_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(start_date, end_date, min_votes) DO UPDATE SET
+            total_pages = COALESCE(excluded.total_pages, total_pages),
+            completed_at = COALESCE(excluded.completed_at, completed_at)
+        """, [(start, end, min_votes, total_pages, now if complete else None)
+              for start, end, total_pages, complete in checkpoint.get("ranges", [])])
+    cursor.executemany(
+        "INSERT OR IGNORE INTO tmdb_discover_page (start_date, end_date, min_votes, page) VALUES (?, ?, ?, ?)",
+        [(start, end, min_votes, page) for start, end, page in checkpoint.get("pages", [])]
+    )
+    cursor.executemany(
+        "INSERT OR REPLACE INTO tmdb_movie_checkpoint (movie_id, fetched_at) VALUES (?, ?)",
+        [(movie_id, now) for movie_id in checkpoint.get("movies", [])]
+    )
+    cursor.executemany(
+        "INSERT OR REPLACE INTO tmdb_release_histogram (month, min_votes, total_results, day_counts, observed_at) VALUES (?, ?, ?, ?, ?)",
+        [(month, min_votes, sum(day_counts), json.dumps(day_counts), now) for month, day_counts in checkpoint.get("histograms", [])]
+    )
+
+
+class MovieWriter(threading.Thread):
+    """
+    Dedicated writer thread that streams fetched movies into the database.
+
+    Producers (usually crawl coroutines) hand over movies and journal entries
+    through a bounded queue, so a busy month never piles up in memory: when the
+    writer falls behind, producers wait. The writer owns a single WAL-mode
+    connection and commits whenever `batch_size` movies are buffered or
+    `max_delay` seconds have passed since the first uncommitted one.
+
+    Genre, keyword, person and company IDs already written in this run are kept
+    in memory and dropped from later batches instead of being re-sent as
+    redundant INSERT OR IGNORE rows.
+
+    Every written movie is journaled in tmdb_movie_checkpoint in the same
+    transaction, and journal entries submitted with `put_checkpoint` are
+    committed together with (never before) the movies queued ahead of them.
+
+    Unless `raw_store_path` is None, every detail response and every discover
+    page passed to `put_raw_discover` is also appended to the raw landing store,
+    which is committed just before the database so it always holds at least
+    what the relational tables do.
+
+    Usage:
+        writer = MovieWriter()
+        writer.start()
+        await writer.put_movie(summary, details)
+        await writer.put_checkpoint({"pages": [...]}, min_votes)
+        writer.close()
+    """
+
+    def __init__(self, db_path=DB_PATH, batch_size=TMDB_WRITE_BATCH_SIZE,
+                 max_delay=TMDB_WRITE_MAX_DELAY, queue_size=TMDB_WRITE_QUEUE_SIZE,
+                 raw_store_path=TMDB_RAW_STORE_PATH):
+        super().__init__(name="tmdb-movie-writer", daemon=True)
+        self.db_path = db_path
+        self.raw_store_path = raw_store_path
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.movies_written = 0
+        self.error = None
+        self._known_ids = {table: set() for table in PARENT_TABLES}
+        self._stop_item = object()
+
+    async def _put(self, item):
+        while True:
+            if self.error is not None or not self.is_alive():
+                raise RuntimeError("Movie writer thread is not running") from self.error
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                await asyncio.sleep(0.05)
+
+    async def put_movie(self, movie, details, replace=False):
+        """Queues one (movie_summary, movie_details) pair; waits while the queue is full."""
+        await self._put(("movie", (movie, details), replace))
+
+    async def put_raw_discover(self, start_date, end_date, page, data, min_votes):
+        """Queues a discover response for the raw landing store."""
+        if self.raw_store_path is not None:
+            await self._put(("discover", (start_date, end_date, page, data), min_votes))
+
+    async def put_checkpoint(self, checkpoint, min_votes):
+        """Queues journal entries to be committed after every movie queued before them."""
+        await self._put(("checkpoint", checkpoint, min_votes))
+
+    def close(self):
+        """Flushes everything still queued, stops the thread and re-raises any write error."""
+        if self.is_alive():
+            self.queue.put(self._stop_item)
+            self.join()
+        if self.error is not None:
+            raise self.error
+
+    def run(self):
+        conn = sqlite_connect(self.db_path, timeout=60)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._raw_store = RawStore(self.raw_store_path) if self.raw_store_path is not None else None
+        try:
+            self._consume(conn)
+        except BaseException as e:
+            self.error = e
+            # Keep draining so blocked producers notice the error instead of hanging
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+        finally:
+            conn.close()
+            if self._raw_store is not None:
+                self._raw_store.close()
+
+    def _consume(self, conn):
+        movies = {False: [], True: []}
+        checkpoints = []
+        discover_pages = []
+        first_pending = None
+
+        while True:
+            timeout = None
+            if first_pending is not None:
+                timeout = max(0.0, first_pending + self.max_delay - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is self._stop_item:
+                self._commit(conn, movies, checkpoints, discover_pages)
+                return
+
+            if item is not None:
+                kind, payload, option = item
+                if kind == "movie":
+                    movies[option].append(payload)
+                elif kind == "discover":
+                    discover_pages.append((payload, option))
+                else:
+                    checkpoints.append((payload, option))
+                if first_pending is None:
+                    first_pending = time.monotonic()
+
+            pending = len(movies[False]) + len(movies[True])
+            if first_pending is not None and (
+                pending >= self.batch_size or time.monotonic() - first_pending >= self.max_delay
+            ):
+                self._commit(conn, movies, checkpoints, discover_pages)
+                first_pending = None
+
+    def _commit(self, conn, movies, checkpoints, discover_pages):
+        start = time.perf_counter()
+        if self._raw_store is not None:
+            self._raw_store.add_movie_details(details for movie_details_list in movies.values() for _, details in movie_details_list)
+            for page, min_votes in discover_pages:
+                self._raw_store.add_discover_pages([page], min_votes)
+            self._raw_store.commit()
+
+        cursor = conn.cursor()
+        for replace, movie_details_list in movies.items():
+            if not movie_details_list:
+                continue
+            rows = movie_detail_rows(movie_details_list)
+            for table, known in self._known_ids.items():
+                rows[table] = [row for row in rows[table] if row[0] not in known]
+            insert_rows(cursor, rows, replace)
+            record_checkpoint(cursor, {"movies": [row[0] for row in rows["movie"]]}, None)
+            for table, table_rows in rows.items():
+                ROWS_WRITTEN.inc(len(table_rows), table=table)
+            for table, known in self._known_ids.items():
+                known.update(row[0] for row in rows[table])
+            self.movies_written += len(movie_details_list)
+        for checkpoint, min_votes in checkpoints:
+            record_checkpoint(cursor, checkpoint, min_votes)
+        conn.commit()
+        COMMIT_SECONDS.observe(time.perf_counter() - start)
+        QUEUE_SIZE.set(self.queue.qsize())
+
+        movies[False].clear()
+        movies[True].clear()
+        checkpoints.clear()
+        discover_pages.clear()
@@ -0,0 +1,591 @@
+from dataclasses import dataclass
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from config.settings import DB_PATH
+from data_processing.db_connection import read_connection
+from data_processing.multi_hot import database_fingerprint
+
+# Minimum vote count of a past movie (and of the movies in the overall average), as in generate_scores.sql
+PAST_MIN_VOTES = 30
+CAST_MAX_ORDER = 10
+# Log-weight below which exp() may lose precision or round to 0 (the smallest double is ~exp(-745))
+UNDERFLOW_MARGIN = -700
+DIRECTOR_JOBS = ("Director", "Co-Director")
+SCORE_COLUMNS = ["movie_id", "director_score", "writer_score", "cast_score", "production_company_score"]
+# CareerScoreState timeline keys: owner * TIMELINE_KEY_SPAN + days since 1970 + TIMELINE_DAY_OFFSET
+TIMELINE_KEY_SPAN = 1 << 21
+TIMELINE_DAY_OFFSET = 1 << 20
+
+
+def _decayed_prefix_sums(owner, day, values, counts, lambdas):
+    """
+    Time-decayed running sums along each owner's timeline, for several decay rates at once.
+
+    Events must be sorted by (owner, day). For event i with predecessors j of
+    the same owner (j <= i), returns
+
+        num[i] = sum_j counts_j * values_j * exp(-lambda * (day_i - day_j))
+        den[i] = sum_j counts_j * exp(-lambda * (day_i - day_j))
+
+    as (n_events, n_lambdas) arrays. Each sum is updated incrementally from
+    the previous event (num_i = num_{i-1} * exp(-lambda * gap) + term), so all
+    factors are <= 1 and nothing overflows whatever the decay rate. The update
+    is vectorized across owners by processing the k-th event of every owner
+    together, so the Python loop runs once per career position, not per event.
+    """
+    n = len(owner)
+    lambdas = np.asarray(lambdas, dtype=float)
+    num = np.outer(np.nan_to_num(values) * counts, np.ones(len(lambdas)))
+    den = np.outer(counts.astype(float), np.ones(len(lambdas)))
+    if n == 0:
+        return num, den
+
+    first = np.ones(n, dtype=bool)
+    first[1:] = owner[1:] != owner[:-1]
+    rank = np.arange(n) - np.maximum.accumulate(np.where(first, np.arange(n), 0))
+    gap = np.zeros(n)
+    gap[1:] = day[1:] - day[:-1]
+
+    order = np.argsort(rank, kind="stable")
+    bounds = np.searchsorted(rank[order], np.arange(rank.max() + 2))
+    for position in range(1, rank.max() + 1):
+        idx = order[bounds[position]:bounds[position + 1]]
+        decay = np.exp(-np.outer(gap[idx], lambdas))
+        num[idx] += num[idx - 1] * decay
+        den[idx] += den[idx - 1] * decay
+    return num, den
+
+
+def _pearson(values, target):
+    """Pearson correlation of each column of `values` (n, ...) with `target` (n,), skipping rows where target is NaN."""
+    keep = ~np.isnan(target)
+    values, target = values[keep], target[keep]
+    x = values - values.mean(axis=0)
+    y = (target - target.mean()).reshape((-1,) + (1,) * (values.ndim - 1))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (x * y).sum(axis=0) / np.sqrt((x ** 2).sum(axis=0) * (y ** 2).sum())
+
+
+@dataclass
+class ScoreGrid:
+    """
+    Scores of every movie over a grid of decay rates.
+
+    Each score depends only on its own lambdas, so it is kept along its own
+    axes: the director score along `lambda_director`, the cast score along
+    `lambda_cast_time` x `lambda_cast_order`, and so on. Any combination of
+    the full grid is read off these arrays.
+
+    Attributes:
+        movie_ids (np.ndarray): Movie ID of each row, sorted.
+        vote_average (np.ndarray): vote_average of each row.
+        lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order (np.ndarray): The grid axes.
+        director_score (np.ndarray): (n_movies, len(lambda_director)).
+        writer_score (np.ndarray): (n_movies, len(lambda_writers)).
+        cast_score (np.ndarray): (n_movies, len(lambda_cast_time), len(lambda_cast_order)).
+        production_company_score (np.ndarray): (n_movies,); it has no decay.
+    """
+    movie_ids: np.ndarray
+    vote_average: np.ndarray
+    lambda_director: np.ndarray
+    lambda_writers: np.ndarray
+    lambda_cast_time: np.ndarray
+    lambda_cast_order: np.ndarray
+    director_score: np.ndarray
+    writer_score: np.ndarray
+    cast_score: np.ndarray
+    production_company_score: np.ndarray
+
+    @staticmethod
+    def _position(axis, value):
+        matches = np.flatnonzero(axis == value)
+        if not len(matches):
+            raise KeyError(f"lambda {value!r} is not on the grid axis {axis.tolist()}")
+        return matches[0]
+
+    def scores(self, lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order):
+        """
+        Scores at one point of the grid, in the format of `load_sqlite.fetch_scores`.
+
+        Returns:
+            pd.DataFrame: Columns movie_id, director_score, writer_score, cast_score, production_company_score.
+        """
+        d = self._position(self.lambda_director, lambda_director)
+        w = self._position(self.lambda_writers, lambda_writers)
+        t = self._position(self.lambda_cast_time, lambda_cast_time)
+        o = self._position(self.lambda_cast_order, lambda_cast_order)
+        return pd.DataFrame({
+            "movie_id": self.movie_ids,
+            "director_score": self.director_score[:, d],
+            "writer_score": self.writer_score[:, w],
+            "cast_score": self.cast_score[:, t, o],
+            "production_company_score": self.production_company_score,
+        })
+
+    def correlations(self):
+        """
+        Pearson correlation of each score with vote_average at every grid point.
+
+        Returns:
+            dict: `director_score` and `writer_score` as Series indexed by
+            their lambda, `cast_score` as a DataFrame (rows lambda_cast_time,
+            columns lambda_cast_order) and `production_company_score` as a float.
+        """
+        return {
+            "director_score": pd.Series(_pearson(self.director_score, self.vote_average),
+                                        index=pd.Index(self.lambda_director, name="lambda_director")),
+            "writer_score": pd.Series(_pearson(self.writer_score, self.vote_average),
+                                      index=pd.Index(self.lambda_writers, name="lambda_writers")),
+            "cast_score": pd.DataFrame(_pearson(self.cast_score, self.vote_average),
+                                       index=pd.Index(self.lambda_cast_time, name="lambda_cast_time"),
+                                       columns=pd.Index(self.lambda_cast_order, name="lambda_cast_order")),
+            "production_company_score": float(_pearson(self.production_company_score, self.vote_average)),
+        }
+
+
+class CareerScoreEngine:
+    """
+    Computes the director, writer, cast and production company scores of generate_scores.sql in NumPy.
+
+    The credit tables are loaded once. Each person's or company's credits are
+    sorted into a timeline, and a movie's score is read from the running
+    (decayed) sums of its people's timelines just before its release date,
+    instead of joining every movie to every earlier movie of the same person.
+    Cost is linear in the number of credits.
+
+    The results match the SQL, including its edge cases:
+    - A movie counts as past when its release_date string is smaller, as
+      with the SQL text comparison, and the decay uses day differences.
+    - Past movies need vote_count >= 30.
+    - Credits listed more than once count more than once, e.g. Director plus
+      Co-Director, or several Writing jobs.
+    - A weighted score whose weights all underflow to 0 becomes NULL, like
+      the SQL division by zero, and every NULL falls back to the overall
+      average.
+
+    Scores agree with the SQL to floating-point rounding. The one exception
+    is a movie whose largest weight is subnormal (lambda * days > ~708). The
+    SQL result then loses precision, for example 6.0 instead of 5.9, while
+    the engine returns the exact weighted average.
+
+    Args:
+        db_path (Path or str): The database to load.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        conn = read_connection(db_path)
+        movies = pd.read_sql_query(
+            "SELECT movie_id, release_date, vote_average, vote_count FROM movie ORDER BY movie_id", conn
+        )
+        crew = pd.read_sql_query("SELECT movie_id, person_id, job, department FROM movie_crew", conn)
+        cast = pd.read_sql_query(
+            "SELECT movie_id, person_id, cast_order FROM movie_cast", conn
+        )
+        companies = pd.read_sql_query("SELECT movie_id, company_id FROM movie_production_company", conn)
+
+        self.movie_ids = movies["movie_id"].to_numpy(dtype=np.int64)
+        self.vote_average = movies["vote_average"].to_numpy(dtype=float)
+        self.vote_count = movies["vote_count"].to_numpy(dtype=float)
+        dates = movies["release_date"]
+        # Order of the release_date strings (the SQL compares them as text); -1 for NULL
+        known = dates.notna().to_numpy()
+        self.date_rank = np.full(len(dates), -1, dtype=np.int64)
+        self.date_rank[known] = np.unique(dates[known].to_numpy(dtype=str), return_inverse=True)[1]
+        # Day number of each date, NaN where JULIANDAY would be NULL
+        parsed = pd.to_datetime(dates, format="%Y-%m-%d", errors="coerce")
+        self.day = (parsed - pd.Timestamp("1970-01-01")).dt.days.to_numpy(dtype=float)
+
+        past = self.vote_count >= PAST_MIN_VOTES
+        self.overall_average = float(np.nanmean(self.vote_average[past])) if past.any() else np.nan
+
+        directors = crew[crew["job"].isin(DIRECTOR_JOBS)]
+        writers = crew[crew["department"] == "Writing"]
+        self.director = self._credits(directors, "person_id")
+        self.writer = self._credits(writers, "person_id")
+        # Any earlier role counts as a past movie; only the top-billed cast of the scored movie looks back
+        self.cast_events = self._credits(cast, "person_id")
+        top_cast = cast[cast["cast_order"] <= CAST_MAX_ORDER]
+        self.cast_queries = (self._movie_index(top_cast["movie_id"]), top_cast["person_id"].to_numpy(dtype=np.int64),
+                             top_cast["cast_order"].to_numpy(dtype=float))
+        self.company = self._credits(companies, "company_id")
+
+    def _movie_index(self, movie_ids):
+        """Maps movie IDs to row indices; -1 for IDs missing from `movie` (which never join)."""
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        index = np.searchsorted(self.movie_ids, movie_ids)
+        index[index >= len(self.movie_ids)] = 0
+        return np.where(self.movie_ids[index] == movie_ids, index, -1)
+
+    def _credits(self, df, owner_column):
+        """(movie index, owner, multiplicity) of each distinct (movie, owner) pair."""
+        counts = df.groupby(["movie_id", owner_column]).size().reset_index(name="n")
+        movie = self._movie_index(counts["movie_id"])
+        keep = movie >= 0
+        return movie[keep], counts[owner_column].to_numpy(dtype=np.int64)[keep], counts["n"].to_numpy(dtype=float)[keep]
+
+    def _timeline(self, movie, owner, count, decayed):
+        """
+        Sorts qualifying past credits into per-owner timelines.
+
+        Returns the sorted (owner, date rank, movie, count) arrays; decayed
+        timelines also drop dates JULIANDAY cannot parse, whose terms are NULL
+        in the SQL sums.
+        """
+        keep = (self.vote_count[movie] >= PAST_MIN_VOTES) & (self.date_rank[movie] >= 0)
+        if decayed:
+            keep &= ~np.isnan(self.day[movie])
+        else:
+            keep &= ~np.isnan(self.vote_average[movie])
+        movie, owner, count = movie[keep], owner[keep], count[keep]
+        order = np.lexsort((self.date_rank[movie], owner))
+        return owner[order], self.date_rank[movie][order], movie[order], count[order]
+
+    def _preceding(self, timeline_owner, timeline_rank, query_owner, query_movie):
+        """Index of the last timeline event of the query's owner released strictly before the query movie, or -1."""
+        span = np.int64(self.date_rank.max() + 2)
+        keys = timeline_owner * span + timeline_rank
+        end = np.searchsorted(keys, query_owner * span + self.date_rank[query_movie], side="left")
+        start = np.searchsorted(keys, query_owner * span, side="left")
+        return np.where((end > start) & (self.date_rank[query_movie] >= 0), end - 1, -1)
+
+    def _event_sums(self, events, lambdas):
+        """
+        Decayed running sums along every owner's timeline of past movies.
+
+        Returns:
+            tuple: (owner, movie, num, den) of the sorted timeline, with
+            (n_events, L) sums for the decay rates `lambdas`.
+        """
+        owner, _, movie, count = self._timeline(*events, decayed=True)
+        num, den = _decayed_prefix_sums(owner, self.day[movie], self.vote_average[movie], count, lambdas)
+        return owner, movie, num, den
+
+    def _decayed_scores(self, events, queries, lambdas, query_order=None, lambdas_order=None):
+        """
+        Per-movie decayed weighted averages of past vote averages, for each decay rate.
+
+        Args:
+            events: (movie, owner, count) credits contributing past movies.
+            queries: (movie, owner, count) credits of the movies being scored.
+            lambdas: Decay rates per day, shape (L,).
+            query_order: Cast order of each query credit, weighted by exp(-lambdas_order * order).
+            lambdas_order: Order decay rates, shape (L,), paired with `lambdas`.
+
+        Returns:
+            np.ndarray: (n_movies, L) scores, NaN where the SQL gives NULL.
+        """
+        lambdas = np.atleast_1d(np.asarray(lambdas, dtype=float))
+        owner, movie, num, den = self._event_sums(events, lambdas)
+
+        q_movie, q_owner, q_count = queries
+        last = self._preceding(owner, self.date_rank[movie], q_owner, q_movie)
+        valid = (last >= 0) & ~np.isnan(self.day[q_movie])
+        if query_order is not None:
+            valid &= ~np.isnan(query_order)
+            query_order = query_order[valid]
+        q_movie, q_count, last = q_movie[valid], q_count[valid], last[valid]
+
+        scores = np.full((len(self.movie_ids), len(lambdas)), np.nan)
+        if not len(q_movie):
+            return scores
+
+        # Log of each query's largest term, exp(-lambda * days since the owner's latest past movie)
+        delta = self.day[q_movie] - self.day[movie[last]]
+        log_weight = -np.outer(delta, lambdas)
+        nearest = np.exp(log_weight)
+        if query_order is not None:
+            lambdas_order = np.atleast_1d(np.asarray(lambdas_order, dtype=float))
+            log_weight = log_weight - np.outer(query_order, lambdas_order)
+            nearest = nearest * np.exp(-np.outer(query_order, lambdas_order))
+
+        # Combine a movie's credits relative to its largest term, so nothing underflows
+        order = np.argsort(q_movie, kind="stable")
+        q_movie, q_count, last = q_movie[order], q_count[order], last[order]
+        log_weight, nearest = log_weight[order], nearest[order]
+        starts = np.flatnonzero(np.r_[True, q_movie[1:] != q_movie[:-1]])
+        sizes = np.diff(np.r_[starts, len(q_movie)])
+        peak = np.repeat(np.maximum.reduceat(log_weight, starts, axis=0), sizes, axis=0)
+        weight = q_count[:, None] * np.exp(log_weight - peak)
+        numerator = np.add.reduceat(weight * num[last], starts, axis=0)
+        denominator = np.add.reduceat(weight * den[last], starts, axis=0)
+
+        # The SQL sum of weights is exactly 0 (-> NULL) when every term underflows
+        underflow = np.maximum.reduceat(nearest, starts, axis=0) == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = numerator / denominator
+        result[underflow] = np.nan
+        scores[q_movie[starts]] = result
+        return scores
+
+    def _cast_score_grid(self, lambda_cast_time, lambda_cast_order):
+        """
+        Cast scores for every (time decay, order decay) pair, shape (n_movies, T, O).
+
+        The weight of a credit factors into exp(-lambda_time * days) *
+        exp(-lambda_order * cast_order), and cast_order takes only a few
+        distinct values. The timeline sums are therefore reduced once into
+        per (movie, cast_order) totals for every time decay, and each order
+        decay is applied to those small totals instead of to every credit.
+        """
+        owner, movie, num, den = self._event_sums(self.cast_events, lambda_cast_time)
+        q_movie, q_owner, q_order = self.cast_queries
+        last = self._preceding(owner, self.date_rank[movie], q_owner, q_movie)
+        valid = (last >= 0) & ~np.isnan(self.day[q_movie]) & ~np.isnan(q_order)
+        q_movie, q_order, last = q_movie[valid], q_order[valid], last[valid]
+
+        scores = np.full((len(self.movie_ids), len(lambda_cast_time), len(lambda_cast_order)), np.nan)
+        if not len(q_movie):
+            return scores
+
+        levels, level = np.unique(q_order, return_inverse=True)
+        order = np.lexsort((level, q_movie))
+        q_movie, level, last = q_movie[order], level[order], last[order]
+        log_weight = -np.outer(self.day[q_movie] - self.day[movie[last]], lambda_cast_time)
+        # Sum each (movie, cast_order) group relative to its own largest time term
+        starts = np.flatnonzero(np.r_[True, (q_movie[1:] != q_movie[:-1]) | (level[1:] != level[:-1])])
+        sizes = np.diff(np.r_[starts, len(q_movie)])
+        group_peak = np.maximum.reduceat(log_weight, starts, axis=0)
+        weight = np.exp(log_weight - np.repeat(group_peak, sizes, axis=0))
+        scored, row = np.unique(q_movie[starts], return_inverse=True)
+        shape = (len(scored), len(levels), len(lambda_cast_time))
+        numerator, denominator, peak = np.zeros(shape), np.zeros(shape), np.full(shape, -np.inf)
+        numerator[row, level[starts]] = np.add.reduceat(weight * num[last], starts, axis=0)
+        denominator[row, level[starts]] = np.add.reduceat(weight * den[last], starts, axis=0)
+        peak[row, level[starts]] = group_peak
+
+        # Time and order weights factor: scale the groups to the movie's largest time term and the
+        # order weights to its lowest cast_order, then contract over cast_order for all order decays
+        largest = peak.max(axis=1)
+        time_weight = np.exp(peak - largest[:, None, :])
+        present = np.isfinite(peak[:, :, 0])
+        lowest = levels[np.argmax(present, axis=1)]
+        shift = np.where(present, levels[None, :] - lowest[:, None], 0)
+        order_weight = np.where(present[:, :, None], np.exp(-shift[:, :, None] * lambda_cast_order[None, None, :]), 0)
+        with np.errstate(invalid="ignore", divide="ignore", under="ignore"):
+            numerator_sum = np.einsum("mkt,mko->mto", time_weight * numerator, order_weight, optimize=True)
+            denominator_sum = np.einsum("mkt,mko->mto", time_weight * denominator, order_weight, optimize=True)
+            result = numerator_sum / denominator_sum
+
+        # Near underflow the scaled products lose precision, and the SQL weights may round to 0 (-> NULL):
+        # recompute those (movie, time decay) rows exactly, one order decay at a time
+        highest = levels[len(levels) - 1 - np.argmax(present[:, ::-1], axis=1)]
+        order_floor = -np.maximum(np.outer(lowest, lambda_cast_order), np.outer(highest, lambda_cast_order)).max(axis=1)
+        rows, columns = np.nonzero((largest + order_floor[:, None] < UNDERFLOW_MARGIN)
+                                   | ~(denominator_sum > np.finfo(float).tiny).all(axis=2))
+        for o, lambda_order in enumerate(lambda_cast_order):
+            log_group = peak[rows, :, columns] - lambda_order * levels[None, :]
+            group_largest = log_group.max(axis=1)
+            group_weight = np.exp(log_group - group_largest[:, None])
+            with np.errstate(invalid="ignore", divide="ignore"):
+                exact = ((group_weight * numerator[rows, :, columns]).sum(axis=1)
+                         / (group_weight * denominator[rows, :, columns]).sum(axis=1))
+            # As in the SQL, a credit's weight is exp(-time term) * exp(-order term); all 0 gives NULL
+            nearest = (np.exp(peak[rows, :, columns]) * np.exp(-lambda_order * levels)[None, :]).max(axis=1)
+            exact[nearest == 0] = np.nan
+            result[rows, columns, o] = exact
+        scores[scored] = result
+        return scores
+
+    def _company_scores(self):
+        """Plain average vote of the earlier movies of each movie's production companies."""
+        movie, owner, count = self.company
+        t_owner, t_rank, t_movie, _ = self._timeline(movie, owner, count, decayed=False)
+        cumulative_votes = np.r_[0, np.cumsum(self.vote_average[t_movie])]
+        last = self._preceding(t_owner, t_rank, owner, movie)
+        start = np.searchsorted(t_owner, owner, side="left")
+        valid = last >= 0
+        votes = np.where(valid, cumulative_votes[last + 1] - cumulative_votes[np.minimum(start, len(t_owner))], 0)
+        movies = np.where(valid, last + 1 - start, 0)
+
+        total_votes = np.bincount(movie, weights=votes, minlength=len(self.movie_ids))
+        total_movies = np.bincount(movie, weights=movies, minlength=len(self.movie_ids))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(total_movies > 0, total_votes / total_movies, np.nan)
+
+    def score_arrays(self, lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order):
+        """
+        Scores of every movie for one or more parameter sets.
+
+        Each lambda may be a scalar or an array of equal length L; returns a dict
+        of (n_movies, L) arrays keyed by score name, with NULLs already replaced
+        by the overall average.
+        """
+        lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order = np.broadcast_arrays(
+            *[np.atleast_1d(np.asarray(value, dtype=float)) for value in
+              (lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order)]
+        )
+        cast_movie, cast_owner, cast_order = self.cast_queries
+        scores = {
+            "director_score": self._decayed_scores(self.director, self.director, lambda_director),
+            "writer_score": self._decayed_scores(self.writer, self.writer, lambda_writers),
+            "cast_score": self._decayed_scores(
+                self.cast_events, (cast_movie, cast_owner, np.ones(len(cast_movie))), lambda_cast_time,
+                query_order=cast_order, lambdas_order=lambda_cast_order,
+            ),
+            "production_company_score": np.repeat(self._company_scores()[:, None], len(lambda_director), axis=1),
+        }
+        return {name: np.where(np.isnan(values), self.overall_average, values) for name, values in scores.items()}
+
+    def scores(self, lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order, min_votes=30):
+        """
+        Same result as `load_sqlite.fetch_scores`: one row per movie with vote_count >= min_votes.
+
+        Returns:
+            pd.DataFrame: Columns movie_id, director_score, writer_score, cast_score, production_company_score.
+        """
+        arrays = self.score_arrays(lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order)
+        keep = self.vote_count >= min_votes
+        df = pd.DataFrame({name: values[keep, 0] for name, values in arrays.items()})
+        df.insert(0, "movie_id", self.movie_ids[keep])
+        return df[SCORE_COLUMNS]
+
+    def score_grid(self, lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order, min_votes=30):
+        """
+        Scores of every movie with vote_count >= min_votes over a grid of decay rates.
+
+        Each argument is a 1-D array of values to try. The director and writer
+        scores are evaluated once per value of their own lambda, and the cast
+        score once for the whole `lambda_cast_time` x `lambda_cast_order`
+        grid, so a full grid costs little more than a single set of scores.
+
+        Returns:
+            ScoreGrid: Scores along each lambda axis, with NULLs replaced by the overall average.
+        """
+        lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order = [
+            np.atleast_1d(np.asarray(value, dtype=float)).ravel() for value in
+            (lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order)
+        ]
+        scores = {
+            "director_score": self._decayed_scores(self.director, self.director, lambda_director),
+            "writer_score": self._decayed_scores(self.writer, self.writer, lambda_writers),
+            "cast_score": self._cast_score_grid(lambda_cast_time, lambda_cast_order),
+            "production_company_score": self._company_scores(),
+        }
+        keep = self.vote_count >= min_votes
+        scores = {name: np.where(np.isnan(values), self.overall_average, values)[keep] for name, values in scores.items()}
+        return ScoreGrid(self.movie_ids[keep], self.vote_average[keep], lambda_director, lambda_writers,
+                         lambda_cast_time, lambda_cast_order, **scores)
+
+
+def _last_before(keys, owner, day):
+    """Index of each owner's last timeline event on a day strictly before `day`, or -1 (always for a NaN day)."""
+    unknown = np.isnan(day)
+    start = np.searchsorted(keys, owner * TIMELINE_KEY_SPAN, side="left")
+    end = np.searchsorted(keys, _timeline_keys(owner, np.where(unknown, -TIMELINE_DAY_OFFSET, day)), side="left")
+    return np.where((end > start) & ~unknown, end - 1, -1)
+
+
+def _timeline_keys(owner, day):
+    return owner * TIMELINE_KEY_SPAN + (day + TIMELINE_DAY_OFFSET).astype(np.int64)
+
+
+class CareerScoreState:
+    """
+    Scores of new movies from the careers in the database, for one set of decay rates.
+
+    Keeps, for every director, writer, cast member and production company,
+    the timeline of their past movies with the decayed running sums at each
+    release. A movie's score then needs one binary search per credit, the
+    sums at the last earlier release decayed to its own release date, so
+    scoring a new or hypothetical movie never touches the other movies.
+    Results equal `CareerScoreEngine.scores` for movies in the database.
+
+    Args:
+        engine (CareerScoreEngine): The loaded credits; not referenced afterwards.
+        lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order (float): Decay rates.
+    """
+
+    def __init__(self, engine, lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order):
+        self.lambdas = (float(lambda_director), float(lambda_writers), float(lambda_cast_time), float(lambda_cast_order))
+        self.overall_average = engine.overall_average
+        self.director = self._decayed_timeline(engine, engine.director, lambda_director)
+        self.writer = self._decayed_timeline(engine, engine.writer, lambda_writers)
+        self.cast = self._decayed_timeline(engine, engine.cast_events, lambda_cast_time)
+
+        movie, owner, count = engine.company
+        owner, _, movie, _ = engine._timeline(movie, owner, count, decayed=False)
+        # Dates JULIANDAY cannot parse still compare as text in the SQL; they sort before every real date
+        day = np.nan_to_num(engine.day[movie], nan=-TIMELINE_DAY_OFFSET)
+        order = np.lexsort((day, owner))
+        self.company = (_timeline_keys(owner[order], day[order]), np.r_[0, np.cumsum(engine.vote_average[movie][order])])
+
+    @staticmethod
+    def _decayed_timeline(engine, events, lambda_):
+        owner, movie, num, den = engine._event_sums(events, [lambda_])
+        return _timeline_keys(owner, engine.day[movie]), engine.day[movie], num[:, 0], den[:, 0], float(lambda_)
+
+    def _decayed_scores(self, timeline, n, query, owner, day, order_log_weight=None):
+        keys, event_day, num, den, lambda_ = timeline
+        last = _last_before(keys, owner, day)
+        valid = last >= 0
+        query, last, day = query[valid], last[valid], day[valid]
+        log_weight = -lambda_ * (day - event_day[last])
+        nearest = np.exp(log_weight)
+        if order_log_weight is not None:
+            log_weight = log_weight + order_log_weight[valid]
+            nearest = nearest * np.exp(order_log_weight[valid])
+
+        peak = np.full(n, -np.inf)
+        np.maximum.at(peak, query, log_weight)
+        weight = np.exp(log_weight - peak[query])
+        largest = np.zeros(n)
+        np.maximum.at(largest, query, nearest)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scores = np.bincount(query, weight * num[last], n) / np.bincount(query, weight * den[last], n)
+        scores[largest == 0] = np.nan
+        return scores
+
+    def score(self, release_dates, directors=(), writers=(), cast=(), companies=()):
+        """
+        Scores a batch of movies from their release dates and credits.
+
+        Args:
+            release_dates (list): "YYYY-MM-DD" (or None) of each movie.
+            directors, writers, companies (tuple): (movie position in the batch, person or company ID)
+                arrays, one entry per credit; a credit listed twice counts twice, as in the SQL.
+            cast (tuple): (movie position, person ID, cast_order) arrays; cast_order above
+                CAST_MAX_ORDER is ignored.
+
+        Returns:
+            dict: Score name -> (n,) array, with the overall average where a movie has no history.
+        """
+        n = len(release_dates)
+        dates = pd.to_datetime(pd.Series(release_dates, dtype=object), format="%Y-%m-%d", errors="coerce")
+        day = (dates - pd.Timestamp("1970-01-01")).dt.days.to_numpy(dtype=float)
+
+        def credits(arrays, columns):
+            arrays = [np.asarray(values) for values in arrays] if len(arrays) else [np.zeros(0)] * columns
+            return [arrays[0].astype(np.int64), arrays[1].astype(np.int64)] + [a.astype(float) for a in arrays[2:]]
+
+        scores = {}
+        for name, timeline, arrays in (("director_score", self.director, directors), ("writer_score", self.writer, writers)):
+            query, owner = credits(arrays, 2)
+            scores[name] = self._decayed_scores(timeline, n, query, owner, day[query])
+
+        query, owner, cast_order = credits(cast, 3)
+        top = cast_order <= CAST_MAX_ORDER
+        query, owner, cast_order = query[top], owner[top], cast_order[top]
+        scores["cast_score"] = self._decayed_scores(self.cast, n, query, owner, day[query], -self.lambdas[3] * cast_order)
+
+        query, owner = credits(companies, 2)
+        keys, cumulative_votes = self.company
+        last = _last_before(keys, owner, day[query])
+        start = np.searchsorted(keys, owner * TIMELINE_KEY_SPAN, side="left")
+        valid = last >= 0
+        votes = np.where(valid, cumulative_votes[last + 1] - cumulative_votes[start], 0)
+        movies = np.where(valid, last + 1 - start, 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scores["production_company_score"] = np.bincount(query, votes, n) / np.bincount(query, movies, n)
+
+        return {name: np.where(np.isnan(values), self.overall_average, values) for name, values in scores.items()}
+
+
+@lru_cache(maxsize=2)
+def _cached_engine(db_path, fingerprint):
+    return CareerScoreEngine(db_path)
+
+
+def get_engine(db_path=DB_PATH):
+    """Returns a CareerScoreEngine for the database, reusing the loaded one until the database changes."""
+    return _cached_engine(str(db_path), database_fingerprint(db_path))
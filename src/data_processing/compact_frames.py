@@ -0,0 +1,101 @@
+from contextlib import closing
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from data_processing.db_connection import connect_readonly
+
+BATCH_SIZE = 100_000
+DTYPE_BACKENDS = ("numpy", "pyarrow")
+
+# Compact Arrow type of each known column; other columns get the type Arrow infers
+COMPACT_TYPES = {
+    "movie_id": pa.int32(), "user_id": pa.int32(), "tmdb_id": pa.int32(), "movielens_id": pa.int32(),
+    "rating": pa.float32(), "timestamp": pa.int64(),
+    "title": pa.dictionary(pa.int32(), pa.string()), "release_date": pa.date32(),
+    "budget": pa.int64(), "revenue": pa.int64(), "runtime": pa.int32(), "num_cast_members": pa.int32(),
+    "vote_average": pa.float32(), "vote_count": pa.int32(), "popularity": pa.float32(),
+}
+
+
+def _compact_array(name, values):
+    """Arrow array of one column of SQLite values in its compact type."""
+    compact_type = COMPACT_TYPES.get(name)
+    if compact_type is None:
+        return pa.array(values)
+    if compact_type == pa.date32():
+        # TMDb leaves some dates empty; anything that is not YYYY-MM-DD becomes null, like pd.to_datetime(errors="coerce")
+        dates = pc.strptime(pa.array(values, pa.string()), format="%Y-%m-%d", unit="s", error_is_null=True)
+        return dates.cast(pa.date32())
+    if pa.types.is_dictionary(compact_type):
+        return pa.array(values, compact_type.value_type).dictionary_encode()
+    return pa.array(values, compact_type)
+
+
+def _empty_schema(names):
+    return pa.schema([(name, COMPACT_TYPES.get(name, pa.string())) for name in names])
+
+
+def _batches(cursor, batch_size):
+    names = [column[0] for column in cursor.description]
+    try:
+        while rows := cursor.fetchmany(batch_size):
+            yield pa.RecordBatch.from_arrays([_compact_array(name, values) for name, values in zip(names, zip(*rows))],
+                                             names=names)
+    finally:
+        cursor.close()
+
+
+def record_batches(conn, query, params=(), batch_size=BATCH_SIZE):
+    """
+    Runs a query and yields its rows as Arrow record batches of at most `batch_size` rows in compact types.
+
+    Rows go from the cursor straight into typed Arrow arrays, one batch at a
+    time, so memory never holds more than one batch of Python tuples.
+    """
+    return _batches(conn.execute(query, params), batch_size)
+
+
+def _check_backend(dtype_backend):
+    if dtype_backend not in DTYPE_BACKENDS:
+        raise ValueError(f"Unknown dtype_backend {dtype_backend!r}; expected one of {DTYPE_BACKENDS}")
+
+
+def to_pandas(data, dtype_backend):
+    """
+    Converts a record batch or table to a DataFrame.
+
+    "numpy" gives NumPy dtypes (int32, float32, datetime64, categorical titles;
+    integer columns with nulls become float64). "pyarrow" gives ArrowDtype
+    columns, which keep nulls in integer columns, with titles still categorical.
+    """
+    if dtype_backend == "pyarrow":
+        return data.to_pandas(types_mapper=lambda arrow_type: None if pa.types.is_dictionary(arrow_type) else pd.ArrowDtype(arrow_type))
+    return data.to_pandas(date_as_object=False)
+
+
+def read_frame(conn, query, params=(), dtype_backend="numpy"):
+    """Reads a whole query result into a compact DataFrame, converting it batch by batch."""
+    _check_backend(dtype_backend)
+    cursor = conn.execute(query, params)
+    schema = _empty_schema([column[0] for column in cursor.description])
+    batches = list(_batches(cursor, BATCH_SIZE))
+    table = pa.Table.from_batches(batches) if batches else schema.empty_table()
+    del batches
+    return to_pandas(table, dtype_backend)
+
+
+def iter_frames(db_path, query, params=(), dtype_backend="numpy", chunksize=BATCH_SIZE):
+    """
+    Returns an iterator over a query result as compact DataFrames of at most `chunksize` rows.
+
+    The iterator reads on its own read-only connection, so it can be consumed
+    slowly while other loaders run; categorical columns have the categories of
+    their own chunk.
+    """
+    _check_backend(dtype_backend)
+
+    def frames():
+        with closing(connect_readonly(db_path)) as conn:
+            for batch in record_batches(conn, query, params, chunksize):
+                yield to_pandas(batch, dtype_backend)
+    return frames()
@@ -0,0 +1,84 @@
+import os
+import threading
+from pathlib import Path
+from config.settings import DB_PATH, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE
+from pipeline.metrics import sqlite_connect
+
+READ_PRAGMAS = [
+    f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+    f"PRAGMA cache_size={SQLITE_CACHE_SIZE}",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA query_only=ON",
+]
+
+# (process ID, thread ID, database path) -> ((st_dev, st_ino) of the file when opened, connection)
+_connections = {}
+_lock = threading.Lock()
+
+
+def connect_readonly(db_path=DB_PATH):
+    """
+    Opens a new read-only connection tuned for the loaders: memory-mapped I/O,
+    a large page cache and in-memory temporary tables.
+
+    Autocommit mode, so a connection never holds a read transaction (and an old
+    snapshot) between queries. Statements are timed when MOVIE_DATA_PROFILE_SQL=1
+    (see pipeline/metrics.py).
+    """
+    uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+    conn = sqlite_connect(uri, uri=True, isolation_level=None, check_same_thread=False)
+    for pragma in READ_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def _file_identity(path):
+    stat = os.stat(path)
+    return stat.st_dev, stat.st_ino
+
+
+def read_connection(db_path=DB_PATH):
+    """
+    Returns the shared read-only connection to `db_path` for the calling thread.
+
+    Each thread of each process gets its own connection, opened on first use
+    and reused afterwards, so concurrent readers never share a connection and
+    a forked child never inherits its parent's. Writes by other connections are
+    seen by the next query. A database file that was replaced (for example
+    rebuilt from scratch) is reopened.
+
+    Do not close the returned connection; use `close_read_connections`.
+    """
+    path = str(Path(db_path).resolve())
+    identity = _file_identity(path)  # also raises FileNotFoundError instead of an opaque sqlite3 error
+    key = (os.getpid(), threading.get_ident(), path)
+    with _lock:
+        opened = _connections.get(key)
+    if opened is not None:
+        if opened[0] == identity:
+            return opened[1]
+        opened[1].close()
+
+    conn = connect_readonly(path)
+    with _lock:
+        _connections[key] = (identity, conn)
+    return conn
+
+
+def close_read_connections():
+    """Closes every shared connection this process opened, in all threads."""
+    pid = os.getpid()
+    with _lock:
+        keys = [key for key in _connections if key[0] == pid]
+        for key in keys:
+            _connections.pop(key)[1].close()
+
+
+def _forget_parent_connections():
+    # SQLite connections must not be used (or closed) across fork; the child opens its own
+    global _lock
+    _lock = threading.Lock()
+    _connections.clear()
+
+
+os.register_at_fork(after_in_child=_forget_parent_connections)
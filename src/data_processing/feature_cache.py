@@ -0,0 +1,108 @@
+import os
+import json
+import hashlib
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from config.settings import FEATURE_CACHE_PATH, FEATURE_CACHE_MAX_BYTES, FEATURE_CACHE_MAX_ENTRIES
+
+METADATA_KEY = b"feature_cache"
+
+
+def cache_key(db_path, fingerprint, **parameters):
+    """
+    Stable key of a cached frame: the database, its content fingerprint
+    (multi_hot.database_fingerprint) and the parameters it was computed from.
+    """
+    description = {"db_path": str(db_path), "fingerprint": fingerprint,
+                   "parameters": {name: float(value) if isinstance(value, float) else value
+                                  for name, value in sorted(parameters.items())}}
+    return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest(), description
+
+
+def _entries():
+    """(path, size, last use) of every cached file, least recently used first."""
+    if not FEATURE_CACHE_PATH.exists():
+        return []
+    entries = []
+    for path in FEATURE_CACHE_PATH.glob("*.parquet"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue  # evicted by another process meanwhile
+        entries.append((path, stat.st_size, stat.st_mtime_ns))
+    return sorted(entries, key=lambda entry: entry[2])
+
+
+def _description(path):
+    metadata = pq.read_schema(path).metadata or {}
+    return json.loads(metadata[METADATA_KEY]) if METADATA_KEY in metadata else None
+
+
+def load(key):
+    """The cached frame of `key`, or None. A hit marks the entry as recently used."""
+    path = FEATURE_CACHE_PATH / f"{key}.parquet"
+    try:
+        df = pd.read_parquet(path)
+        os.utime(path)
+    except (OSError, ValueError):
+        return None  # missing, evicted meanwhile or unreadable
+    return df
+
+
+def store(key, description, df):
+    """
+    Writes a frame to the cache, then evicts.
+
+    Entries of the same database with another fingerprint can never be hit
+    again and are removed first; then least recently used entries go until
+    the cache is within FEATURE_CACHE_MAX_ENTRIES and FEATURE_CACHE_MAX_BYTES.
+    """
+    FEATURE_CACHE_PATH.mkdir(parents=True, exist_ok=True)
+    path = FEATURE_CACHE_PATH / f"{key}.parquet"
+    tmp_path = path.with_name(f"{key}.{os.getpid()}.tmp")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), METADATA_KEY: json.dumps(description)})
+    pq.write_table(table, tmp_path)
+    tmp_path.replace(path)
+    evict(keep=path, db_path=description["db_path"], fingerprint=description["fingerprint"])
+
+
+def evict(keep=None, db_path=None, fingerprint=None, max_bytes=FEATURE_CACHE_MAX_BYTES, max_entries=FEATURE_CACHE_MAX_ENTRIES):
+    """
+    Removes stale entries (same `db_path`, other `fingerprint`), then least
+    recently used ones until the cache fits. `keep` is never removed.
+
+    Returns:
+        int: Number of files removed.
+    """
+    entries = [entry for entry in _entries() if entry[0] != keep]
+    removed = 0
+    if db_path is not None:
+        for entry in list(entries):
+            try:
+                description = _description(entry[0])
+            except (OSError, ValueError):
+                description = None
+            if description is None or (description["db_path"] == db_path and description["fingerprint"] != fingerprint):
+                entry[0].unlink(missing_ok=True)
+                entries.remove(entry)
+                removed += 1
+
+    kept_bytes = keep.stat().st_size if keep is not None and keep.exists() else 0
+    total = kept_bytes + sum(size for _, size, _ in entries)
+    count = len(entries) + (keep is not None)
+    for path, size, _ in entries:
+        if total <= max_bytes and count <= max_entries:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        count -= 1
+        removed += 1
+    return removed
+
+
+def clear():
+    """Removes every cached frame."""
+    for path, _, _ in _entries():
+        path.unlink(missing_ok=True)
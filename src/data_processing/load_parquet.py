@@ -0,0 +1,106 @@
+import numbers
+import pandas as pd
+import pyarrow.dataset as ds
+from config.settings import RATINGS_PARQUET_PATH, TAGS_PARQUET_PATH
+from data_processing.ratings_to_parquet import PARTITIONING
+
+
+def _to_unix_seconds(value):
+    if isinstance(value, numbers.Real):
+        return int(value)
+    return int(pd.Timestamp(value).timestamp())
+
+
+def _month_bound(year_field, month_field, timestamp, lower):
+    """Partition predicate selecting the months at or after (lower) / at or before (upper) `timestamp`."""
+    ts = pd.Timestamp(timestamp, unit="s")
+    if lower:
+        return (year_field > ts.year) | ((year_field == ts.year) & (month_field >= ts.month))
+    return (year_field < ts.year) | ((year_field == ts.year) & (month_field <= ts.month))
+
+
+def build_filter(start=None, end=None, movie_ids=None, user_ids=None):
+    """
+    Builds a dataset filter for a half-open time range [start, end) and optional ID sets.
+
+    Bounds on the `year`/`month` partition keys are added alongside the
+    `timestamp` bounds so that partitions outside the range are never opened.
+    """
+    year, month, timestamp = ds.field("year"), ds.field("month"), ds.field("timestamp")
+    conditions = []
+    if start is not None:
+        start = _to_unix_seconds(start)
+        conditions += [_month_bound(year, month, start, lower=True), timestamp >= start]
+    if end is not None:
+        end = _to_unix_seconds(end)
+        conditions += [_month_bound(year, month, end - 1, lower=False), timestamp < end]
+    if movie_ids is not None:
+        conditions.append(ds.field("movie_id").isin(list(movie_ids)))
+    if user_ids is not None:
+        conditions.append(ds.field("user_id").isin(list(user_ids)))
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _load(path, columns, start, end, movie_ids, user_ids):
+    if not path.exists():
+        raise FileNotFoundError(f"{path} not found; run data_processing.ratings_to_parquet (or the MovieLens import) first.")
+    dataset = ds.dataset(path, format="parquet", partitioning=PARTITIONING)
+    table = dataset.to_table(columns=columns, filter=build_filter(start, end, movie_ids, user_ids))
+    return table.to_pandas()
+
+
+def load_ratings(columns=None, start=None, end=None, movie_ids=None, user_ids=None, path=RATINGS_PARQUET_PATH):
+    """
+    Loads user ratings from the partitioned Parquet store.
+
+    Column selection and filters are pushed down to the files: only the
+    year/month partitions overlapping [start, end) are read, and only the
+    requested columns are decoded.
+
+    Parameters:
+    -----------
+    columns : list of str, optional
+        Columns to load, from user_id, movie_id, rating, timestamp, year, month. Default is all.
+    start, end : str, datetime-like or int, optional
+        Half-open time range; ints are Unix seconds, anything else is parsed as a UTC date.
+    movie_ids, user_ids : iterable of int, optional
+        Restrict to these TMDb movie IDs / MovieLens user IDs.
+    path : Path, optional
+        Location of the ratings dataset.
+
+    Returns:
+    --------
+    pd.DataFrame
+        Ratings with compact dtypes (int32 IDs, float32 rating, int64 timestamp).
+
+    Examples:
+    ---------
+    >>> load_ratings(columns=["movie_id", "timestamp"], start="2016-01-01")
+    """
+    return _load(path, columns, start, end, movie_ids, user_ids)
+
+
+def load_tags(columns=None, start=None, end=None, movie_ids=None, user_ids=None, path=TAGS_PARQUET_PATH):
+    """
+    Loads user tags from the partitioned Parquet store.
+
+    Parameters:
+    -----------
+    columns : list of str, optional
+        Columns to load, from tag_id, user_id, movie_id, tag, timestamp, year, month. Default is all.
+    start, end : str, datetime-like or int, optional
+        Half-open time range; see `load_ratings`.
+    movie_ids, user_ids : iterable of int, optional
+        Restrict to these TMDb movie IDs / MovieLens user IDs.
+    path : Path, optional
+        Location of the tags dataset.
+
+    Returns:
+    --------
+    pd.DataFrame
+    """
+    return _load(path, columns, start, end, movie_ids, user_ids)
@@ -1,6 +1,11 @@
-import sqlite3
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-from config.settings import DB_PATH, DATA_PROCESSING_SQL_PATH as SQL_PATH
+from config.settings import DB_PATH, DATA_PROCESSING_SQL_PATH as SQL_PATH, MOVIE_INFO_CACHE_SIZE
+from data_processing import multi_hot, career_scores, movie_features, compact_frames, feature_cache
+from data_processing.db_connection import read_connection
 
 
 def fetch_one_hot_genres(vote_count_min=0):
@@ -26,144 +31,356 @@ def fetch_one_hot_genres(vote_count_min=0):
     ------
     - Only genres listed in the `genre` table are considered.
     - If a movie has no listed genres, all genre columns will be 0.
+    - Built from the shared, cached encoding in `multi_hot.py`; columns are uint8.
     """
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-
-        # Get all unique genres from the genre table
-        cursor.execute("SELECT DISTINCT name FROM genre")
-        genres = [row[0] for row in cursor.fetchall()]
-
-        # Return an empty DataFrame if no genres exist
-        if not genres:
-            return pd.DataFrame(columns=["movie_id"])
-
-        # Dynamically generate the SQL query
-        case_statements = [f"MAX(CASE WHEN gp.genre_name = ? THEN 1 ELSE 0 END) AS `genre_{genre}`" for genre in genres]
-
-        query = f"""
-        WITH GenrePivot AS (
-            SELECT 
-                mg.movie_id, 
-                g.name AS genre_name
-            FROM movie_genre mg
-            JOIN genre g ON mg.genre_id = g.genre_id
-        )
-        SELECT 
-            m.movie_id,
-            {", ".join(case_statements)}
-        FROM movie m
-        LEFT JOIN GenrePivot gp ON m.movie_id = gp.movie_id
-        WHERE m.vote_count >={vote_count_min}
-        GROUP BY m.movie_id;
+    encoding = fetch_multi_hot("genre", vote_count_min, sparse=False)
+    if not encoding.labels:
+        return pd.DataFrame(columns=["movie_id"])
+    return encoding.to_frame(prefix="genre_")
+
+
+def fetch_multi_hot(vocabulary, vote_count_min=0, sparse=None):
+    """
+    Fetches the multi-hot encoding of genres, keywords or production companies.
+
+    Parameters:
+    -----------
+    vocabulary : {"genre", "keyword", "production_company"}
+    vote_count_min : numeric, optional
+        The minimum vote count a movie must have to be included in the results. Default is 0.
+    sparse : bool, optional
+        Return a scipy CSR matrix rather than a dense uint8 array. Default is
+        sparse for large vocabularies (keywords, companies), dense for genres.
+
+    Returns:
+    --------
+    multi_hot.MultiHot
+        `movie_ids`, `labels` and the movies x labels `matrix`.
+    """
+    encoding = multi_hot.encode(vocabulary, sparse=sparse, db_path=DB_PATH)
+    movie_ids = [row[0] for row in read_connection(DB_PATH).execute(
+        "SELECT movie_id FROM movie WHERE vote_count >= ? ORDER BY movie_id", (vote_count_min,)
+    )]
+    return encoding.rows(movie_ids)
+
+
+
+def fetch_scores(lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order, min_votes=30, use_sql=False):
+    """
+    Fetches the time-decayed director, writer, cast and production company scores of each movie.
+
+    Computed by the NumPy engine in `career_scores.py` unless `use_sql` is set,
+    in which case the reference query generate_scores.sql is run instead; both
+    give the same scores.
+    """
+    if not use_sql:
+        engine = career_scores.get_engine(DB_PATH)
+        return engine.scores(lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order, min_votes)
+
+    cursor = read_connection(DB_PATH).cursor()
+
+    # Read the SQL query from the file generate_scores.sql
+    with open(SQL_PATH / 'generate_scores.sql', 'r') as f:
+        query = f.read()
+
+    # Execute the query with the passed parameters
+    cursor.execute(query, (lambda_director, lambda_director,
+                           lambda_writers, lambda_writers,
+                           lambda_cast_time, lambda_cast_order,
+                           lambda_cast_time, lambda_cast_order,
+                           lambda_cast_time, lambda_cast_order,
+                           min_votes
+                           ))
+
+    # Fetch and return the results into a pandas DataFrame
+    return pd.DataFrame(cursor.fetchall(), columns=["movie_id", "director_score", "writer_score", "cast_score", "production_company_score"])
+
+def fetch_scores_grid(lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order, min_votes=30, correlate=False):
+    """
+    Evaluates the scores of `fetch_scores` for every combination of several lambda values at once.
+
+    Parameters:
+    -----------
+    lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order : array-like
+        The values to try for each decay rate (a scalar is a one-value axis).
+    min_votes : int, optional
+        The minimum vote count a movie must have to be included. Default is 30.
+    correlate : bool, optional
+        Also return the correlation of each score with `vote_average` at every grid point.
+
+    Returns:
+    --------
+    career_scores.ScoreGrid
+        The scores labelled by their lambda axes; `grid.scores(ld, lw, lct, lco)`
+        gives the `fetch_scores` DataFrame of one combination.
+    dict, if `correlate`
+        `grid.correlations()`: Series over lambda_director and lambda_writers,
+        a lambda_cast_time x lambda_cast_order DataFrame for the cast score.
+
+    Notes:
+    ------
+    - Each score depends only on its own lambdas, so a 20 x 20 cast grid is
+      one pass over the cast timelines rather than 400 queries.
+    """
+    engine = career_scores.get_engine(DB_PATH)
+    grid = engine.score_grid(lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order, min_votes)
+    if correlate:
+        return grid, grid.correlations()
+    return grid
+
+def _predict_success_frame(lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order, min_votes):
+    """Runs the three feature steps concurrently, each on its thread's read connection, and merges them."""
+    query = f"""
+        SELECT *
+        -- movie_id, vote_average, runtime, num_cast_members, release_date
+        FROM {movie_features.read_source(read_connection(DB_PATH))};
         """
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        # Initial numeric features, genres, and scores (only using tmdb data)
+        features = executor.submit(lambda: pd.read_sql_query(query, read_connection(DB_PATH)))
+        genres = executor.submit(fetch_one_hot_genres, vote_count_min=min_votes)
+        scores = executor.submit(fetch_scores, lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order, min_votes)
+        df = pd.merge(features.result(), genres.result(), on='movie_id')
+        return pd.merge(df, scores.result(), on='movie_id')
 
-        # Execute the query with parameterized genre values
-        return pd.read_sql_query(query, conn, params=genres)
-
-
-
-def fetch_scores(lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order, min_votes=30):
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-    
-        # Read the SQL query from the file generate_scores.sql
-        with open(SQL_PATH / 'generate_scores.sql', 'r') as f:
-            query = f.read()
-        
-        # Execute the query with the passed parameters
-        cursor.execute(query, (lambda_director, lambda_director, 
-                               lambda_writers, lambda_writers, 
-                               lambda_cast_time, lambda_cast_order,
-                               lambda_cast_time, lambda_cast_order,
-                               lambda_cast_time, lambda_cast_order,
-                               min_votes
-                               ))
-        
-        # Fetch and return the results into a pandas DataFrame
-        return pd.DataFrame(cursor.fetchall(), columns=["movie_id", "director_score", "writer_score", "cast_score", "production_company_score"])
-
-def fetch_predict_success_data(lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order, min_votes=30):
-    # Get initial numeric features
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        query = """
-            SELECT *
-            -- movie_id, vote_average, runtime, num_cast_members, release_date
-            FROM movie_rating_features;
-            """
-        df = pd.read_sql_query(query, conn)
 
-    # Add genres
-    df_genre = fetch_one_hot_genres(vote_count_min=min_votes)
-    df = pd.merge(df, df_genre, on='movie_id')
+def fetch_predict_success_data(lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order, min_votes=30, cache=True):
+    """
+    Fetches the model features: movie_rating_features, one-hot genres and the career scores of `fetch_scores`.
+
+    The three parts are computed concurrently. The merged frame is cached as
+    Parquet under FEATURE_CACHE_PATH, keyed by the lambdas, `min_votes` and the
+    database fingerprint, so repeated calls with the same arguments read it back
+    instead of recomputing; any write to the database gives a new fingerprint
+    and the old entries are dropped. See feature_cache.py for the eviction.
 
-    # Add scores (only using tmdb data)
-    df_scores = fetch_scores(lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order, min_votes)
-    df = pd.merge(df, df_scores, on='movie_id')
+    Parameters:
+    -----------
+    lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order : float
+        Decay rates of the scores, as in `fetch_scores`.
+    min_votes : int, optional
+        The minimum vote count a movie must have to be included. Default is 30.
+    cache : bool, optional
+        Read and write the on-disk cache. Default is True.
+
+    Returns:
+    --------
+    pd.DataFrame
+    """
+    if not cache:
+        return _predict_success_frame(lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order, min_votes)
 
+    key, description = feature_cache.cache_key(
+        DB_PATH, multi_hot.database_fingerprint(DB_PATH), lambda_director=lambda_director, lambda_writers=lambda_writers,
+        lambda_cast_time=lambda_cast_time, lambda_cast_order=lambda_cast_order, min_votes=min_votes,
+    )
+    df = feature_cache.load(key)
+    if df is None:
+        df = _predict_success_frame(lambda_director, lambda_writers, lambda_cast_time, lambda_cast_order, min_votes)
+        feature_cache.store(key, description, df)
     return df
 
-def fetch_movie_rating_features(min_votes=30):
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        query = f"""
-                SELECT * FROM movie_rating_features
-                WHERE vote_count >= {min_votes}
-                ;"""
-        return pd.read_sql_query(query, conn)
-
-def fetch_movies(add_one_hot_genres=False):
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        query = """SELECT * FROM movie;"""
-        df = pd.read_sql_query(query, conn)
-
-    df['release_date'] = pd.to_datetime(df['release_date'])
+def _fetch(query, params=(), dtype_backend=None, chunksize=None):
+    """
+    Runs a loader query: through pd.read_sql_query when `dtype_backend` is None,
+    else as compact NumPy or Arrow-backed frames (see compact_frames.py).
+    Returns an iterator of DataFrames when `chunksize` is given.
+    """
+    if dtype_backend is None:
+        return pd.read_sql_query(query, read_connection(DB_PATH), params=params, chunksize=chunksize)
+    if chunksize:
+        return compact_frames.iter_frames(DB_PATH, query, params, dtype_backend, chunksize)
+    return compact_frames.read_frame(read_connection(DB_PATH), query, params, dtype_backend)
+
+
+def _map_chunks(result, function):
+    """Applies `function` to a DataFrame, or lazily to each DataFrame of an iterator."""
+    if isinstance(result, pd.DataFrame):
+        return function(result)
+    return (function(chunk) for chunk in result)
+
+
+def fetch_movie_rating_features(min_votes=30, dtype_backend=None, chunksize=None):
+    """
+    Fetches the movie_rating_features of movies with at least `min_votes` votes.
+
+    Read from the materialized copy of the view when it is up to date, else
+    from the view; the loaders never write, the build's movie_features stage
+    refreshes the copy.
+
+    Parameters:
+    -----------
+    min_votes : int, optional
+        Default is 30.
+    dtype_backend : {None, "numpy", "pyarrow"}, optional
+        None reads through pandas as before. "numpy" and "pyarrow" give compact
+        columns (int32 IDs and counts, float32 averages, categorical titles,
+        datetime release dates), NumPy- or Arrow-backed.
+    chunksize : int, optional
+        Return an iterator of DataFrames of at most this many rows.
+    """
+    query = f"""
+            SELECT * FROM {movie_features.read_source(read_connection(DB_PATH))}
+            WHERE vote_count >= ?
+            ;"""
+    return _fetch(query, (min_votes,), dtype_backend, chunksize)
+
+def fetch_movies(add_one_hot_genres=False, dtype_backend=None, chunksize=None):
+    """
+    Fetches the movie table, with release dates parsed.
+
+    `dtype_backend` and `chunksize` are as in `fetch_movie_rating_features`.
+    """
+    query = """SELECT * FROM movie;"""
+    df = _fetch(query, dtype_backend=dtype_backend, chunksize=chunksize)
+
+    if dtype_backend is None:
+        df = _map_chunks(df, lambda chunk: chunk.assign(release_date=pd.to_datetime(chunk['release_date'])))
     if add_one_hot_genres:
-        df = pd.merge(df, fetch_one_hot_genres(), on='movie_id')
+        df_genre = fetch_one_hot_genres()
+        df = _map_chunks(df, lambda chunk: pd.merge(chunk, df_genre, on='movie_id'))
 
     return df
 
-def fetch_user_movie_ratings(tmdb_only=False):
+def fetch_user_movie_ratings(tmdb_only=False, dtype_backend=None, chunksize=None):
+    """
+    Fetches the MovieLens ratings, optionally only those of movies in the TMDb `movie` table.
+
+    With `dtype_backend` the ratings take 20 bytes a row (int32 IDs, float32
+    rating, int64 timestamp) instead of four Python objects; with `chunksize`
+    they can be aggregated in bounded memory, e.g.
+
+        for chunk in fetch_user_movie_ratings(dtype_backend="numpy", chunksize=1_000_000):
+            counts = counts.add(chunk["movie_id"].value_counts(), fill_value=0)
+    """
     if tmdb_only:
         query = """
-                SELECT ml.tmdb_id AS movie_id, umr.user_id, umr.rating, umr.timestamp
-                FROM user_movie_rating umr 
-                JOIN movie_link ml ON ml.movielens_id = umr.movielens_id
-                WHERE ml.tmdb_id IS NOT NULL
+                SELECT umr.movie_id, umr.user_id, umr.rating, umr.timestamp
+                FROM user_movie_rating umr
+                WHERE umr.movie_id IN (SELECT movie_id FROM movie)
                 """
     else:
         query = "SELECT * FROM user_movie_rating"
 
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        return pd.read_sql_query(query, conn)
+    return _fetch(query, dtype_backend=dtype_backend, chunksize=chunksize)
 
 
-def fetch_tmdb_to_movielens_id_map():
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        query = """
-                SELECT tmdb_id, movielens_id 
-                FROM movie_link
-                WHERE tmdb_id IS NOT NULL
-                """
-        return pd.read_sql_query(query, conn)
+def fetch_tmdb_to_movielens_id_map(dtype_backend=None, chunksize=None):
+    """Fetches (tmdb_id, movielens_id) pairs; `dtype_backend` and `chunksize` as in `fetch_user_movie_ratings`."""
+    query = """
+            SELECT tmdb_id, movielens_id
+            FROM movie_link
+            WHERE tmdb_id IS NOT NULL
+            """
+    return _fetch(query, dtype_backend=dtype_backend, chunksize=chunksize)
+
+class _MovieInfoCache:
+    """Least recently used (title, release year) of up to `maxsize` movies, emptied whenever the database changes."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.source = None
+        self.lock = threading.Lock()
+
+    def lookup(self, source, movie_ids):
+        """Cached entries among `movie_ids`, marked as recently used."""
+        with self.lock:
+            if source != self.source:
+                self.entries.clear()
+                self.source = source
+            found = {}
+            for movie_id in movie_ids:
+                if movie_id in self.entries:
+                    self.entries.move_to_end(movie_id)
+                    found[movie_id] = self.entries[movie_id]
+            return found
+
+    def store(self, source, entries):
+        with self.lock:
+            if source != self.source:
+                return
+            self.entries.update(entries)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+_movie_info_cache = _MovieInfoCache(MOVIE_INFO_CACHE_SIZE)
+
+
+def _movie_info(movie_ids):
+    """(title, release year) of each movie, (None, None) if unknown, through the LRU cache."""
+    source = (str(DB_PATH), multi_hot.database_fingerprint(DB_PATH))
+    found = _movie_info_cache.lookup(source, movie_ids)
+    missing = list(dict.fromkeys(movie_id for movie_id in movie_ids if movie_id not in found))
+    if missing:
+        rows = read_connection(DB_PATH).execute("""
+            SELECT movie_id, title, CAST(strftime('%Y', release_date) AS INTEGER)
+            FROM movie WHERE movie_id IN (SELECT value FROM json_each(?))
+            """, (json.dumps(missing),)).fetchall()
+        fetched = {movie_id: (title, year) for movie_id, title, year in rows}
+        _movie_info_cache.store(source, fetched)
+        found.update(fetched)
+    return [found.get(movie_id, (None, None)) for movie_id in movie_ids]
+
+
+def fetch_movie_info(movie_ids):
+    """
+    Fetches the title and release year of many movies with at most one query.
+
+    Lookups are served from an in-memory LRU cache of MOVIE_INFO_CACHE_SIZE
+    movies, which is emptied when the database changes; only the missing IDs
+    are read, all together, on the shared read connection.
+
+    Parameters:
+    -----------
+    movie_ids : iterable of int
+
+    Returns:
+    --------
+    pd.DataFrame
+        Indexed by `movie_id` in the order given (repeats included), with
+        columns `title` and `release_year` (Int64). Unknown movies have missing
+        values in both.
+    """
+    movie_ids = [int(movie_id) for movie_id in movie_ids]
+    info = _movie_info(movie_ids)
+    return pd.DataFrame({
+        "title": pd.Series([title for title, _ in info], dtype=object),
+        "release_year": pd.array([year for _, year in info], dtype="Int64"),
+    }).set_axis(pd.Index(movie_ids, name="movie_id"))
+
+
+def fetch_movie_titles(movie_ids, include_release_year=True):
+    """
+    Fetches display titles, "Title (Year)" by default, for a list of movies.
+
+    Parameters:
+    -----------
+    movie_ids : iterable of int
+    include_release_year : bool, optional
+        Append the release year in parentheses (when it is known). Default is True.
+
+    Returns:
+    --------
+    pd.Series
+        Titles indexed by `movie_id` in the order given; None for unknown movies.
+    """
+    movie_ids = [int(movie_id) for movie_id in movie_ids]
+    titles = [
+        f"{title} ({year})" if include_release_year and title is not None and year is not None else title
+        for title, year in _movie_info(movie_ids)
+    ]
+    return pd.Series(titles, index=pd.Index(movie_ids, name="movie_id"), dtype=object)
+
 
 def fetch_movie_title(movie_id, include_release_year=True):
-    if include_release_year:
-        query = f"""
-                SELECT title || ' (' || strftime('%Y', release_date) ||')' 
-                FROM movie WHERE movie_id={movie_id}
-                """
-    else:
-        query = f"SELECT title FROM movie WHERE movie_id={movie_id}"
+    """Title of one movie; see `fetch_movie_titles`, which should be used for many movies at once."""
+    title = fetch_movie_titles([movie_id], include_release_year).iloc[0]
+    if title is None:
+        raise KeyError(f"No movie with movie_id {movie_id}")
+    return title
 
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute(query)
-        return cursor.fetchone()[0]  
 
 if __name__ == '__main__':
-    print(fetch_movie_title(603, True))
\ No newline at end of file
+    print(fetch_movie_title(603, True))
@@ -0,0 +1,105 @@
+import sys
+import hashlib
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timezone
+from config.settings import DB_PATH, METRICS_PATH
+from pipeline.metrics import ROWS_WRITTEN, export_at_exit, sqlite_connect
+
+VIEW = "movie_rating_features"
+TABLE = "movie_rating_features_mat"
+
+
+def view_definition_hash(conn, view=VIEW):
+    """SHA-256 of the view's CREATE VIEW statement as stored in sqlite_master."""
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'view' AND name = ?", (view,)).fetchone()
+    if row is None:
+        raise sqlite3.OperationalError(f"no such view: {view}")
+    return hashlib.sha256(row[0].encode()).hexdigest()
+
+
+def _is_stale(conn, definition_hash):
+    """True if the table must be rebuilt: it is missing or was built from another view definition."""
+    row = conn.execute("SELECT definition_hash FROM materialized_view_state WHERE view_name = ?", (VIEW,)).fetchone()
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TABLE,)).fetchone()
+    return row is None or row[0] != definition_hash or exists is None
+
+
+def read_source(conn):
+    """
+    The relation readers should query without writing: the materialized table
+    when it is up to date, else the view itself, which is slower but current.
+    """
+    if _is_stale(conn, view_definition_hash(conn)) or \
+            conn.execute("SELECT 1 FROM movie_feature_dirty LIMIT 1").fetchone() is not None:
+        return VIEW
+    return TABLE
+
+
+def _rebuild(conn):
+    """Recreates the table from the view's current columns and fills it for every movie."""
+    columns = conn.execute(f"PRAGMA table_info({VIEW})").fetchall()
+    definitions = [
+        f"{name} INTEGER PRIMARY KEY" if name == "movie_id" else f"{name} {declared_type}".strip()
+        for _, name, declared_type, *_ in columns
+    ]
+    conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    conn.execute(f"CREATE TABLE {TABLE} ({', '.join(definitions)})")
+    rows = conn.execute(f"INSERT INTO {TABLE} SELECT * FROM {VIEW}").rowcount
+    if any(name == "vote_count" for _, name, *_ in columns):
+        conn.execute(f"CREATE INDEX idx_{TABLE}_vote_count ON {TABLE}(vote_count)")
+    conn.execute("DELETE FROM movie_feature_dirty")
+    return rows
+
+
+def _refresh_dirty(conn):
+    """Recomputes the rows of the movies flagged by the triggers; movies that no longer exist are dropped."""
+    conn.execute(f"DELETE FROM {TABLE} WHERE movie_id IN (SELECT movie_id FROM movie_feature_dirty)")
+    conn.execute(f"INSERT INTO {TABLE} SELECT * FROM {VIEW} WHERE movie_id IN (SELECT movie_id FROM movie_feature_dirty)")
+    return conn.execute("DELETE FROM movie_feature_dirty").rowcount
+
+
+def refresh_movie_rating_features(db_path=DB_PATH, full=False):
+    """
+    Brings movie_rating_features_mat up to date with the movie_rating_features view.
+
+    The triggers in create_triggers.sql record every movie whose movie,
+    cast, crew, company or genre rows are written, and only those movies are
+    recomputed. The table is rebuilt from scratch when it does not exist yet
+    or when the view definition has changed since it was built. When nothing
+    changed this is two small reads and no write.
+
+    Args:
+        db_path (Path or str): The database to refresh.
+        full (bool): Rebuild the whole table regardless.
+
+    Returns:
+        tuple: ("rebuilt", "refreshed" or "fresh", number of movies recomputed).
+    """
+    with closing(sqlite_connect(db_path)) as conn:
+        definition_hash = view_definition_hash(conn)
+        if not full and not _is_stale(conn, definition_hash) and \
+                conn.execute("SELECT 1 FROM movie_feature_dirty LIMIT 1").fetchone() is None:
+            return "fresh", 0
+
+        # Take the write lock before deciding, so triggers cannot flag movies in between
+        conn.execute("BEGIN IMMEDIATE")
+        if full or _is_stale(conn, definition_hash):
+            status, count = "rebuilt", _rebuild(conn)
+        else:
+            status, count = "refreshed", _refresh_dirty(conn)
+        conn.execute("""
+            INSERT INTO materialized_view_state (view_name, definition_hash, refreshed_at) VALUES (?, ?, ?)
+            ON CONFLICT(view_name) DO UPDATE SET
+                definition_hash = excluded.definition_hash,
+                refreshed_at = excluded.refreshed_at
+            """, (VIEW, definition_hash, datetime.now(timezone.utc).isoformat(timespec="seconds")))
+        conn.commit()
+    ROWS_WRITTEN.inc(count, table=TABLE)
+    return status, count
+
+
+if __name__ == "__main__":
+    export_at_exit(METRICS_PATH / "movie_features")
+    status, count = refresh_movie_rating_features(full="--full" in sys.argv[1:])
+    print(f"{TABLE}: {status} ({count} movies)")
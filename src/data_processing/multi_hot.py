@@ -0,0 +1,147 @@
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from dataclasses import dataclass
+from pathlib import Path
+from config.settings import DB_PATH, MULTI_HOT_CACHE_PATH
+from data_processing.db_connection import read_connection
+
+# vocabulary -> (label table, label id column, movie link table)
+VOCABULARIES = {
+    "genre": ("genre", "genre_id", "movie_genre"),
+    "keyword": ("keyword", "keyword_id", "movie_keyword"),
+    "production_company": ("production_company", "company_id", "movie_production_company"),
+}
+
+# Vocabularies larger than this are returned as sparse matrices by default
+DENSE_MAX_LABELS = 256
+
+
+def database_fingerprint(db_path=DB_PATH):
+    """
+    Cheap change marker for a SQLite database: size and mtime of the file and of its WAL.
+
+    Any committed write changes one of them, so caches keyed on it are
+    invalidated whenever the data may have changed.
+    """
+    marks = []
+    for path in (str(db_path), f"{db_path}-wal"):
+        # An empty WAL comes and goes with reader connections and holds no data
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            stat = os.stat(path)
+            marks.append(f"{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(marks)
+
+
+def cache_path(vocabulary, db_path=DB_PATH):
+    """The cache file of one vocabulary of one database, so encodings of several databases do not evict each other."""
+    database = hashlib.sha256(str(Path(db_path).resolve()).encode()).hexdigest()[:16]
+    return MULTI_HOT_CACHE_PATH / f"{vocabulary}-{database}.npz"
+
+
+@dataclass
+class MultiHot:
+    """
+    Multi-hot encoding of one vocabulary.
+
+    Attributes:
+        movie_ids (np.ndarray): Movie ID of each row, sorted.
+        label_ids (np.ndarray): Label ID of each column, sorted.
+        labels (list): Label name of each column.
+        matrix (np.ndarray or scipy.sparse.csr_matrix): uint8 movies x labels, 1 where the movie has the label.
+    """
+    movie_ids: np.ndarray
+    label_ids: np.ndarray
+    labels: list
+    matrix: object
+
+    def rows(self, movie_ids):
+        """Restricts the encoding to `movie_ids` (which must be present), in that order."""
+        index = np.searchsorted(self.movie_ids, movie_ids)
+        return MultiHot(np.asarray(movie_ids), self.label_ids, self.labels, self.matrix[index])
+
+    def to_frame(self, prefix="", rename=None):
+        """
+        Dense DataFrame with a `movie_id` column and one uint8 column per label.
+
+        Column names are `prefix + rename(label)`; `rename` defaults to the label unchanged.
+        """
+        matrix = self.matrix.toarray() if sp.issparse(self.matrix) else self.matrix
+        rename = rename or (lambda label: label)
+        columns = [f"{prefix}{rename(label)}" for label in self.labels]
+        df = pd.DataFrame(matrix, columns=columns)
+        df.insert(0, "movie_id", self.movie_ids)
+        return df
+
+
+def _build(vocabulary, conn):
+    label_table, label_column, link_table = VOCABULARIES[vocabulary]
+    movie_ids = np.array([row[0] for row in conn.execute("SELECT movie_id FROM movie ORDER BY movie_id")], dtype=np.int64)
+    labels = conn.execute(f"SELECT {label_column}, name FROM {label_table} ORDER BY {label_column}").fetchall()
+    label_ids = np.array([label_id for label_id, _ in labels], dtype=np.int64)
+    pairs = np.array(conn.execute(f"SELECT movie_id, {label_column} FROM {link_table}").fetchall(), dtype=np.int64).reshape(-1, 2)
+
+    # Scatter (movie, label) pairs into row/column positions, dropping pairs whose movie or label is unknown
+    rows = np.searchsorted(movie_ids, pairs[:, 0])
+    cols = np.searchsorted(label_ids, pairs[:, 1])
+    known = (rows < len(movie_ids)) & (cols < len(label_ids))
+    known[known] &= (movie_ids[rows[known]] == pairs[known, 0]) & (label_ids[cols[known]] == pairs[known, 1])
+    matrix = sp.csr_matrix(
+        (np.ones(known.sum(), dtype=np.uint8), (rows[known], cols[known])),
+        shape=(len(movie_ids), len(label_ids)), dtype=np.uint8
+    )
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return MultiHot(movie_ids, label_ids, [name for _, name in labels], matrix)
+
+
+def encode(vocabulary, sparse=None, db_path=DB_PATH, cache=True):
+    """
+    Multi-hot encodes every movie in the database for one vocabulary.
+
+    The (movie_id, label_id) pairs are fetched once and scattered into a
+    matrix, so the cost does not grow with the number of labels. The result is
+    cached as `.npz` under MULTI_HOT_CACHE_PATH, one file per vocabulary and
+    database, and reused until that database changes.
+
+    Args:
+        vocabulary (str): "genre", "keyword" or "production_company".
+        sparse (bool, optional): Return a scipy CSR matrix instead of a dense
+            uint8 array. Default: sparse for vocabularies with more than
+            DENSE_MAX_LABELS labels.
+        db_path (Path or str): The database to encode.
+        cache (bool): Read and write the on-disk cache.
+
+    Returns:
+        MultiHot: One row per movie (sorted by movie_id), one column per label.
+    """
+    if vocabulary not in VOCABULARIES:
+        raise ValueError(f"Unknown vocabulary {vocabulary!r}; expected one of {sorted(VOCABULARIES)}")
+
+    path = cache_path(vocabulary, db_path)
+    fingerprint = database_fingerprint(db_path)
+    encoding = None
+    if cache and path.exists():
+        with np.load(path, allow_pickle=False) as cached:
+            if str(cached["db_fingerprint"]) == fingerprint and str(cached["db_path"]) == str(db_path):
+                matrix = sp.csr_matrix((cached["data"], cached["indices"], cached["indptr"]), shape=tuple(cached["shape"]))
+                encoding = MultiHot(cached["movie_ids"], cached["label_ids"], cached["labels"].tolist(), matrix)
+
+    if encoding is None:
+        encoding = _build(vocabulary, read_connection(db_path))
+        if cache:
+            MULTI_HOT_CACHE_PATH.mkdir(parents=True, exist_ok=True)
+            matrix = encoding.matrix
+            tmp_path = path.with_name(path.stem + ".tmp.npz")
+            np.savez(tmp_path, movie_ids=encoding.movie_ids, label_ids=encoding.label_ids,
+                     labels=np.array(encoding.labels, dtype=str), data=matrix.data, indices=matrix.indices,
+                     indptr=matrix.indptr, shape=np.array(matrix.shape), db_fingerprint=fingerprint, db_path=str(db_path))
+            tmp_path.replace(path)
+
+    if sparse is None:
+        sparse = len(encoding.labels) > DENSE_MAX_LABELS
+    if not sparse:
+        encoding.matrix = encoding.matrix.toarray()
+    return encoding
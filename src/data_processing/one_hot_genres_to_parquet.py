@@ -1,30 +1,14 @@
 import pandas as pd
 import sqlite3
 from config.settings import DB_PATH, PROCESSED_DATA_PATH
+from data_processing import multi_hot
 
 with sqlite3.connect(DB_PATH) as conn:
+    movies = pd.read_sql_query("SELECT * FROM movie ORDER BY movie_id", conn)
 
-    # Get distinct genre names
-    genre_names = pd.read_sql_query("SELECT DISTINCT name FROM genre", conn)["name"].tolist()
-
-    # Build SQL to one-hot encode genres per movie
-    genre_columns = [
-        f"MAX(CASE WHEN g.name = '{genre}' THEN 1 ELSE 0 END) AS genre_{genre.replace(' ', '_')}"
-        for genre in genre_names
-    ]
-    genre_sql = ",\n    ".join(genre_columns)
-
-    query = f"""
-    SELECT
-        m.*,
-        {genre_sql}
-    FROM movie AS m
-    LEFT JOIN movie_genre AS mg ON m.movie_id = mg.movie_id
-    LEFT JOIN genre AS g ON mg.genre_id = g.genre_id
-    GROUP BY m.movie_id
-    """
-
-    df = pd.read_sql_query(query, conn)
+# One-hot encode genres per movie from the shared (cached) encoding
+genres = multi_hot.encode("genre", sparse=False, db_path=DB_PATH).rows(movies["movie_id"].to_numpy())
+df = pd.concat([movies, genres.to_frame(prefix="genre_", rename=lambda genre: genre.replace(" ", "_")).drop(columns="movie_id")], axis=1)
 
 # Output to a parquet file
 output_path = PROCESSED_DATA_PATH / "movie_genres_onehot.parquet"
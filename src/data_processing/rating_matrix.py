@@ -0,0 +1,233 @@
+import os
+import time
+import json
+import numpy as np
+import scipy.sparse as sp
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from config.settings import RATING_MATRIX_PATH, RATINGS_PARQUET_PATH
+from data_processing.load_parquet import load_ratings
+
+
+def build_rating_matrix(output_path=RATING_MATRIX_PATH, ratings_path=RATINGS_PARQUET_PATH):
+    """
+    Builds the user x movie rating matrix in CSR form and saves it as memory-mappable .npy files.
+
+    Users and movies are remapped to dense row/column indices; `user_ids.npy`
+    and `movie_ids.npy` hold the original IDs in index order (both sorted).
+    Indices are int32 and values float32. When a user rated a movie more than
+    once, the latest rating is kept.
+
+    Parameters:
+    -----------
+    output_path : Path, optional
+        Directory that receives indptr.npy, indices.npy, data.npy, user_ids.npy, movie_ids.npy and shape.json.
+    ratings_path : Path, optional
+        Location of the Parquet ratings store (see ratings_to_parquet.py).
+
+    Returns:
+    --------
+    scipy.sparse.csr_matrix
+        The matrix, memory-mapped from the saved files.
+    """
+    start = time.perf_counter()
+    ratings = load_ratings(columns=["user_id", "movie_id", "rating", "timestamp"], path=ratings_path)
+    user_ids, rows = np.unique(ratings["user_id"].to_numpy(), return_inverse=True)
+    movie_ids, cols = np.unique(ratings["movie_id"].to_numpy(), return_inverse=True)
+    values = ratings["rating"].to_numpy(dtype=np.float32)
+    order = np.lexsort((ratings["timestamp"].to_numpy(), cols, rows))
+    del ratings
+
+    rows, cols, values = rows[order], cols[order].astype(np.int32), values[order]
+    del order
+    # Keep the last (latest) entry of every (user, movie) run
+    last = np.ones(len(rows), dtype=bool)
+    last[:-1] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+    rows, cols, values = rows[last], cols[last], values[last]
+
+    index_dtype = np.int32 if len(cols) < np.iinfo(np.int32).max else np.int64
+    indptr = np.zeros(len(user_ids) + 1, dtype=index_dtype)
+    np.cumsum(np.bincount(rows, minlength=len(user_ids)), out=indptr[1:])
+
+    output_path.mkdir(parents=True, exist_ok=True)
+    for name, array in [("indptr", indptr), ("indices", cols.astype(index_dtype, copy=False)), ("data", values),
+                        ("user_ids", user_ids.astype(np.int32)), ("movie_ids", movie_ids.astype(np.int32))]:
+        np.save(output_path / f"{name}.npy", array)
+    (output_path / "shape.json").write_text(json.dumps([len(user_ids), len(movie_ids)]))
+    print(f"Saved {len(user_ids):,} x {len(movie_ids):,} rating matrix ({len(values):,} ratings) "
+          f"to {output_path} in {time.perf_counter() - start:.1f}s")
+    return load_rating_matrix(output_path)
+
+
+def load_rating_matrix(path=RATING_MATRIX_PATH, mmap=True):
+    """
+    Loads the saved CSR rating matrix.
+
+    With `mmap=True` the arrays are memory-mapped read-only, so any number of
+    processes loading the same files share one copy in the page cache.
+
+    Returns:
+    --------
+    scipy.sparse.csr_matrix
+    """
+    mmap_mode = "r" if mmap else None
+    shape = tuple(json.loads((path / "shape.json").read_text()))
+    arrays = [np.load(path / f"{name}.npy", mmap_mode=mmap_mode) for name in ("data", "indices", "indptr")]
+    return sp.csr_matrix(tuple(arrays), shape=shape, copy=False)
+
+
+def load_rating_matrix_ids(path=RATING_MATRIX_PATH):
+    """Returns the (user_ids, movie_ids) arrays mapping matrix rows/columns back to IDs."""
+    return np.load(path / "user_ids.npy"), np.load(path / "movie_ids.npy")
+
+
+def normalized_item_vectors(matrix, center=True, min_ratings=20):
+    """
+    Item x user matrix with unit-norm rows, ready for cosine similarity.
+
+    With `center`, each user's mean rating is subtracted first (adjusted
+    cosine). Movies with fewer than `min_ratings` ratings get all-zero rows,
+    so they neither receive nor appear as neighbours.
+    """
+    matrix = matrix.astype(np.float32)
+    if center:
+        counts = np.diff(matrix.indptr)
+        means = np.asarray(matrix.sum(axis=1)).ravel() / np.maximum(counts, 1)
+        matrix.data -= np.repeat(means, counts).astype(np.float32)
+
+    items = matrix.T.tocsr()
+    counts = np.diff(items.indptr)
+    norms = np.sqrt(np.asarray(items.multiply(items).sum(axis=1)).ravel())
+    scale = np.where((counts >= min_ratings) & (norms > 0), 1 / np.maximum(norms, 1e-12), 0).astype(np.float32)
+    return sp.diags(scale) @ items
+
+
+ITEM_VECTOR_ARRAYS = ("item_data", "item_indices", "item_indptr")
+
+
+def save_item_vectors(items, path=RATING_MATRIX_PATH):
+    """Saves the output of `normalized_item_vectors` next to the rating matrix as memory-mappable .npy files."""
+    items = items.tocsr()
+    for name, array in zip(ITEM_VECTOR_ARRAYS, (items.data, items.indices, items.indptr)):
+        np.save(path / f"{name}.npy", array)
+
+
+def load_item_vectors(path=RATING_MATRIX_PATH):
+    """The saved item x user vectors, memory-mapped read-only."""
+    n_users, n_movies = json.loads((path / "shape.json").read_text())
+    arrays = [np.load(path / f"{name}.npy", mmap_mode="r") for name in ITEM_VECTOR_ARRAYS]
+    return sp.csr_matrix(tuple(arrays), shape=(n_movies, n_users), copy=False)
+
+
+def _top_k_block(items_path, index_path, low, high, k):
+    """
+    Computes the top-k neighbours of items [low, high) and writes them into the shared output files.
+
+    Runs in a worker process. The normalized item vectors are memory-mapped
+    and used in place: only the block's rows are copied, as the right-hand
+    operand, and the product is the block's n_movies x block_size slice.
+    """
+    items = load_item_vectors(items_path)
+    neighbors = np.load(index_path / "neighbors.npy", mmap_mode="r+")
+    scores = np.load(index_path / "scores.npy", mmap_mode="r+")
+
+    block = (items @ items[low:high].T).T.toarray()
+    block[np.arange(high - low), np.arange(low, high)] = -np.inf  # never your own neighbour
+    top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(block, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+    # Slots without a positive similarity are left empty (-1)
+    empty = ~(top_scores > 0)
+    neighbors[low:high] = np.where(empty, -1, top)
+    scores[low:high] = np.where(empty, 0, top_scores)
+    neighbors.flush()
+    scores.flush()
+    return high - low
+
+
+def build_item_similarity(k=50, matrix_path=RATING_MATRIX_PATH, block_size=256, workers=None, center=True, min_ratings=20):
+    """
+    Precomputes the top-k most similar movies of every movie (cosine over user ratings).
+
+    The normalized item vectors are computed once and saved next to the rating
+    matrix (`item_*.npy`). Similarities are then computed for `block_size`
+    movies at a time by worker processes that memory-map those files, so all
+    workers share one copy in the page cache and each only allocates its dense
+    block_size x n_movies slice. Blocks are written straight into the output
+    .npy files (`neighbors.npy`: int32 column indices, -1 when empty;
+    `scores.npy`: float32).
+
+    Parameters:
+    -----------
+    k : int, optional
+        Neighbours kept per movie. Default is 50.
+    matrix_path : Path, optional
+        Directory of the saved rating matrix; the index is written next to it.
+    block_size : int, optional
+        Movies per task.
+    workers : int, optional
+        Worker processes (default: CPU count).
+    center : bool, optional
+        Subtract each user's mean rating first (adjusted cosine). Default is True.
+    min_ratings : int, optional
+        Movies with fewer ratings are excluded. Default is 20.
+    """
+    start = time.perf_counter()
+    n_movies = json.loads((matrix_path / "shape.json").read_text())[1]
+    k = min(k, n_movies - 1)
+    save_item_vectors(normalized_item_vectors(load_rating_matrix(matrix_path), center, min_ratings), matrix_path)
+    np.lib.format.open_memmap(matrix_path / "neighbors.npy", mode="w+", dtype=np.int32, shape=(n_movies, k)).flush()
+    np.lib.format.open_memmap(matrix_path / "scores.npy", mode="w+", dtype=np.float32, shape=(n_movies, k)).flush()
+
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = [
+            executor.submit(_top_k_block, matrix_path, matrix_path, low, min(low + block_size, n_movies), k)
+            for low in range(0, n_movies, block_size)
+        ]
+        for future in futures:
+            done += future.result()
+            print(f"Similarity: {done:,}/{n_movies:,} movies", end="\r")
+    _load_similarity_index.cache_clear()
+    print(f"\nSaved top-{k} item similarity index to {matrix_path} in {time.perf_counter() - start:.1f}s")
+
+
+@lru_cache(maxsize=4)
+def _load_similarity_index(path):
+    movie_ids = np.load(path / "movie_ids.npy")
+    neighbors = np.load(path / "neighbors.npy", mmap_mode="r")
+    scores = np.load(path / "scores.npy", mmap_mode="r")
+    return movie_ids, neighbors, scores
+
+
+def similar_movies(movie_id, k=10, path=RATING_MATRIX_PATH):
+    """
+    Looks up the most similar movies from the precomputed index.
+
+    Parameters:
+    -----------
+    movie_id : int
+        TMDb ID of the movie.
+    k : int, optional
+        Number of neighbours to return (at most the k used to build the index).
+
+    Returns:
+    --------
+    list of (int, float)
+        (movie_id, similarity) pairs, most similar first. Empty if the movie is
+        unknown or had too few ratings.
+    """
+    movie_ids, neighbors, scores = _load_similarity_index(path)
+    index = np.searchsorted(movie_ids, movie_id)
+    if index >= len(movie_ids) or movie_ids[index] != movie_id:
+        return []
+    row = neighbors[index, :k]
+    found = row >= 0
+    return list(zip(movie_ids[row[found]].tolist(), scores[index, :k][found].tolist()))
+
+
+if __name__ == "__main__":
+    build_rating_matrix()
+    build_item_similarity()
@@ -0,0 +1,148 @@
+import json
+import numpy as np
+import pandas as pd
+from config.settings import DB_PATH
+from data_processing.db_connection import read_connection
+
+BREAKDOWNS = {
+    None: """
+        SELECT drc.day, SUM(drc.rating_count) AS rating_count
+        FROM daily_rating_count drc
+        WHERE drc.day >= ? AND drc.day <= ? {movie_filter}
+        GROUP BY drc.day
+        """,
+    "movie_id": """
+        SELECT drc.day, drc.movie_id, drc.rating_count
+        FROM daily_rating_count drc
+        WHERE drc.day >= ? AND drc.day <= ? {movie_filter}
+        """,
+    "genre": """
+        SELECT drc.day, g.name AS genre, SUM(drc.rating_count) AS rating_count
+        FROM daily_rating_count drc
+        JOIN movie_genre mg ON mg.movie_id = drc.movie_id
+        JOIN genre g ON g.genre_id = mg.genre_id
+        WHERE drc.day >= ? AND drc.day <= ? {movie_filter}
+        GROUP BY drc.day, g.name
+        """,
+}
+
+
+def window_label(days):
+    return f"{days // 7}w" if days % 7 == 0 else f"{days}d"
+
+
+def fetch_daily_counts(start=None, end=None, by=None, movie_ids=None, db_path=DB_PATH):
+    """
+    Loads daily rating counts from the daily_rating_count aggregate.
+
+    Parameters:
+    -----------
+    start, end : str or datetime-like, optional
+        Inclusive day range. Default is all days.
+    by : {None, "movie_id", "genre"}, optional
+        Breakdown. None gives one total series. The result is dense (days x
+        groups), so a "movie_id" breakdown should usually be limited with
+        `movie_ids`.
+    movie_ids : iterable of int, optional
+        Only count ratings of these movies.
+    db_path : Path or str, optional
+
+    Returns:
+    --------
+    pd.DataFrame
+        Indexed by every day from the first to the last day with ratings (days
+        without ratings are 0), with one column per group (a single
+        `daily_count` column when `by` is None); no rows if the range has no ratings.
+    """
+    start = pd.Timestamp(start).strftime("%Y-%m-%d") if start is not None else "0000-01-01"
+    end = pd.Timestamp(end).strftime("%Y-%m-%d") if end is not None else "9999-12-31"
+    params = [start, end]
+    movie_filter = ""
+    if movie_ids is not None:
+        movie_filter = "AND drc.movie_id IN (SELECT value FROM json_each(?))"
+        params.append(json.dumps([int(movie_id) for movie_id in movie_ids]))
+    df = pd.read_sql_query(BREAKDOWNS[by].format(movie_filter=movie_filter), read_connection(db_path), params=params)
+
+    df["day"] = pd.to_datetime(df["day"])
+    if by is None:
+        counts = df.set_index("day")[["rating_count"]].rename(columns={"rating_count": "daily_count"})
+    else:
+        counts = df.pivot(index="day", columns=by, values="rating_count")
+    # A range without ratings keeps the columns, so window_volumes still returns its full long format
+    days = pd.date_range(counts.index.min(), counts.index.max(), freq="D") if not counts.empty else counts.index[:0]
+    return counts.reindex(days, fill_value=0).fillna(0).astype(np.int64).rename_axis("timestamp")
+
+
+def window_volumes(counts, forward=(), backward=(), trim=True):
+    """
+    Computes forward and backward rolling rating volumes from one cumulative-sum pass.
+
+    The forward volume of w days on day d counts ratings on days d .. d+w-1;
+    the backward volume counts days d-w+1 .. d. Every window is a difference of
+    two rows of the same cumulative sum, so adding windows costs no extra scan.
+
+    Parameters:
+    -----------
+    counts : pd.DataFrame
+        Daily counts as returned by `fetch_daily_counts` (dense daily index, one column per group).
+    forward, backward : iterable of int
+        Window lengths in days.
+    trim : bool, optional
+        Drop the days whose longest forward window reaches the last day of
+        data, or whose longest backward window starts before the first, so
+        every value covers a complete window. Default is True.
+
+    Returns:
+    --------
+    pd.DataFrame
+        Long format: `timestamp`, the group column (if any), `daily_count` and one
+        `forward_<w>_volume` / `backward_<w>_volume` column per window, where
+        <w> is e.g. "4w" for 28 days or "10d" otherwise.
+    """
+    values = counts.to_numpy(dtype=np.int64)
+    n = len(values)
+    cumulative = np.zeros((n + 1, values.shape[1]), dtype=np.int64)
+    np.cumsum(values, axis=0, out=cumulative[1:])
+
+    day = np.arange(n)
+    windows = {"daily_count": values}
+    for days in forward:
+        end = np.minimum(day + days, n)
+        windows[f"forward_{window_label(days)}_volume"] = cumulative[end] - cumulative[day]
+    for days in backward:
+        begin = np.maximum(day + 1 - days, 0)
+        windows[f"backward_{window_label(days)}_volume"] = cumulative[day + 1] - cumulative[begin]
+
+    keep = np.ones(n, dtype=bool)
+    if trim:
+        keep &= day <= n - 1 - max(forward, default=0)
+        keep &= day >= max(backward, default=1) - 1
+
+    groups = counts.columns
+    index = counts.index[keep]
+    if len(groups) == 1 and groups[0] == "daily_count":
+        result = pd.DataFrame({name: array[keep, 0] for name, array in windows.items()}, index=index)
+        return result.reset_index()
+
+    group_name = counts.columns.name
+    result = pd.DataFrame({
+        name: array[keep].ravel() for name, array in windows.items()
+    }, index=pd.MultiIndex.from_product([index, groups], names=["timestamp", group_name]))
+    return result.reset_index()
+
+
+def rating_volume(forward=(), backward=(), start=None, end=None, by=None, movie_ids=None, trim=True, db_path=DB_PATH):
+    """
+    Daily rating counts with any set of forward/backward window volumes.
+
+    Combines `fetch_daily_counts` and `window_volumes`; see those for the
+    parameters. Reads only the daily_rating_count aggregate, never the ratings.
+
+    Examples:
+    ---------
+    >>> rating_volume(forward=[7 * w for w in range(1, 10)], start="2016-01-01")
+    >>> rating_volume(forward=[28], backward=[28], by="genre")
+    >>> rating_volume(backward=[7], by="movie_id", movie_ids=[603, 604])
+    """
+    counts = fetch_daily_counts(start, end, by, movie_ids, db_path)
+    return window_volumes(counts, forward, backward, trim)
@@ -0,0 +1,94 @@
+import sqlite3
+import shutil
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from config.settings import DB_PATH, RATINGS_PARQUET_PATH, TAGS_PARQUET_PATH
+
+CHUNK_SIZE = 1_000_000
+
+PARTITIONING = ds.partitioning(pa.schema([("year", pa.int16()), ("month", pa.int8())]), flavor="hive")
+
+RATING_SCHEMA = pa.schema([
+    ("user_id", pa.int32()),
+    ("movie_id", pa.int32()),
+    ("rating", pa.float32()),
+    ("timestamp", pa.int64()),
+    ("year", pa.int16()),
+    ("month", pa.int8()),
+])
+
+TAG_SCHEMA = pa.schema([
+    ("tag_id", pa.int32()),
+    ("user_id", pa.int32()),
+    ("movie_id", pa.int32()),
+    ("tag", pa.string()),
+    ("timestamp", pa.int64()),
+    ("year", pa.int16()),
+    ("month", pa.int8()),
+])
+
+
+def timestamp_batches(conn, query, schema, chunk_size=CHUNK_SIZE):
+    """
+    Streams a query as record batches with year/month partition columns derived from `timestamp` (UTC).
+    """
+    columns = [field.name for field in schema if field.name not in ("year", "month")]
+    for chunk in pd.read_sql_query(query, conn, chunksize=chunk_size):
+        months = chunk["timestamp"].to_numpy(dtype="int64").astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+        chunk["year"] = (months // 12 + 1970).astype(np.int16)
+        chunk["month"] = (months % 12 + 1).astype(np.int8)
+        yield pa.RecordBatch.from_pandas(chunk[columns + ["year", "month"]], schema=schema, preserve_index=False)
+
+
+def write_partitioned(batches, schema, output_path):
+    """
+    Writes record batches to a Hive-partitioned Parquet dataset (year=YYYY/month=M).
+
+    The dataset is built next to `output_path` and swapped in at the end, so
+    readers never see a half-written store and rows deleted from the database
+    do not linger in old partitions.
+    """
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    ds.write_dataset(
+        batches, tmp_path, schema=schema, format="parquet",
+        partitioning=PARTITIONING,
+        basename_template="part-{i}.parquet",
+        # Buffer rows per partition so each file gets a few large row groups
+        min_rows_per_group=100_000, max_rows_per_group=1_000_000,
+    )
+    shutil.rmtree(output_path, ignore_errors=True)
+    tmp_path.rename(output_path)
+
+
+def export_movielens_parquet(db_path=DB_PATH, ratings_path=RATINGS_PARQUET_PATH, tags_path=TAGS_PARQUET_PATH):
+    """
+    Exports user_movie_rating and user_movie_tag to Parquet datasets partitioned by year/month of timestamp.
+
+    Called at the end of every MovieLens import so the datasets always match
+    the database; see load_parquet.py for the loaders.
+
+    Args:
+        db_path (Path or str): The database to export from.
+        ratings_path (Path): Output directory of the ratings dataset.
+        tags_path (Path): Output directory of the tags dataset.
+    """
+    ratings_path.parent.mkdir(parents=True, exist_ok=True)
+    # write_dataset pulls batches from its own thread; only that thread ever uses the connection
+    with sqlite3.connect(db_path, check_same_thread=False) as conn:
+        write_partitioned(
+            timestamp_batches(conn, "SELECT user_id, movie_id, rating, timestamp FROM user_movie_rating", RATING_SCHEMA),
+            RATING_SCHEMA, ratings_path
+        )
+        print(f"Saved ratings dataset to {ratings_path}")
+        write_partitioned(
+            timestamp_batches(conn, "SELECT tag_id, user_id, movie_id, tag, timestamp FROM user_movie_tag", TAG_SCHEMA),
+            TAG_SCHEMA, tags_path
+        )
+        print(f"Saved tags dataset to {tags_path}")
+
+
+if __name__ == "__main__":
+    export_movielens_parquet()
@@ -0,0 +1,165 @@
+"""
+The movie success classifier of notebooks/successful_movie_prediction, packaged for reuse.
+
+`train_success_model` repeats the notebook's steps (success = vote_average
+above 7, frequency encoding of the ID-list columns, a random forest on the
+numeric features with the career scores) and returns a `SuccessModel` that
+carries everything needed to featurize new movies the same way. Saved with
+`SuccessModel.save`, it is what pipeline/scoring_service.py loads.
+
+    python -m data_processing.success_model [--output PATH]
+"""
+import pickle
+import argparse
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from config.settings import SUCCESS_MODEL_PATH
+
+# Decay rates chosen in the notebook
+DEFAULT_LAMBDAS = (0.0004, 0.0004, 0.00058, 0.12)
+SUCCESS_VOTE_AVERAGE = 7.0
+CATEGORICAL_COLUMNS = ["company_ids", "top_cast_id", "top_2_cast_ids", "top_5_cast_ids", "director_ids", "writer_ids", "genre_ids"]
+NON_FEATURE_COLUMNS = ["vote_average", "vote_count", "successful", "movie_id"]
+RANDOM_FOREST_PARAMS = dict(n_estimators=200, max_depth=10, min_samples_split=10, min_samples_leaf=5,
+                            max_features="sqrt", bootstrap=True, oob_score=True, random_state=42)
+
+
+def release_timestamp(release_date):
+    """Release dates ("YYYY-MM-DD" strings or datetimes) as Unix seconds, NaN where unknown."""
+    dates = pd.to_datetime(release_date, format="%Y-%m-%d", errors="coerce")
+    return (dates - pd.Timestamp("1970-01-01")) / pd.Timedelta(seconds=1)
+
+
+def frequency_maps(train_df, columns=CATEGORICAL_COLUMNS):
+    """Value -> number of training rows with that value, for each categorical column."""
+    return {column: train_df[column].value_counts().to_dict() for column in columns}
+
+
+class FlatForest:
+    """
+    The trees of a fitted random forest as flat node arrays, for low-latency `predict_proba`.
+
+    scikit-learn runs each of the 200 trees as a separate joblib task, which
+    dominates the time of scoring a handful of rows. Here every row walks all
+    trees at once, one level per step, with the same split rules (features as
+    float32, NaN following each node's missing-value direction), so the
+    probabilities are those of the forest.
+    """
+
+    def __init__(self, forest):
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        self.roots = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+        self.left = np.concatenate([np.where(t.children_left >= 0, t.children_left + root, -1) for t, root in zip(trees, self.roots)])
+        self.right = np.concatenate([np.where(t.children_right >= 0, t.children_right + root, -1) for t, root in zip(trees, self.roots)])
+        self.leaf = self.left < 0
+        self.feature = np.where(self.leaf, 0, np.concatenate([tree.feature for tree in trees]))
+        self.threshold = np.concatenate([tree.threshold for tree in trees])
+        self.missing_go_to_left = np.concatenate([tree.missing_go_to_left for tree in trees]).astype(bool)
+        value = np.concatenate([tree.value[:, 0, :] for tree in trees])
+        self.value = value / value.sum(axis=1, keepdims=True)
+        self.depth = max(tree.max_depth for tree in trees)
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        node = np.tile(self.roots, (len(X), 1))
+        rows = np.arange(len(X))[:, None]
+        for _ in range(self.depth):
+            x = X[rows, self.feature[node]]
+            go_left = np.where(np.isnan(x), self.missing_go_to_left[node], x <= self.threshold[node])
+            node = np.where(self.leaf[node], node, np.where(go_left, self.left[node], self.right[node]))
+        return self.value[node].mean(axis=1)
+
+
+@dataclass
+class SuccessModel:
+    """
+    A trained classifier with its featurization.
+
+    Attributes:
+        model: Fitted scikit-learn classifier; class 1 is "successful".
+        features (list): Feature columns in training order.
+        lambdas (tuple): Decay rates of the career scores it was trained with.
+        frequency_maps (dict): Categorical column -> {value: training frequency}.
+        default_frequency (int): Frequency of values unseen in training.
+        metadata (dict): Training details (date, sizes, test precision and recall).
+    """
+    model: object
+    features: list
+    lambdas: tuple
+    frequency_maps: dict
+    default_frequency: int = 1
+    metadata: dict = field(default_factory=dict)
+
+    def encode(self, df):
+        """Release dates as Unix seconds and a `<column>_freq` encoding of each categorical column."""
+        columns = {"release_date": release_timestamp(df["release_date"])}
+        for column, frequencies in self.frequency_maps.items():
+            # Plain dict lookups: Series.map costs milliseconds of overhead on the small frames of the scoring service
+            columns[column + "_freq"] = [float(frequencies.get(value, self.default_frequency)) for value in df[column]]
+        return df.assign(**columns)
+
+    def feature_frame(self, df):
+        """Model inputs for rows shaped like `fetch_predict_success_data`; missing features raise KeyError."""
+        return self.encode(df)[self.features].astype(float)
+
+    def predict_proba(self, df):
+        """Probability of success of each row."""
+        return self.model.predict_proba(self.feature_frame(df))[:, 1]
+
+    def save(self, path=SUCCESS_MODEL_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(path=SUCCESS_MODEL_PATH):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def train_success_model(lambdas=DEFAULT_LAMBDAS, min_votes=30, test_size=0.2, random_state=42):
+    """
+    Trains the notebook's random forest with career scores.
+
+    Returns:
+        SuccessModel: With test precision and recall in `metadata`.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import precision_score, recall_score
+    from sklearn.model_selection import train_test_split
+    from data_processing import load_sqlite
+
+    df = load_sqlite.fetch_predict_success_data(*lambdas, min_votes=min_votes)
+    df["successful"] = (df["vote_average"] > SUCCESS_VOTE_AVERAGE).astype(int)
+    train_df, test_df = train_test_split(df, test_size=test_size, random_state=random_state)
+
+    success_model = SuccessModel(None, [], tuple(lambdas), frequency_maps(train_df))
+    # As in the notebook: every numeric column except the target and its sources (the one-hot genres are uint8)
+    encoded = success_model.encode(train_df)
+    success_model.features = [column for column in encoded.select_dtypes(include=["float64", "int64", "uint8"]).columns
+                              if column not in NON_FEATURE_COLUMNS]
+    rf = RandomForestClassifier(**RANDOM_FOREST_PARAMS)
+    rf.fit(encoded[success_model.features].astype(float), train_df["successful"])
+    success_model.model = rf
+
+    predicted = rf.predict(success_model.feature_frame(test_df))
+    success_model.metadata = {
+        "trained_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "min_votes": min_votes, "train_rows": len(train_df), "test_rows": len(test_df),
+        "test_precision": float(precision_score(test_df["successful"], predicted, zero_division=0)),
+        "test_recall": float(recall_score(test_df["successful"], predicted, zero_division=0)),
+    }
+    return success_model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the movie success model and save it for the scoring service.")
+    parser.add_argument("--output", type=Path, default=SUCCESS_MODEL_PATH)
+    args = parser.parse_args()
+    success_model = train_success_model()
+    success_model.save(args.output)
+    print(f"Saved {args.output}: {len(success_model.features)} features, "
+          f"test precision {success_model.metadata['test_precision']:.3f}, recall {success_model.metadata['test_recall']:.3f}")
@@ -0,0 +1,305 @@
+"""
+The opt-in compact storage layout of movies.db (data/sql/compact_schema.sql).
+
+In the compact layout the composite-key tables (ratings, and the cast,
+genre, keyword and company links of movies) are WITHOUT ROWID, so each is
+one b-tree instead of a rowid table plus a primary key index, and movie_crew
+job/department and user_movie_tag text are dictionary-encoded. movie_crew and
+user_movie_tag become views with INSTEAD OF triggers, so every reader and
+writer keeps working. The smaller file keeps more of the database in the page cache; see
+benchmarks/compact_storage.py for the measurements.
+
+    python -m pipeline.compact_storage schema [--compact]    # what the build's schema stage runs
+    python -m pipeline.compact_storage migrate [--standard] [--output PATH]
+    python -m pipeline.compact_storage sizes
+"""
+import os
+import re
+import time
+import sqlite3
+import argparse
+from contextlib import closing
+from pathlib import Path
+from config.settings import DB_PATH, SCHEMA_SQL_PATH
+from pipeline.metrics import sqlite_connect
+from data_processing.movie_features import TABLE as FEATURES_TABLE, refresh_movie_rating_features
+
+COMPACT_SCHEMA_FILE = "compact_schema.sql"
+SCHEMA_FILES = ["create_tables.sql", "create_indexes.sql", "create_views.sql", "create_triggers.sql"]
+
+# Compatibility view -> the tables holding its rows in the compact layout
+COMPACT_VIEWS = {
+    "movie_crew": ("movie_crew_compact", "crew_job", "crew_department"),
+    "user_movie_tag": ("user_movie_tag_compact", "tag_text"),
+}
+COMPACT_TABLES = {table: view for view, tables in COMPACT_VIEWS.items() for table in tables}
+
+# Bulk encoding of each view's rows from the attached `source` database; the most frequent values get the smallest codes
+COMPACT_COPY = {
+    "movie_crew": [
+        "INSERT INTO crew_job (name) SELECT job FROM source.movie_crew GROUP BY job ORDER BY COUNT(*) DESC",
+        "INSERT INTO crew_department (name) SELECT department FROM source.movie_crew GROUP BY department ORDER BY COUNT(*) DESC",
+        """INSERT INTO movie_crew_compact (movie_id, person_id, job_id, department_id)
+           SELECT c.movie_id, c.person_id, j.job_id, d.department_id
+           FROM source.movie_crew AS c
+           JOIN crew_job AS j ON j.name IS c.job
+           JOIN crew_department AS d ON d.name IS c.department
+           ORDER BY c.movie_id, c.person_id, j.job_id""",
+    ],
+    "user_movie_tag": [
+        "INSERT INTO tag_text (text) SELECT tag FROM source.user_movie_tag GROUP BY tag ORDER BY COUNT(*) DESC",
+        """INSERT INTO user_movie_tag_compact (tag_id, user_id, movie_id, tag_text_id, timestamp)
+           SELECT t.tag_id, t.user_id, t.movie_id, x.tag_text_id, t.timestamp
+           FROM source.user_movie_tag AS t
+           JOIN tag_text AS x ON x.text IS t.tag
+           ORDER BY t.tag_id""",
+    ],
+}
+
+LEADING_COMMENTS = re.compile(r"^(?:\s*--[^\n]*\n)*\s*")
+DEFERRED_STATEMENT = re.compile(r"^(?:CREATE\s+(?:UNIQUE\s+)?INDEX|CREATE\s+TRIGGER|DROP\s+INDEX)\b", re.IGNORECASE)
+STATEMENT_TARGET = re.compile(r"\bON\s+(\w+)", re.IGNORECASE)
+
+
+def sql_statements(path):
+    """The statements of a SQL script in order, trigger bodies kept whole."""
+    statements, current = [], ""
+    for line in Path(path).read_text().splitlines(keepends=True):
+        current += line
+        if sqlite3.complete_statement(current):
+            statements.append(current.strip())
+            current = ""
+    return statements
+
+
+def schema_statements(compact=False):
+    """
+    Yields the statements creating the schema as (statement, deferred) pairs.
+
+    The compact layout is created first, so the standard files then skip the
+    tables it redefines; their index and trigger statements on movie_crew,
+    a view there, are left out as compact_schema.sql has their equivalents.
+    `deferred` marks index and trigger statements, which a bulk copy runs
+    after loading the rows.
+    """
+    for name in ([COMPACT_SCHEMA_FILE] if compact else []) + SCHEMA_FILES:
+        for statement in sql_statements(SCHEMA_SQL_PATH / name):
+            body = LEADING_COMMENTS.sub("", statement)
+            deferred = bool(DEFERRED_STATEMENT.match(body))
+            target = STATEMENT_TARGET.search(body)
+            if compact and deferred and name != COMPACT_SCHEMA_FILE and target and target.group(1) in COMPACT_VIEWS:
+                continue
+            yield statement, deferred
+
+
+def layout(conn, schema="main"):
+    """"compact" or "standard" by what movie_crew is, or None for a database without the schema."""
+    row = conn.execute(f"SELECT type FROM {schema}.sqlite_master WHERE name = 'movie_crew'").fetchone()
+    return None if row is None else {"view": "compact", "table": "standard"}[row[0]]
+
+
+def apply_schema(db_path=DB_PATH, compact=False):
+    """
+    Creates the missing tables, indexes, views and triggers of the database.
+
+    A database keeps the layout it has; `compact` only chooses the layout of a
+    new one. Use `migrate` to convert a database that has data.
+
+    Returns:
+        bool: Whether the database has the compact layout.
+    """
+    with closing(sqlite_connect(db_path)) as conn:
+        current = layout(conn)
+        if compact and current == "standard":
+            print(f"{db_path} already has the standard layout; convert it with `python -m pipeline.compact_storage migrate`")
+        compact = current == "compact" or (compact and current is None)
+        for statement, _ in schema_statements(compact):
+            conn.execute(statement)
+        conn.commit()
+    return compact
+
+
+def _relations(conn, schema):
+    """Name -> "table" or "view" of every table and view of an attached schema."""
+    return dict(conn.execute(f"SELECT name, type FROM {schema}.sqlite_master "
+                             "WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%'"))
+
+
+def _columns(conn, schema, table):
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def _primary_key(conn, schema, table):
+    return [row[1] for row in sorted(conn.execute(f"PRAGMA {schema}.table_info({table})"), key=lambda row: row[5]) if row[5]]
+
+
+def _copy_rows(conn, compact):
+    """
+    Copies the rows of every table of the attached `source` database into main.
+
+    Tables main does not have (e.g. movie_rating_features_mat) are created from
+    their source definition; the compact layout's own tables are only read
+    through their views.
+
+    Returns:
+        tuple: (name, seconds) of every copied table or view, and the names of
+            the tables created from their source definition.
+    """
+    target, source = _relations(conn, "main"), _relations(conn, "source")
+    copied, created = [], []
+    for name, kind in list(target.items()) + [(name, "new") for name, kind in source.items()
+                                              if kind == "table" and name not in target and name not in COMPACT_TABLES]:
+        if name in COMPACT_TABLES or name not in source or (kind == "view" and not (compact and name in COMPACT_VIEWS)):
+            continue
+        start = time.perf_counter()
+        if kind == "view":
+            for statement in COMPACT_COPY[name]:
+                conn.execute(statement)
+        else:
+            if kind == "new":
+                conn.execute(conn.execute("SELECT sql FROM source.sqlite_master WHERE name = ?", (name,)).fetchone()[0])
+                created.append(name)
+            source_columns = set(_columns(conn, "source", name))
+            columns = ", ".join(column for column in _columns(conn, "main", name) if column in source_columns)
+            # In primary key order, so WITHOUT ROWID b-trees are filled by appending
+            order = ", ".join(_primary_key(conn, "main", name))
+            conn.execute(f"INSERT INTO main.{name} ({columns}) SELECT {columns} FROM source.{name}"
+                         + (f" ORDER BY {order}" if order else ""))
+        copied.append((name, time.perf_counter() - start))
+        print(f"Copied {name} in {copied[-1][1]:.1f}s")
+    return copied, created
+
+
+def migrate(db_path=DB_PATH, output=None, compact=True):
+    """
+    Rewrites a database in the compact layout, or back in the standard one.
+
+    The rows are copied into a new file next to `output` (default: the
+    database itself), creating indexes and triggers after the bulk load, and
+    movie_rating_features_mat is brought up to date. Every table's row
+    count is checked against the source before the new file replaces
+    `output`. Needs free disk space for a second copy of the database, and no
+    other connection to it while it runs.
+
+    Args:
+        db_path (Path): Database to convert.
+        output (Path, optional): Where to write the converted database.
+        compact (bool): Target layout; False converts back to the standard one.
+
+    Returns:
+        dict: Table or view -> row count of the converted database.
+    """
+    db_path = Path(db_path)
+    output = Path(output) if output is not None else db_path
+    target_layout = "compact" if compact else "standard"
+    with closing(sqlite_connect(db_path)) as conn:
+        current = layout(conn)
+        if current is None:
+            raise ValueError(f"{db_path} has no movie data schema")
+        if current == target_layout and output == db_path:
+            print(f"{db_path} already has the {target_layout} layout")
+            return {}
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        analyzed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone() is not None
+    source_bytes = db_path.stat().st_size
+
+    start = time.perf_counter()
+    tmp_path = output.with_name(f"{output.name}.migrating")
+    tmp_path.unlink(missing_ok=True)
+    conn = sqlite_connect(tmp_path, uri=True)
+    try:
+        # A failed migration only leaves a file to delete, so the new one needs no journal
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        statements = list(schema_statements(compact))
+        # Before attaching: unqualified statements such as DROP VIEW IF EXISTS would also find the source's objects
+        for statement, deferred in statements:
+            if not deferred:
+                conn.execute(statement)
+        conn.execute("ATTACH DATABASE ? AS source", (db_path.resolve().as_uri() + "?mode=ro",))
+        copied, created = _copy_rows(conn, compact)
+        counts = {}
+        for name, _ in copied:
+            counts[name], = conn.execute(f"SELECT COUNT(*) FROM main.{name}").fetchone()
+            expected, = conn.execute(f"SELECT COUNT(*) FROM source.{name}").fetchone()
+            if counts[name] != expected:
+                raise RuntimeError(f"{name}: copied {counts[name]:,} of {expected:,} rows")
+        # Indexes and triggers of the tables that are not in the schema files
+        extra_statements = [sql for table in created for (sql,) in conn.execute(
+            "SELECT sql FROM source.sqlite_master WHERE type IN ('index', 'trigger') AND tbl_name = ? AND sql IS NOT NULL", (table,))]
+        conn.commit()
+        conn.execute("DETACH DATABASE source")
+
+        index_start = time.perf_counter()
+        for statement in [statement for statement, deferred in statements if deferred] + extra_statements:
+            conn.execute(statement)
+        conn.commit()
+        print(f"Created indexes and triggers in {time.perf_counter() - index_start:.1f}s")
+        if analyzed:
+            conn.execute("ANALYZE")
+        conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        conn.close()
+        if FEATURES_TABLE in counts:
+            # The view gives the same rows in both layouts, so the copied rows stay valid; this only
+            # applies pending changes, or rebuilds a table made from an older view definition
+            status, count = refresh_movie_rating_features(tmp_path)
+            print(f"{FEATURES_TABLE}: {status} ({count} movies)")
+    except BaseException:
+        conn.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    # The source WAL was checkpointed and truncated above; stale -wal/-shm files must not be applied to the new file
+    for suffix in ("-wal", "-shm"):
+        Path(f"{output}{suffix}").unlink(missing_ok=True)
+    os.replace(tmp_path, output)
+    print(f"Migrated {db_path} to the {target_layout} layout in {time.perf_counter() - start:.1f}s: "
+          f"{source_bytes / 1024 ** 2:,.0f} MB -> {output.stat().st_size / 1024 ** 2:,.0f} MB")
+    return counts
+
+
+def table_sizes(db_path=DB_PATH):
+    """
+    Bytes used by each table together with its indexes, largest first.
+
+    The compact layout's tables are counted under the view they back, so both
+    layouts report the same names.
+    """
+    with closing(sqlite_connect(db_path)) as conn:
+        owners = dict(conn.execute("SELECT name, tbl_name FROM sqlite_master WHERE type IN ('table', 'index')"))
+        sizes = {}
+        for name, size in conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"):
+            table = owners.get(name, name)
+            table = COMPACT_TABLES.get(table, table)
+            sizes[table] = sizes.get(table, 0) + size
+    return dict(sorted(sizes.items(), key=lambda item: -item[1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create or convert the compact storage layout of the movie database.")
+    parser.add_argument("--db", type=Path, default=DB_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    schema_parser = commands.add_parser("schema", help="create the missing tables, indexes, views and triggers")
+    schema_parser.add_argument("--compact", action="store_true", help="use the compact layout if the database is new")
+    migrate_parser = commands.add_parser("migrate", help="rewrite the database in the compact layout")
+    migrate_parser.add_argument("--standard", action="store_true", help="convert back to the standard layout")
+    migrate_parser.add_argument("--output", type=Path, help="write the converted database here instead of replacing --db")
+    commands.add_parser("sizes", help="print the size of each table with its indexes")
+    args = parser.parse_args()
+
+    if args.command == "schema":
+        compact = apply_schema(args.db, args.compact)
+        print(f"Schema of {args.db} is up to date ({'compact' if compact else 'standard'} layout)")
+    elif args.command == "migrate":
+        migrate(args.db, args.output, compact=not args.standard)
+    else:
+        sizes = table_sizes(args.db)
+        print(f"{'table':<32} {'MB':>10}")
+        for table, size in sizes.items():
+            print(f"{table:<32} {size / 1024 ** 2:>10.1f}")
+        print(f"{'total':<32} {sum(sizes.values()) / 1024 ** 2:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,452 @@
+"""
+Metrics of the build stages: counters, gauges and histograms, SQLite statement profiling and a live progress line.
+
+Each process records into the module-level REGISTRY and exports it as JSON
+and in the Prometheus text format (`<stem>.json` and `<stem>.prom`; a
+directory of .prom files is what node_exporter's textfile collector reads).
+A stage script calls `export_at_exit(METRICS_PATH / "<stage>")`; TaskGraph
+points it at the build's metrics directory through MOVIE_DATA_METRICS and
+reads the rows_written_total counter back for its rows/s column.
+
+Statement profiling is off by default because it wraps every cursor call.
+With MOVIE_DATA_PROFILE_SQL=1, connections opened by `sqlite_connect`
+(the loaders' read connections, the movie writer, the MovieLens import and
+the feature refresh) time every statement, including the fetching of its
+rows, and the slowest statements are printed when the process exits.
+"""
+import os
+import re
+import sys
+import json
+import time
+import atexit
+import sqlite3
+import threading
+from bisect import bisect_left
+from pathlib import Path
+
+METRICS_ENV = "MOVIE_DATA_METRICS"
+PROFILE_SQL_ENV = "MOVIE_DATA_PROFILE_SQL"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+STATEMENT_MAX_LENGTH = 200
+PROGRESS_LOG_INTERVAL = 30   # seconds between progress lines when stdout is not a terminal
+
+
+def _labels(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """A named family of samples, one per combination of label values."""
+    kind = None
+
+    def __init__(self, name, help, lock):
+        self.name = name
+        self.help = help
+        self._lock = lock
+        self._samples = {}
+
+    def value(self, **labels):
+        return self._samples.get(_labels(labels), 0)
+
+    def total(self):
+        """Sum over every label combination."""
+        with self._lock:
+            return sum(self._samples.values())
+
+    def samples(self):
+        with self._lock:
+            return [{"labels": dict(labels), "value": value} for labels, value in self._samples.items()]
+
+    def prometheus_lines(self):
+        return [f"{self.name}{_format_labels(labels)} {value}" for labels, value in sorted(self._samples.items())]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self._samples[key] = self._samples.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._samples[_labels(labels)] = value
+
+
+class Histogram(Metric):
+    """Observations counted in cumulative `le` buckets, with their sum and count."""
+    kind = "histogram"
+
+    def __init__(self, name, help, lock, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, lock)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = _labels(labels)
+        with self._lock:
+            sample = self._samples.get(key)
+            if sample is None:
+                sample = self._samples[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            sample["counts"][bisect_left(self.buckets, value)] += 1
+            sample["sum"] += value
+            sample["count"] += 1
+
+    def total(self):
+        with self._lock:
+            return sum(sample["count"] for sample in self._samples.values())
+
+    def samples(self):
+        with self._lock:
+            return [{"labels": dict(labels), "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self._cumulative(sample))),
+                     "sum": sample["sum"], "count": sample["count"]} for labels, sample in self._samples.items()]
+
+    @staticmethod
+    def _cumulative(sample):
+        total, cumulative = 0, []
+        for count in sample["counts"]:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+    def prometheus_lines(self):
+        lines = []
+        for labels, sample in sorted(self._samples.items()):
+            for bound, count in zip([*map(str, self.buckets), "+Inf"], self._cumulative(sample)):
+                lines.append(f"{self.name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {sample['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {sample['count']}")
+        return lines
+
+
+class Registry:
+    """The metrics of one process; `counter`, `gauge` and `histogram` return the existing metric of a name."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, **options):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, self._lock, **options)
+        if not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} is a {metric.kind}, not a {cls.kind}")
+        return metric
+
+    def counter(self, name, help):
+        return self._get(Counter, name, help)
+
+    def gauge(self, name, help):
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def to_dict(self):
+        return {
+            "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "pid": os.getpid(),
+            "metrics": {name: {"type": metric.kind, "help": metric.help, "samples": metric.samples()}
+                        for name, metric in sorted(self._metrics.items())},
+        }
+
+    def to_prometheus(self):
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            lines += [f"# HELP {name} {metric.help}", f"# TYPE {name} {metric.kind}"]
+            with self._lock:
+                lines += metric.prometheus_lines()
+        return "\n".join(lines) + "\n"
+
+    def export(self, stem):
+        """Writes `<stem>.json` and `<stem>.prom`, each replaced atomically."""
+        stem = Path(stem)
+        stem.parent.mkdir(parents=True, exist_ok=True)
+        for suffix, text in ((".json", json.dumps(self.to_dict(), indent=2)), (".prom", self.to_prometheus())):
+            path = stem.with_name(stem.name + suffix)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(text)
+            tmp_path.replace(path)
+
+
+REGISTRY = Registry()
+ROWS_WRITTEN = REGISTRY.counter("rows_written_total", "Rows written to the database or exported, per table")
+SQL_SECONDS = REGISTRY.counter("sqlite_statement_seconds_total", "Time spent executing and fetching each SQL statement")
+SQL_STATEMENTS = REGISTRY.counter("sqlite_statements_total", "Executions of each SQL statement")
+SQL_ROWS = REGISTRY.counter("sqlite_statement_rows_total", "Rows fetched or modified by each SQL statement")
+
+
+def metric_total(exported, name):
+    """Sum of the samples of `name` in a JSON export (a dict or its path); 0 when absent."""
+    if not isinstance(exported, dict):
+        exported = json.loads(Path(exported).read_text())
+    metric = exported["metrics"].get(name, {"samples": []})
+    return sum(sample.get("value", sample.get("count", 0)) for sample in metric["samples"])
+
+
+def sql_profile_lines(top=15):
+    """The `top` statements by total time, as report lines."""
+    lines = [f"{'seconds':>10} {'calls':>9} {'rows':>12}  statement"]
+    for sample in sorted(SQL_SECONDS.samples(), key=lambda sample: -sample["value"])[:top]:
+        statement = sample["labels"]["statement"]
+        lines.append(f"{sample['value']:>10.3f} {SQL_STATEMENTS.value(statement=statement):>9,} "
+                     f"{SQL_ROWS.value(statement=statement):>12,}  {statement[:100]}")
+    return lines
+
+
+_export_stem = None
+
+
+def export_at_exit(default_stem):
+    """
+    Exports REGISTRY when the process exits, to $MOVIE_DATA_METRICS if set, else `default_stem`.
+
+    Progress lines of the process also refresh this export while they run.
+
+    Returns:
+        Path: The stem exported to.
+    """
+    global _export_stem
+    stem = _export_stem = Path(os.environ.get(METRICS_ENV) or default_stem)
+
+    def export():
+        if sql_profiling_enabled() and SQL_SECONDS.samples():
+            print("\nSlowest SQL statements:")
+            print("\n".join(sql_profile_lines()))
+        REGISTRY.export(stem)
+
+    atexit.register(export)
+    return stem
+
+
+# SQLite statement profiling
+
+def sql_profiling_enabled():
+    return os.environ.get(PROFILE_SQL_ENV) == "1"
+
+
+def normalize_statement(sql):
+    """One label per statement: whitespace collapsed, long placeholder lists (IN chunks) shortened, truncated."""
+    statement = re.sub(r"\s+", " ", sql).strip()
+    statement = re.sub(r"\?(?:\s*,\s*\?){9,}", "?, ...", statement)
+    return statement[:STATEMENT_MAX_LENGTH]
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """
+    Cursor that adds the time of each statement, and of fetching its rows, to the SQL counters.
+
+    The execution is recorded right away; the time spent fetching rows is
+    accumulated on the cursor and recorded when the result is exhausted, the
+    next statement starts or the cursor is closed or garbage collected.
+    """
+    _statement = None
+    _pending_seconds = 0.0
+    _pending_rows = 0
+
+    def _flush(self):
+        if self._statement is not None and (self._pending_seconds or self._pending_rows):
+            SQL_SECONDS.inc(self._pending_seconds, statement=self._statement)
+            SQL_ROWS.inc(self._pending_rows, statement=self._statement)
+        self._pending_seconds, self._pending_rows = 0.0, 0
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._pending_seconds += time.perf_counter() - start
+
+    def _execute(self, method, sql, *args):
+        self._flush()
+        self._statement = normalize_statement(sql)
+        SQL_STATEMENTS.inc(statement=self._statement)
+        self._timed(method, sql, *args)
+        self._pending_rows += max(self.rowcount, 0)
+        self._flush()
+        return self
+
+    def execute(self, sql, parameters=()):
+        return self._execute(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._execute(super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self._execute(super().executescript, sql_script)
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._flush()
+        else:
+            self._pending_rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        self._pending_rows += len(rows)
+        if not rows:
+            self._flush()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._pending_rows += len(rows)
+        self._flush()
+        return rows
+
+    def __next__(self):
+        try:
+            row = self._timed(super().__next__)
+        except StopIteration:
+            self._flush()
+            raise
+        self._pending_rows += 1
+        return row
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        self._flush()
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Connection whose cursors, including those of the execute shortcuts, are ProfiledCursors."""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def sqlite_connect(database, **kwargs):
+    """sqlite3.connect, returning a ProfiledConnection when MOVIE_DATA_PROFILE_SQL=1."""
+    if sql_profiling_enabled():
+        kwargs.setdefault("factory", ProfiledConnection)
+    return sqlite3.connect(database, **kwargs)
+
+
+# Progress line
+
+def _duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class Progress:
+    """
+    Live progress line with throughput and ETA, redrawn by a background thread.
+
+    On a terminal the line is redrawn in place every second; otherwise (a log
+    file, a TaskGraph stage) a new line is printed every PROGRESS_LOG_INTERVAL
+    seconds. The ETA extrapolates the rate of the items worked on in this run;
+    items passed to `skip` (already done by an earlier run) count as done but
+    not towards the rate. The metrics export of the process (see
+    `export_at_exit`) is refreshed on every redraw, so a long run can be
+    watched from outside.
+
+    Args:
+        label (str): Prefix of the line.
+        total (int): Number of items expected; `add_total` raises it.
+        unit (str): Name of the items.
+        describe (callable, optional): Returns extra text for the line.
+        stream (file, optional): Where to write; stdout by default.
+
+    Usage:
+        with Progress("Crawl", total=len(months), unit="months") as progress:
+            ...
+            progress.advance()
+    """
+
+    def __init__(self, label, total, unit, describe=None, stream=None):
+        self.label = label
+        self.total = total
+        self.unit = unit
+        self.describe = describe
+        self.stream = stream or sys.stdout
+        self.interactive = self.stream.isatty()
+        self.done = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._start = None
+        self._thread = None
+
+    def advance(self, count=1):
+        with self._lock:
+            self.done += count
+
+    def skip(self, count=1):
+        with self._lock:
+            self.done += count
+            self.skipped += count
+
+    def add_total(self, count):
+        with self._lock:
+            self.total += count
+
+    def line(self):
+        elapsed = time.monotonic() - self._start
+        with self._lock:
+            done, worked, total = self.done, self.done - self.skipped, self.total
+        parts = [f"{self.label}: {done:,}/{total:,} {self.unit}"]
+        if total:
+            parts[0] += f" ({done / total:.0%})"
+        if self.describe is not None:
+            parts.append(self.describe())
+        parts.append(f"elapsed {_duration(elapsed)}")
+        if worked and done < total:
+            parts.append(f"ETA {_duration((total - done) * elapsed / worked)}")
+        return " | ".join(parts)
+
+    def _draw(self, final=False):
+        line = self.line()
+        if self.interactive:
+            self.stream.write("\r\033[K" + line + ("\n" if final else ""))
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+        if _export_stem is not None:
+            REGISTRY.export(_export_stem)
+
+    def _run(self):
+        interval = 1 if self.interactive else PROGRESS_LOG_INTERVAL
+        while not self._stop.wait(interval):
+            self._draw()
+
+    def __enter__(self):
+        self._start = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="progress", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._draw(final=True)
@@ -0,0 +1,335 @@
+"""
+Long-running scorer of movie success.
+
+Loads the model saved by data_processing/success_model.py once, together
+with the career timelines of career_scores.CareerScoreState for its decay
+rates, and then scores movies in milliseconds: movies already in the
+database by ID, and new or hypothetical ones from TMDb-shaped JSON (the
+/movie/{id} response with append_to_response=credits). Each result holds the
+feature vector the model saw and the probability of success. The timelines
+are rebuilt in the background when the database changes.
+
+    python -m pipeline.scoring_service serve [--model PATH] [--host HOST] [--port PORT]
+    python -m pipeline.scoring_service score 862 603 [--json movie.json]
+
+HTTP endpoints (JSON in and out):
+    GET  /health
+    GET  /score?movie_id=862&movie_id=603
+    POST /score   a movie ID, a TMDb movie object, {"movie_id": ...}, or {"movies": [...]} of those
+"""
+import json
+import math
+import time
+import argparse
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import pandas as pd
+from config.settings import (DB_PATH, SUCCESS_MODEL_PATH, SCORING_SERVICE_HOST, SCORING_SERVICE_PORT,
+                             SCORING_MAX_BATCH, SCORING_RELOAD_INTERVAL)
+from data_collection.tmdb_writer import movie_detail_rows
+from data_processing import movie_features, multi_hot
+from data_processing.career_scores import CareerScoreEngine, CareerScoreState, DIRECTOR_JOBS
+from data_processing.db_connection import read_connection
+from data_processing.success_model import SuccessModel, FlatForest
+
+CREDIT_QUERIES = {
+    "directors": "SELECT j.key, c.person_id FROM json_each(?) AS j JOIN movie_crew AS c ON c.movie_id = j.value "
+                 f"WHERE c.job IN ({', '.join(repr(job) for job in DIRECTOR_JOBS)})",
+    "writers": "SELECT j.key, c.person_id FROM json_each(?) AS j JOIN movie_crew AS c ON c.movie_id = j.value "
+               "WHERE c.department = 'Writing'",
+    "cast": "SELECT j.key, c.person_id, c.cast_order FROM json_each(?) AS j JOIN movie_cast AS c ON c.movie_id = j.value",
+    "companies": "SELECT j.key, c.company_id FROM json_each(?) AS j JOIN movie_production_company AS c ON c.movie_id = j.value",
+}
+
+
+class ScoringError(ValueError):
+    """A request item that cannot be scored; reported in its result."""
+
+
+class Scorer:
+    """
+    Scores batches of movies with a saved SuccessModel.
+
+    Args:
+        model_path (Path): The pickled SuccessModel.
+        db_path (Path): Database providing the careers and the stored movies.
+        reload_interval (float): Seconds between checks for database changes;
+            None disables the background reload.
+    """
+
+    def __init__(self, model_path=SUCCESS_MODEL_PATH, db_path=DB_PATH, reload_interval=SCORING_RELOAD_INTERVAL):
+        self.model = SuccessModel.load(model_path)
+        self.db_path = db_path
+        self.genre_features = {name: i for i, name in enumerate(name for name in self.model.features if name.startswith("genre_"))}
+        # Random forests are evaluated as flat arrays; any other classifier as is
+        self.predictor = FlatForest(self.model.model) if hasattr(self.model.model, "estimators_") else self.model.model
+        self._state = None
+        self._stop = threading.Event()
+        self._load_state()
+        if reload_interval:
+            threading.Thread(target=self._reload_loop, args=(reload_interval,), daemon=True).start()
+
+    def _load_state(self):
+        """Refreshes the feature table, then builds the career timelines; swapped in whole once ready."""
+        start = time.perf_counter()
+        movie_features.refresh_movie_rating_features(self.db_path)
+        fingerprint = multi_hot.database_fingerprint(self.db_path)
+        state = CareerScoreState(CareerScoreEngine(self.db_path), *self.model.lambdas)
+        self._state = (fingerprint, state)
+        print(f"Career timelines loaded in {time.perf_counter() - start:.2f}s")
+
+    def _reload_loop(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                if multi_hot.database_fingerprint(self.db_path) != self._state[0]:
+                    self._load_state()
+            except Exception as e:  # keep serving the previous state
+                print(f"Reloading the career timelines failed: {e}")
+
+    def close(self):
+        self._stop.set()
+
+    def health(self):
+        fingerprint, state = self._state
+        return {"status": "ok", "features": len(self.model.features), "lambdas": state.lambdas,
+                "database": str(self.db_path), "fingerprint": fingerprint, "model": self.model.metadata}
+
+    def _stored_movies(self, movie_ids):
+        """Feature rows and credits of movies in the database, one json_each query per table."""
+        conn = read_connection(self.db_path)
+        ids = json.dumps(movie_ids)
+        rows = pd.read_sql_query(
+            "SELECT j.key AS position, f.* FROM json_each(?) AS j JOIN movie_rating_features_mat AS f ON f.movie_id = j.value",
+            conn, params=(ids,)
+        )
+        genres = conn.execute(
+            "SELECT j.key, g.name FROM json_each(?) AS j JOIN movie_genre AS mg ON mg.movie_id = j.value "
+            "JOIN genre AS g ON g.genre_id = mg.genre_id", (ids,)
+        ).fetchall()
+        credits = {name: conn.execute(query, (ids,)).fetchall() for name, query in CREDIT_QUERIES.items()}
+        return rows, genres, credits
+
+    @staticmethod
+    def _tmdb_movie(movie):
+        """Feature row and credits of one TMDb movie object, as movie_rating_features would store them."""
+        if not isinstance(movie.get("release_date"), (str, type(None))):
+            raise ScoringError("release_date must be a YYYY-MM-DD string")
+        tables = movie_detail_rows([({"id": None, "title": None, **movie}, movie)])
+        movie_id, title, release_date, _, _, runtime, vote_average, vote_count, _ = tables["movie"][0]
+
+        def stored(rows, key):
+            # What INSERT OR IGNORE keeps under the table's primary key: the first row of each key
+            kept = {}
+            for row in rows:
+                kept.setdefault(key(row), row)
+            return list(kept.values())
+
+        # Ordered as in the view: billing order with unknown orders last, ties and ID lists by ID
+        cast = sorted(stored(tables["movie_cast"], lambda row: row[1]), key=lambda row: (row[3] is None, row[3], row[1]))
+        crew = sorted(stored(tables["movie_crew"], lambda row: (row[1], row[2])), key=lambda row: row[1])
+        companies = sorted(company for _, company in stored(tables["movie_production_company"], lambda row: row[1]))
+        genres = sorted(stored(movie.get("genres", []), lambda genre: genre["id"]), key=lambda genre: genre["id"])
+        directors = [person for _, person, job, _ in crew if job in DIRECTOR_JOBS]
+        writers = [person for _, person, _, department in crew if department == "Writing"]
+
+        def ids(values):
+            return ",".join(str(value) for value in values) or None
+
+        row = {
+            "movie_id": movie_id, "vote_average": vote_average, "title": title, "release_date": release_date,
+            "runtime": runtime, "vote_count": vote_count,
+            "top_cast_id": ids(person for _, person, _, _ in cast[:1]),
+            "top_2_cast_ids": ids(person for _, person, _, _ in cast[:2]),
+            "top_5_cast_ids": ids(person for _, person, _, _ in cast[:5]),
+            "num_cast_members": len(cast),
+            "director_ids": ids(directors),
+            "writer_ids": ids(writers),
+            "company_ids": ids(companies),
+            "genre_ids": ids(genre["id"] for genre in genres),
+        }
+        credits = {
+            "directors": directors,
+            "writers": writers,
+            "cast": [(person, order) for _, person, _, order in cast if order is not None],
+            "companies": companies,
+        }
+        return row, [genre["name"] for genre in genres], credits
+
+    def score(self, items):
+        """
+        Scores a batch of movies.
+
+        Args:
+            items (list): Movie IDs, {"movie_id": ID} objects or TMDb movie objects.
+
+        Returns:
+            list: One dict per item, in order: movie_id, title, release_date,
+            success_probability and features, or movie_id and error.
+        """
+        if len(items) > SCORING_MAX_BATCH:
+            raise ScoringError(f"At most {SCORING_MAX_BATCH} movies per request")
+        results = [None] * len(items)
+        stored = {}
+        rows, genres = [], []
+        credits = {name: [] for name in CREDIT_QUERIES}
+
+        for position, item in enumerate(items):
+            if isinstance(item, dict) and set(item) == {"movie_id"}:
+                item = item["movie_id"]
+            if isinstance(item, bool) or not isinstance(item, (int, dict)):
+                results[position] = {"movie_id": None, "error": "expected a movie ID or a TMDb movie object"}
+            elif isinstance(item, int):
+                stored[position] = item
+            else:
+                try:
+                    row, names, movie_credits = self._tmdb_movie(item)
+                except (ScoringError, KeyError, TypeError, IndexError) as e:
+                    results[position] = {"movie_id": item.get("id"), "error": f"invalid TMDb movie: {e}"}
+                    continue
+                rows.append({"position": position, **row})
+                genres.extend((position, name) for name in names)
+                for name, values in movie_credits.items():
+                    credits[name].extend((position, *value) if isinstance(value, tuple) else (position, value)
+                                         for value in values)
+
+        if stored:
+            stored_rows, stored_genres, stored_credits = self._stored_movies([stored.get(i) for i in range(len(items))])
+            rows.extend(stored_rows.to_dict("records"))
+            genres.extend(stored_genres)
+            for name, values in stored_credits.items():
+                credits[name].extend(values)
+            for position in set(stored) - set(stored_rows["position"]):
+                results[position] = {"movie_id": stored[position], "error": "unknown movie_id"}
+
+        if rows:
+            self._predict(pd.DataFrame(rows), genres, credits, results)
+        return results
+
+    def _predict(self, df, genres, credits, results):
+        """Adds genres and career scores to the feature rows and runs the model once for all of them."""
+        _, state = self._state
+        positions = pd.Series(np.arange(len(df)), index=df["position"])
+
+        one_hot = np.zeros((len(df), len(self.genre_features)), dtype=np.uint8)
+        for position, name in genres:
+            if f"genre_{name}" in self.genre_features:
+                one_hot[positions[position], self.genre_features[f"genre_{name}"]] = 1
+        df = pd.concat([df, pd.DataFrame(one_hot, columns=list(self.genre_features), index=df.index)], axis=1)
+
+        def arrays(rows, columns):
+            rows = np.array(rows, dtype=float).reshape(-1, columns)
+            return (positions[rows[:, 0].astype(int)].to_numpy(), *rows[:, 1:].T)
+
+        scores = state.score(df["release_date"].tolist(), arrays(credits["directors"], 2), arrays(credits["writers"], 2),
+                             arrays(credits["cast"], 3), arrays(credits["companies"], 2))
+        for name, values in scores.items():
+            df[name] = values
+
+        features = self.model.feature_frame(df)
+        probabilities = self.predictor.predict_proba(features)[:, 1]
+        info = df[["position", "movie_id", "title", "release_date"]]
+        movies = info.astype(object).where(info.notna(), None)
+        for (position, movie_id, title, release_date), vector, probability in zip(
+                movies.itertuples(index=False), features.to_numpy().tolist(), probabilities):
+            results[position] = {
+                "movie_id": None if movie_id is None else int(movie_id),
+                "title": title, "release_date": release_date,
+                "success_probability": float(probability),
+                "features": {name: None if math.isnan(value) else value for name, value in zip(self.model.features, vector)},
+            }
+
+
+def parse_items(payload):
+    """The movies of a /score request body: one item, a list, or {"movies": [...]}."""
+    if isinstance(payload, dict) and "movies" in payload:
+        payload = payload["movies"]
+    if not isinstance(payload, list):
+        payload = [payload]
+    return payload
+
+
+class ScoringRequestHandler(BaseHTTPRequestHandler):
+    scorer = None
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _score(self, items):
+        start = time.perf_counter()
+        try:
+            results = self.scorer.score(items)
+        except ScoringError as e:
+            return self._send(400, {"error": str(e)})
+        self._send(200, {"results": results, "elapsed_ms": round((time.perf_counter() - start) * 1000, 2)})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            return self._send(200, self.scorer.health())
+        if url.path != "/score":
+            return self._send(404, {"error": f"unknown path {url.path}"})
+        values = [value for values in parse_qs(url.query).get("movie_id", []) for value in values.split(",")]
+        try:
+            items = [int(value) for value in values]
+        except ValueError:
+            return self._send(400, {"error": "movie_id must be an integer"})
+        if not items:
+            return self._send(400, {"error": "expected at least one movie_id"})
+        self._score(items)
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/score":
+            return self._send(404, {"error": f"unknown path {self.path}"})
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        except ValueError as e:
+            return self._send(400, {"error": f"invalid JSON: {e}"})
+        self._score(parse_items(payload))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(scorer, host=SCORING_SERVICE_HOST, port=SCORING_SERVICE_PORT):
+    """Serves the scorer over HTTP until interrupted."""
+    handler = type("Handler", (ScoringRequestHandler,), {"scorer": scorer})
+    with ThreadingHTTPServer((host, port), handler) as server:
+        print(f"Scoring movies at http://{host}:{server.server_port}/score")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            scorer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score movie success with the saved model.")
+    parser.add_argument("--model", type=Path, default=SUCCESS_MODEL_PATH)
+    parser.add_argument("--db", type=Path, default=DB_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="run the HTTP scoring service")
+    serve_parser.add_argument("--host", default=SCORING_SERVICE_HOST)
+    serve_parser.add_argument("--port", type=int, default=SCORING_SERVICE_PORT)
+    score_parser = commands.add_parser("score", help="score movies once and print the results as JSON")
+    score_parser.add_argument("movie_ids", type=int, nargs="*")
+    score_parser.add_argument("--json", type=Path, help="file with a TMDb movie object or a list of them")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(Scorer(args.model, args.db), args.host, args.port)
+    else:
+        items = list(args.movie_ids) + (parse_items(json.loads(args.json.read_text())) if args.json else [])
+        print(json.dumps(Scorer(args.model, args.db, reload_interval=None).score(items), indent=2))
+
+
+if __name__ == "__main__":
+    main()
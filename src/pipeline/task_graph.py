@@ -0,0 +1,258 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import subprocess
+import threading
+from pathlib import Path
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pipeline.metrics import METRICS_ENV, Registry, metric_total
+
+# Files larger than this are fingerprinted by size and mtime instead of content
+FINGERPRINT_MAX_BYTES = 64 * 1024 ** 2
+
+
+@dataclass
+class Task:
+    """
+    One build stage.
+
+    Attributes:
+        name (str): Unique stage name.
+        commands (list): Commands run in order, each an argv list.
+        inputs (list): Files or directories the stage reads.
+        outputs (list): Files or directories the stage produces.
+        deps (list): Names of stages that must finish first.
+        stamp (bool): Also record success in a stamp file, which becomes an
+            output. Used by stages whose real output lives inside the database.
+    """
+    name: str
+    commands: list
+    inputs: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+    deps: list = field(default_factory=list)
+    stamp: bool = False
+
+
+def _paths_in(path):
+    path = Path(path)
+    if path.is_dir():
+        return sorted(p for p in path.rglob("*") if p.is_file())
+    return [path] if path.exists() else []
+
+
+def fingerprint(paths):
+    """Content fingerprint of a set of files and directories (size + mtime for very large files)."""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(str(path).encode())
+        for file in _paths_in(path):
+            stat = file.stat()
+            digest.update(f"{file}:{stat.st_size}".encode())
+            if stat.st_size > FINGERPRINT_MAX_BYTES:
+                digest.update(str(stat.st_mtime_ns).encode())
+                continue
+            with open(file, "rb") as f:
+                while chunk := f.read(1 << 20):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _latest_mtime(paths):
+    return max((file.stat().st_mtime for path in paths for file in [Path(path), *_paths_in(path)] if file.exists()), default=0)
+
+
+class TaskGraph:
+    """
+    Runs build stages as subprocesses in dependency order, concurrently where possible.
+
+    A stage is skipped when all of its outputs exist and either every output
+    is newer than every input, or the inputs still match the content
+    fingerprint recorded the last time the stage succeeded (so a touched but
+    unchanged file does not trigger a rebuild). Stages whose dependencies are
+    done run in parallel, up to `jobs` at a time. Each stage's wall time and
+    peak RSS (from os.wait4) are printed and saved with the fingerprints in
+    `<state_dir>/state.json`.
+
+    With a `metrics_dir`, each stage exports its metrics to
+    `<metrics_dir>/<stage>.json` and `.prom` (see pipeline/metrics.py); the
+    rows it wrote give the stage's rows/s, and the stage timings of the whole
+    run are exported as `<metrics_dir>/build`.
+
+    Args:
+        state_dir (Path): Directory for stamps and the state file.
+        env (dict, optional): Environment for the stage subprocesses.
+        metrics_dir (Path, optional): Directory for the metrics exports.
+    """
+
+    def __init__(self, state_dir, env=None, metrics_dir=None):
+        self.state_dir = Path(state_dir)
+        self.state_path = self.state_dir / "state.json"
+        self.env = env
+        self.metrics_dir = Path(metrics_dir) if metrics_dir is not None else None
+        self.tasks = {}
+        self.lock = threading.Lock()
+
+    def add(self, task):
+        if task.name in self.tasks:
+            raise ValueError(f"Duplicate task {task.name}")
+        if task.stamp:
+            task.outputs = [*task.outputs, self.stamp_path(task.name)]
+        self.tasks[task.name] = task
+        return task
+
+    def stamp_path(self, name):
+        return self.state_dir / f"{name}.done"
+
+    def _load_state(self):
+        if self.state_path.exists():
+            return json.loads(self.state_path.read_text())
+        return {}
+
+    def _save_state(self, state):
+        tmp_path = self.state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(state, indent=2, sort_keys=True))
+        tmp_path.replace(self.state_path)
+
+    def is_fresh(self, task, state):
+        if not task.outputs or not all(Path(path).exists() for path in task.outputs):
+            return False
+        oldest_output = min(min((file.stat().st_mtime for file in [Path(path), *_paths_in(path)]), default=0)
+                            for path in task.outputs)
+        if oldest_output >= _latest_mtime(task.inputs):
+            return True
+        return state.get(task.name, {}).get("fingerprint") == fingerprint(task.inputs)
+
+    def _metrics_stem(self, task):
+        return self.metrics_dir / task.name
+
+    def _execute(self, task):
+        """Runs a stage's commands; returns (exit code, peak RSS in MB)."""
+        env = self.env
+        if self.metrics_dir is not None:
+            env = dict(self.env if self.env is not None else os.environ, **{METRICS_ENV: str(self._metrics_stem(task))})
+        peak_rss = 0
+        for command in task.commands:
+            process = subprocess.Popen(command, env=env)
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            # ru_maxrss is in KB on Linux, bytes on macOS
+            peak_rss = max(peak_rss, usage.ru_maxrss / (1024 ** 2 if sys.platform == "darwin" else 1024))
+            if process.returncode != 0:
+                return process.returncode, peak_rss
+        return 0, peak_rss
+
+    def _rows_written(self, task):
+        """Rows the stage reported in its metrics export, or None if it exported none."""
+        if self.metrics_dir is None:
+            return None
+        try:
+            return metric_total(self.metrics_dir / f"{task.name}.json", "rows_written_total")
+        except (OSError, ValueError):
+            return None
+
+    def _run_task(self, task, state):
+        start = time.perf_counter()
+        print(f"[{task.name}] started")
+        if self.metrics_dir is not None:
+            # Never count the rows of a previous run
+            (self.metrics_dir / f"{task.name}.json").unlink(missing_ok=True)
+        returncode, peak_rss = self._execute(task)
+        elapsed = time.perf_counter() - start
+        rows = self._rows_written(task)
+        if returncode == 0:
+            if task.stamp:
+                self.stamp_path(task.name).write_text(time.strftime("%Y-%m-%dT%H:%M:%S"))
+            with self.lock:
+                state[task.name] = {"fingerprint": fingerprint(task.inputs), "seconds": round(elapsed, 2),
+                                    "peak_rss_mb": round(peak_rss, 1), "rows": rows,
+                                    "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+                self._save_state(state)
+        status = "done" if returncode == 0 else f"failed ({returncode})"
+        throughput = f", {rows:,.0f} rows ({rows / max(elapsed, 1e-9):,.0f} rows/s)" if rows else ""
+        print(f"[{task.name}] {status} in {elapsed:.1f}s, peak RSS {peak_rss:.0f} MB{throughput}")
+        return returncode == 0, elapsed, peak_rss, rows
+
+    def _export_metrics(self, results, wall_seconds):
+        """Exports the timings of every stage of this run to `<metrics_dir>/build`."""
+        registry = Registry()
+        seconds = registry.gauge("build_stage_seconds", "Wall time of each build stage; 0 when skipped")
+        status = registry.gauge("build_stage_status", "1 for the status of each build stage in the last run")
+        peak_rss = registry.gauge("build_stage_peak_rss_mb", "Peak resident memory of each build stage")
+        rows = registry.gauge("build_stage_rows", "Rows written by each build stage")
+        rows_per_second = registry.gauge("build_stage_rows_per_second", "Rows written per second of each build stage")
+        for name, (stage_status, elapsed, stage_peak_rss, stage_rows) in results.items():
+            seconds.set(round(elapsed, 3), stage=name)
+            status.set(1, stage=name, status=stage_status)
+            peak_rss.set(round(stage_peak_rss, 1), stage=name)
+            if stage_rows:
+                rows.set(stage_rows, stage=name)
+                rows_per_second.set(round(stage_rows / max(elapsed, 1e-9), 1), stage=name)
+        registry.gauge("build_wall_seconds", "Wall time of the whole build run").set(round(wall_seconds, 3))
+        registry.export(self.metrics_dir / "build")
+
+    def run(self, jobs=4, force=()):
+        """
+        Runs every stage that is not fresh.
+
+        Args:
+            jobs (int): Maximum number of stages running at once.
+            force (iterable): Names of stages to run even if fresh.
+
+        Returns:
+            dict: Stage name -> (status, seconds, peak RSS in MB, rows written or None),
+                where status is "ran", "skipped", "failed" or "blocked" (a dependency failed).
+        """
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        for task in self.tasks.values():
+            unknown = set(task.deps) - set(self.tasks)
+            if unknown:
+                raise ValueError(f"{task.name} depends on unknown tasks {sorted(unknown)}")
+
+        state = self._load_state()
+        force = set(force)
+        results = {}
+        running = {}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            while len(results) < len(self.tasks):
+                progressed = False
+                for task in self.tasks.values():
+                    if task.name in results or task.name in running.values():
+                        continue
+                    if any(results.get(dep, ("",))[0] in ("failed", "blocked") for dep in task.deps):
+                        results[task.name] = ("blocked", 0, 0, None)
+                        progressed = True
+                        continue
+                    if not all(dep in results for dep in task.deps) or len(running) >= jobs:
+                        continue
+                    # Checked only once dependencies are done, since they may have refreshed the inputs
+                    if task.name not in force and self.is_fresh(task, state):
+                        print(f"[{task.name}] up to date, skipped")
+                        results[task.name] = ("skipped", 0, 0, None)
+                        progressed = True
+                        continue
+                    running[executor.submit(self._run_task, task, state)] = task.name
+
+                if not running:
+                    if not progressed:
+                        pending = sorted(set(self.tasks) - set(results))
+                        raise ValueError(f"Dependency cycle among {pending}")
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    ok, elapsed, peak_rss, rows = future.result()
+                    results[name] = ("ran" if ok else "failed", elapsed, peak_rss, rows)
+
+        wall_seconds = time.perf_counter() - start
+        print(f"\n{'stage':<32}{'status':<10}{'seconds':>10}{'peak MB':>10}{'rows':>14}{'rows/s':>12}")
+        for name, (status, elapsed, peak_rss, rows) in results.items():
+            rows_columns = f"{rows:>14,.0f}{rows / max(elapsed, 1e-9):>12,.0f}" if rows else ""
+            print(f"{name:<32}{status:<10}{elapsed:>10.1f}{peak_rss:>10.0f}{rows_columns}")
+        print(f"Total wall time {wall_seconds:.1f}s")
+        if self.metrics_dir is not None:
+            self._export_metrics(results, wall_seconds)
+        return results